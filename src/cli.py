@@ -0,0 +1,672 @@
+# src/cli.py
+"""
+Single entry point for the query, extraction and ingestion scripts.
+
+    python src/cli.py schema tay-sales-calls
+    python src/cli.py list-opps --namespace tay-sales-calls
+    python src/cli.py query "Find me a call about sports data" --opp 006Rm00000QuHC6IAN
+    python src/cli.py query "sports data" "cloud provider" "data orchestration"
+    python src/cli.py search "How do customers deploy Prefect on ECS?" \
+        --namespaces tay-sales-calls:gong_title_c,transcript_text tay-prefect-docs:text
+    python src/cli.py extract 006Rm00000QuHC6IAN 006Rm00000R5yiLIAR
+    python src/cli.py serve --port 8765 --concurrency 8
+    python src/cli.py loadtest --fake --qps 50 --concurrency 16 --requests 1000
+    python src/cli.py refresh gong --namespace tay-test --limit 100
+    python src/cli.py refresh docs --namespace tay-prefect-docs --sitemap https://docs.prefect.io/sitemap.xml
+    python src/cli.py delete tay-test
+    python src/cli.py delete tay-sales-calls tay-test --call-id 123456789 --dry-run
+    python src/cli.py export tay-sales-calls snapshots/tay-sales-calls
+    python src/cli.py cluster tay-sales-calls --clusters 30
+    python src/cli.py similar-opps 006Rm00000QuHC6IAN --top-k 10
+    python src/cli.py digests tay-sales-calls --limit 500
+    python src/cli.py alias tay-prefect-docs tay-prefect-docs__20250101T120000
+    python src/cli.py gc --dry-run
+    python src/cli.py migrate-schema tay-sales-calls --kind sales-calls
+
+Only argparse and the standard library are imported at start-up. Each
+subcommand imports its script module (and with it prefect, pydantic_ai,
+google.cloud.bigquery, openai or turbopuffer) when it runs, so inspection
+commands do not pay for the extraction and ingestion stacks.
+"""
+
+import argparse
+import importlib
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent
+
+DEFAULT_SALES_NAMESPACE = "tay-sales-calls"
+DEFAULT_QUERY_ATTRIBUTES = [
+    "gong_title_c",
+    "gong_call_id_c",
+    "chunk_index",
+    "gong_participants_emails_c",
+    "gong_primary_opportunity_c",
+    "transcript_text",
+]
+DEFAULT_MULTI_QUERY_ATTRIBUTES = ["gong_title_c", "gong_call_id_c", "chunk_index"]
+
+
+def _load_script(directory: str, module: str):
+    """
+    Imports a module from one of the script directories under src/.
+
+    The script directories import their siblings by bare name (e.g. `helper`),
+    and several directories define modules with the same name, so only the
+    directory needed by the current subcommand is put on the path.
+    """
+    script_dir = str(SRC_DIR / directory)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    return importlib.import_module(module)
+
+
+def cmd_query(args: argparse.Namespace) -> None:
+    queries = _load_script("extract_data_stack", "print_tpuf_queries")
+    if len(args.query_texts) > 1:
+        # One batched embedding request, concurrent vector queries.
+        queries.query_namespace_multi(
+            args.namespace,
+            args.query_texts,
+            top_k=args.top_k,
+            include_attributes=args.attributes or DEFAULT_MULTI_QUERY_ATTRIBUTES,
+            gong_primary_opportunity_c=args.opp,
+        )
+        return
+
+    queries.query_namespace(
+        args.namespace,
+        args.query_texts[0],
+        top_k=args.top_k,
+        include_attributes=args.attributes or DEFAULT_QUERY_ATTRIBUTES,
+        n_characters=args.chars,
+        gong_primary_opportunity_c=args.opp,
+    )
+
+
+def _parse_namespace_spec(spec: str):
+    """ "namespace" or "namespace:attr1,attr2" -> (namespace, attributes)"""
+    namespace, _, attributes = spec.partition(":")
+    return namespace, attributes.split(",") if attributes else True
+
+
+def cmd_search(args: argparse.Namespace) -> None:
+    from shared.fanout import NamespaceQuery, fanout_search
+
+    queries = []
+    for spec in args.namespaces:
+        namespace, attributes = _parse_namespace_spec(spec)
+        queries.append(
+            NamespaceQuery(
+                namespace=namespace,
+                top_k=args.top_k,
+                include_attributes=attributes,
+            )
+        )
+
+    results = fanout_search(
+        args.query_text, queries, top_k=args.top_k, normalization=args.normalization
+    )
+    for rank, result in enumerate(results, start=1):
+        text = str(
+            result.attributes.get("transcript_text")
+            or result.attributes.get("text")
+            or ""
+        )
+        title = result.attributes.get("gong_title_c") or result.attributes.get("link")
+        print(f"{rank:>2}. [{result.source}] score={result.score:.3f} id={result.id}")
+        if title:
+            print(f"    {title}")
+        if text:
+            print(f"    {text[: args.chars]}")
+
+
+def cmd_schema(args: argparse.Namespace) -> None:
+    queries = _load_script("extract_data_stack", "print_tpuf_queries")
+    queries.print_namespace_schema(args.namespace)
+
+
+def cmd_list_opps(args: argparse.Namespace) -> None:
+    opp_ids = _load_script("extract_data_stack", "get_unique_opp_ids")
+    unique_ops = opp_ids.get_unique_gong_primary_opportunities(
+        namespace=args.namespace, top_k=args.top_k
+    )
+    print("Unique gong_primary_opportunity_c values:")
+    for op in unique_ops:
+        print(op)
+
+
+def cmd_extract(args: argparse.Namespace) -> None:
+    extract_stack = _load_script("extract_data_stack", "extract_stack")
+    results = [
+        extract_stack.extract_data_stack(
+            opp_id,
+            context_token_budget=args.context_token_budget,
+            profile=args.profile,
+            use_tags=not args.no_tags,
+            cascade=args.cascade,
+            use_digests=not args.no_digests,
+        )
+        for opp_id in args.opp_ids
+    ]
+    if len(results) > 1:
+        from shared.metrics import usage_tables
+
+        print(usage_tables(result.usage for result in results if result.usage))
+
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    service = _load_script("extract_data_stack", "extraction_service")
+    service.serve(
+        host=args.host,
+        port=args.port,
+        concurrency=args.concurrency,
+        queue_size=args.queue_size,
+        request_timeout=args.request_timeout,
+        warmup=not args.no_warmup,
+    )
+
+
+def cmd_loadtest(args: argparse.Namespace) -> None:
+    query_load = _load_script("extract_data_stack", "query_load")
+    if args.mix:
+        mix = query_load.load_mix(args.mix)
+    elif args.cases:
+        mix = query_load.mix_from_cassettes(args.cases, args.cassette_dir)
+    else:
+        mix = None
+    fake = None
+    if args.fake:
+        fake = query_load.FakeBackend(
+            embed_latency=query_load.LatencyModel.parse(
+                args.embed_latency, args.error_rate
+            ),
+            query_latency=query_load.LatencyModel.parse(
+                args.query_latency, args.error_rate
+            ),
+            seed=args.seed,
+        )
+    query_load.load_test(
+        mix,
+        paths=args.paths,
+        requests=args.requests,
+        qps=args.qps,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        fake=fake,
+        namespace=args.namespace,
+        docs_namespace=args.docs_namespace,
+        cold_cache=args.cold_cache,
+        quiet=not args.verbose,
+        report_path=args.report,
+    )
+
+
+def cmd_refresh(args: argparse.Namespace) -> None:
+    if args.source == "gong":
+        refresh = _load_script("get_gong_data", "refresh_gong_from_bq")
+        refresh.refresh_gong_transcripts(
+            namespace=args.namespace,
+            limit_n_calls=args.limit,
+            chunk_size=args.chunk_size,
+            overlap=args.overlap,
+            profile=args.profile,
+            write_digests=args.digests,
+        )
+        return
+
+    import asyncio
+
+    docs = _load_script("get_product_docs", "get_docs_from_web")
+    asyncio.run(
+        docs.refresh_tpuf(
+            namespace=args.namespace,
+            mode=args.mode,
+            sitemap_urls=args.sitemap,
+            sitemap_exclude=args.exclude,
+            github_repo=args.github_repo,
+            github_include_globs=args.github_glob,
+            batch_size=args.batch_size,
+            max_concurrent=args.max_concurrent,
+            incremental=args.incremental,
+            streaming=args.streaming,
+            adaptive_concurrency=not args.fixed_concurrency,
+            delete_previous=not args.keep_previous,
+        )
+    )
+
+
+def cmd_delete(args: argparse.Namespace) -> None:
+    delete_script = _load_script("get_product_docs", "manual_delete_script")
+    filters = delete_script.build_delete_filters(
+        call_ids=args.call_id,
+        opp_ids=args.opp,
+        start_after=args.start_after,
+        start_before=args.start_before,
+        url_prefix=args.url_prefix,
+    )
+    if filters is not None:
+        delete_script.delete_matching(args.namespaces, filters, dry_run=args.dry_run)
+        return
+
+    for namespace in args.namespaces:
+        if args.dry_run:
+            print(f"[dry run] would delete namespace {namespace}")
+        else:
+            delete_script.delete_namespace(namespace)
+
+
+def cmd_export(args: argparse.Namespace) -> None:
+    from shared.snapshot import export_namespace_snapshot
+
+    export_namespace_snapshot(args.namespace, args.output_dir)
+
+
+def cmd_cluster(args: argparse.Namespace) -> None:
+    cluster = _load_script("get_gong_data", "cluster_calls")
+    cluster.cluster_calls(
+        namespace=args.namespace,
+        snapshot_dir=args.snapshot_dir,
+        n_clusters=args.clusters,
+        export=not args.no_export,
+        write_back=not args.no_write_back,
+        seed=args.seed,
+    )
+
+
+def cmd_digests(args: argparse.Namespace) -> None:
+    digests = _load_script("get_gong_data", "call_digests")
+    digests.generate_call_digests(
+        namespace=args.namespace,
+        snapshot_dir=args.snapshot_dir,
+        export=not args.no_export,
+        max_concurrency=args.max_concurrency,
+        limit=args.limit,
+    )
+
+
+def cmd_similar_opps(args: argparse.Namespace) -> None:
+    centroids = _load_script("get_gong_data", "opp_centroids")
+    if args.rebuild_from:
+        centroids.rebuild_centroids(args.namespace, args.rebuild_from)
+    for match in centroids.similar_opportunities(
+        args.opp_id, namespace=args.namespace, top_k=args.top_k
+    ):
+        print(
+            f"{match['opp_id']}  dist={match['dist']:.4f}  "
+            f"chunks={match['chunk_count']}"
+        )
+
+
+def cmd_alias(args: argparse.Namespace) -> None:
+    from shared.aliases import import_alias_file, load_aliases, set_alias
+
+    if args.import_file:
+        import_alias_file(args.import_file)
+        return
+    if args.target:
+        set_alias(args.namespace, args.target)
+        return
+    for namespace, target in sorted(load_aliases().items()):
+        if args.namespace in (None, namespace):
+            print(f"{namespace} -> {target}")
+
+
+def cmd_gc(args: argparse.Namespace) -> None:
+    from shared.aliases import collect_shadows
+
+    orphans = collect_shadows(
+        dry_run=args.dry_run, min_age_seconds=args.min_age_hours * 3600
+    )
+    if not orphans:
+        print("No orphaned shadow namespaces")
+
+
+def cmd_migrate_schema(args: argparse.Namespace) -> None:
+    from shared.schemas import migrate_namespace
+
+    migrate_namespace(
+        args.namespace,
+        kind=args.kind,
+        snapshot_dir=args.snapshot_dir,
+        export=not args.no_export,
+        delete_previous=args.delete_previous,
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="crm", description="Sales-call and product-docs vector tooling"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    query = subparsers.add_parser("query", help="Vector search a namespace")
+    query.add_argument("query_texts", nargs="+")
+    query.add_argument("--namespace", default=DEFAULT_SALES_NAMESPACE)
+    query.add_argument("--top-k", type=int, default=3)
+    query.add_argument("--opp", default=None, help="gong_primary_opportunity_c")
+    query.add_argument("--attributes", nargs="+", default=None)
+    query.add_argument("--chars", type=int, default=500)
+    query.set_defaults(func=cmd_query)
+
+    search = subparsers.add_parser(
+        "search", help="Search several namespaces at once and merge the results"
+    )
+    search.add_argument("query_text")
+    search.add_argument(
+        "--namespaces",
+        nargs="+",
+        default=[DEFAULT_SALES_NAMESPACE],
+        help="namespace or namespace:attr1,attr2",
+    )
+    search.add_argument("--top-k", type=int, default=5)
+    search.add_argument(
+        "--normalization", choices=["similarity", "minmax"], default="similarity"
+    )
+    search.add_argument("--chars", type=int, default=300)
+    search.set_defaults(func=cmd_search)
+
+    schema = subparsers.add_parser("schema", help="Print a namespace schema")
+    schema.add_argument("namespace")
+    schema.set_defaults(func=cmd_schema)
+
+    list_opps = subparsers.add_parser(
+        "list-opps", help="List unique gong_primary_opportunity_c values"
+    )
+    list_opps.add_argument("--namespace", default=DEFAULT_SALES_NAMESPACE)
+    list_opps.add_argument("--top-k", type=int, default=1000)
+    list_opps.set_defaults(func=cmd_list_opps)
+
+    extract = subparsers.add_parser(
+        "extract", help="Run tech-stack extraction for opportunities"
+    )
+    extract.add_argument("opp_ids", nargs="+")
+    extract.add_argument("--context-token-budget", type=int, default=6000)
+    extract.add_argument(
+        "--profile",
+        action="store_true",
+        help="save a profile and flamegraph of each retrieval tool call",
+    )
+    extract.add_argument(
+        "--no-tags",
+        action="store_true",
+        help="do not hint the agent with unambiguous transcript tags (nor answer "
+        "those opportunities with the cheapest cascade tier)",
+    )
+    extract.add_argument(
+        "--cascade",
+        action="store_true",
+        help="run gpt-4o-mini first and escalate to gpt-4o only when needed",
+    )
+    extract.add_argument(
+        "--no-digests",
+        action="store_true",
+        help="do not offer the agent the per-call digests tool",
+    )
+    extract.set_defaults(func=cmd_extract)
+
+    serve = subparsers.add_parser(
+        "serve", help="Serve extractions over HTTP from a warm process"
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--concurrency", type=int, default=8)
+    serve.add_argument(
+        "--queue-size", type=int, default=64, help="queued requests before 503s"
+    )
+    serve.add_argument("--request-timeout", type=float, default=300)
+    serve.add_argument(
+        "--no-warmup",
+        action="store_true",
+        help="do not open the OpenAI and turbopuffer connections at start-up",
+    )
+    serve.set_defaults(func=cmd_serve)
+
+    loadtest = subparsers.add_parser(
+        "loadtest", help="Benchmark the retrieval query paths under load"
+    )
+    loadtest.add_argument(
+        "--paths",
+        nargs="+",
+        choices=["tool", "query_namespace", "raggy"],
+        default=None,
+        help="default: every path in the mix",
+    )
+    loadtest.add_argument(
+        "--mix", default=None, help="JSON list of queries (default: built-in mix)"
+    )
+    loadtest.add_argument(
+        "--cases",
+        default=None,
+        help="replay the tool calls recorded in the cassettes of these eval cases",
+    )
+    loadtest.add_argument("--cassette-dir", default="cassettes")
+    loadtest.add_argument("--requests", type=int, default=200)
+    loadtest.add_argument(
+        "--qps", type=float, default=10.0, help="0 sends back to back"
+    )
+    loadtest.add_argument("--concurrency", type=int, default=8)
+    loadtest.add_argument(
+        "--warmup", type=int, default=0, help="unmeasured queries sent first"
+    )
+    loadtest.add_argument("--namespace", default=DEFAULT_SALES_NAMESPACE)
+    loadtest.add_argument("--docs-namespace", default="test-tay")
+    loadtest.add_argument(
+        "--cold-cache", action="store_true", help="empty the chunk cache first"
+    )
+    loadtest.add_argument(
+        "--fake",
+        action="store_true",
+        help="use latency-modelled fakes instead of OpenAI and turbopuffer",
+    )
+    loadtest.add_argument(
+        "--embed-latency",
+        default="120,400",
+        metavar="MEDIAN_MS,P99_MS",
+        help="fake embedding latency",
+    )
+    loadtest.add_argument(
+        "--query-latency",
+        default="25,120",
+        metavar="MEDIAN_MS,P99_MS",
+        help="fake turbopuffer query latency",
+    )
+    loadtest.add_argument(
+        "--error-rate", type=float, default=0.0, help="fake failure rate per call"
+    )
+    loadtest.add_argument("--seed", type=int, default=0)
+    loadtest.add_argument("--report", default=None, help="Write the JSON report here")
+    loadtest.add_argument(
+        "--verbose", action="store_true", help="keep the query functions' output"
+    )
+    loadtest.set_defaults(func=cmd_loadtest)
+
+    refresh = subparsers.add_parser("refresh", help="Refresh a namespace")
+    refresh.add_argument("source", choices=["gong", "docs"])
+    refresh.add_argument("--namespace", required=True)
+    refresh.add_argument("--limit", type=int, default=50, help="gong: max calls")
+    refresh.add_argument("--chunk-size", type=int, default=2000)
+    refresh.add_argument("--overlap", type=int, default=200)
+    refresh.add_argument(
+        "--digests",
+        action="store_true",
+        help="gong: write digests for calls that have none (see call_digests)",
+    )
+    refresh.add_argument(
+        "--mode",
+        choices=["upsert", "reset"],
+        default="upsert",
+        help="docs: reset rebuilds into a shadow namespace and switches the alias",
+    )
+    refresh.add_argument("--sitemap", nargs="+", default=None)
+    refresh.add_argument("--exclude", nargs="+", default=None)
+    refresh.add_argument("--github-repo", default=None)
+    refresh.add_argument("--github-glob", nargs="+", default=None)
+    refresh.add_argument("--batch-size", type=int, default=100)
+    refresh.add_argument("--max-concurrent", type=int, default=8)
+    refresh.add_argument(
+        "--incremental",
+        action="store_true",
+        help="docs: only re-ingest pages and repo files changed since the last run",
+    )
+    refresh.add_argument(
+        "--streaming",
+        action="store_true",
+        help="docs: upsert batches while the crawl is still running",
+    )
+    refresh.add_argument(
+        "--fixed-concurrency",
+        action="store_true",
+        help="docs: keep --max-concurrent batches in flight instead of adapting",
+    )
+    refresh.add_argument(
+        "--keep-previous",
+        action="store_true",
+        help="docs: keep the namespace a rebuild replaced (see `gc`)",
+    )
+    refresh.add_argument(
+        "--profile",
+        action="store_true",
+        help="gong: save profiles and flamegraphs of the embed and upsert tasks",
+    )
+    refresh.set_defaults(func=cmd_refresh)
+
+    delete = subparsers.add_parser(
+        "delete",
+        help="Delete rows matching filters, or whole namespaces without filters",
+    )
+    delete.add_argument("namespaces", nargs="+")
+    delete.add_argument("--call-id", nargs="+", default=None)
+    delete.add_argument("--opp", nargs="+", default=None)
+    delete.add_argument("--start-after", default=None, help="call start >= date")
+    delete.add_argument("--start-before", default=None, help="call start < date")
+    delete.add_argument("--url-prefix", default=None, help="docs link prefix")
+    delete.add_argument("--dry-run", action="store_true", help="only count rows")
+    delete.set_defaults(func=cmd_delete)
+
+    export = subparsers.add_parser(
+        "export", help="Export a namespace to a memory-mappable snapshot"
+    )
+    export.add_argument("namespace")
+    export.add_argument("output_dir")
+    export.set_defaults(func=cmd_export)
+
+    cluster = subparsers.add_parser(
+        "cluster", help="Cluster the calls in a namespace into topics"
+    )
+    cluster.add_argument("namespace")
+    cluster.add_argument("--clusters", type=int, default=20)
+    cluster.add_argument(
+        "--snapshot-dir", default=None, help="default: snapshots/<namespace>"
+    )
+    cluster.add_argument(
+        "--no-export",
+        action="store_true",
+        help="cluster the existing snapshot instead of exporting a new one",
+    )
+    cluster.add_argument(
+        "--no-write-back",
+        action="store_true",
+        help="only save the topic map; do not write the call-clusters namespace",
+    )
+    cluster.add_argument("--seed", type=int, default=0)
+    cluster.set_defaults(func=cmd_cluster)
+
+    digests = subparsers.add_parser(
+        "digests", help="Write per-call digests for calls that have none"
+    )
+    digests.add_argument("namespace")
+    digests.add_argument(
+        "--snapshot-dir", default=None, help="default: snapshots/<namespace>"
+    )
+    digests.add_argument(
+        "--no-export",
+        action="store_true",
+        help="read the existing snapshot instead of exporting a new one",
+    )
+    digests.add_argument("--max-concurrency", type=int, default=8)
+    digests.add_argument("--limit", type=int, default=None, help="max calls")
+    digests.set_defaults(func=cmd_digests)
+
+    similar = subparsers.add_parser(
+        "similar-opps", help="Find opportunities whose calls are most alike"
+    )
+    similar.add_argument("opp_id")
+    similar.add_argument("--namespace", default=DEFAULT_SALES_NAMESPACE)
+    similar.add_argument("--top-k", type=int, default=10)
+    similar.add_argument(
+        "--rebuild-from",
+        default=None,
+        metavar="SNAPSHOT_DIR",
+        help="first recompute all centroids from a snapshot of the namespace",
+    )
+    similar.set_defaults(func=cmd_similar_opps)
+
+    alias = subparsers.add_parser(
+        "alias", help="Show namespace aliases, or point one at a namespace"
+    )
+    alias.add_argument("namespace", nargs="?", default=None)
+    alias.add_argument("target", nargs="?", default=None)
+    alias.add_argument(
+        "--import-file",
+        default=None,
+        metavar="PATH",
+        help="copy the aliases of a local namespace_aliases.json into turbopuffer",
+    )
+    alias.set_defaults(func=cmd_alias)
+
+    gc = subparsers.add_parser(
+        "gc", help="Delete shadow namespaces that no alias points at any more"
+    )
+    gc.add_argument(
+        "--min-age-hours",
+        type=float,
+        default=24,
+        help="also delete unaliased shadows older than this (abandoned builds)",
+    )
+    gc.add_argument("--dry-run", action="store_true", help="only list them")
+    gc.set_defaults(func=cmd_gc)
+
+    migrate = subparsers.add_parser(
+        "migrate-schema",
+        help="Re-write a namespace with its declared schema (see shared.schemas)",
+    )
+    migrate.add_argument("namespace")
+    migrate.add_argument(
+        "--kind",
+        choices=[
+            "sales-calls",
+            "opp-centroids",
+            "call-digests",
+            "call-clusters",
+            "docs",
+        ],
+        default="sales-calls",
+    )
+    migrate.add_argument(
+        "--snapshot-dir", default=None, help="default: snapshots/<namespace>"
+    )
+    migrate.add_argument(
+        "--no-export",
+        action="store_true",
+        help="migrate from the existing snapshot instead of exporting a new one",
+    )
+    migrate.add_argument(
+        "--delete-previous",
+        action="store_true",
+        help="delete the namespace the alias pointed at before (only once "
+        "nothing else reads it)",
+    )
+    migrate.set_defaults(func=cmd_migrate_schema)
+
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
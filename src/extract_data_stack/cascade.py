@@ -0,0 +1,161 @@
+# src/extract_data_stack/cascade.py
+"""
+Model cascade for the tech stack agent.
+
+Extraction first runs the cheapest model tier with the same agent, tools and
+TechStackResult schema, and only escalates to the next tier when the answer
+is not good enough to keep:
+
+    low_confidence   confidence_score is below the tier's threshold
+    tag_conflict     the primary tool or cloud is not among the ones the
+                     transcripts were tagged with at ingestion (see
+                     shared.tech_tagging); opportunities without tags
+                     never conflict
+
+The last tier's answer is always kept. Every decision is counted in
+`routing_stats`, so a batch run can report how often each tier answered and
+why the others escalated.
+
+Tiers take any pydantic_ai model, so the cascade runs offline with
+`TestModel` or `FunctionModel` tiers.
+"""
+
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from shared.tech_stack_enums import CloudProvider, OrchestrationTool
+from shared.tech_tagging import (
+    AIRFLOW_FLAVORS,
+    CLOUDS_ATTRIBUTE,
+    IMPLIED_CLOUD,
+    TOOLS_ATTRIBUTE,
+    TOOL_SYNONYMS,
+)
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.7
+
+
+@dataclass
+class CascadeTier:
+    """One step of the cascade: a model and the confidence it must reach."""
+
+    name: str
+    model: Any
+    confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD
+
+
+DEFAULT_TIERS = [
+    CascadeTier("gpt-4o-mini", "openai:gpt-4o-mini"),
+    CascadeTier("gpt-4o", "openai:gpt-4o"),
+]
+
+
+def tag_conflicts(result, tag_rows: list) -> List[str]:
+    """
+    Fields of `result` that contradict the opportunity's tagged chunks.
+
+    A tool conflicts when the transcripts mention taggable tools but not the
+    answered one (a generic "Airflow" mention covers every Airflow flavor).
+    A cloud conflicts when the transcripts mention clouds, or tools that
+    imply one, but not the answered cloud. Tag values that are not enum
+    members (from older synonym lists) are ignored.
+    """
+    known_tools = OrchestrationTool._value2member_map_
+    known_clouds = CloudProvider._value2member_map_
+    tools = set()
+    clouds = set()
+    for row in tag_rows:
+        attributes = row.attributes or {}
+        tools.update(set(attributes.get(TOOLS_ATTRIBUTE) or []) & known_tools.keys())
+        clouds.update(set(attributes.get(CLOUDS_ATTRIBUTE) or []) & known_clouds.keys())
+    clouds.update(
+        IMPLIED_CLOUD[known_tools[tool]].value
+        for tool in tools
+        if known_tools[tool] in IMPLIED_CLOUD
+    )
+
+    conflicts = []
+    stack = result.tech_stack
+    tool = stack.primary_previous_solution
+    if tools and tool is not None and tool in TOOL_SYNONYMS:
+        generic = OrchestrationTool.AIRFLOW_NOT_SPECIFIED.value
+        covered = tool.value in tools or (tool in AIRFLOW_FLAVORS and generic in tools)
+        if not covered:
+            conflicts.append("primary_previous_solution")
+    cloud = stack.cloud_provider
+    if clouds and cloud is not None and cloud.value not in clouds:
+        conflicts.append("cloud_provider")
+    return conflicts
+
+
+def escalation_reason(
+    result, tier: CascadeTier, tag_rows: Optional[list]
+) -> Optional[str]:
+    """Why `result` from `tier` should be escalated, or None to keep it."""
+    if result.confidence_score < tier.confidence_threshold:
+        return "low_confidence"
+    if tag_rows and tag_conflicts(result, tag_rows):
+        return "tag_conflict"
+    return None
+
+
+class RoutingStats:
+    """Thread-safe counts of which tier answered and why tiers escalated."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs: Counter = Counter()
+        self.answered: Counter = Counter()
+        self.escalations: Counter = Counter()
+        self.latency_sec: Counter = Counter()
+
+    def record_run(self, tier: str, latency_sec: float) -> None:
+        with self._lock:
+            self.runs[tier] += 1
+            self.latency_sec[tier] += latency_sec
+
+    def record_answer(self, tier: str) -> None:
+        with self._lock:
+            self.answered[tier] += 1
+
+    def record_escalation(self, tier: str, reason: str) -> None:
+        with self._lock:
+            self.escalations[(tier, reason)] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            for counter in (self.runs, self.answered, self.escalations):
+                counter.clear()
+            self.latency_sec.clear()
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                tier: {
+                    "runs": self.runs[tier],
+                    "answered": self.answered[tier],
+                    "escalated": {
+                        reason: n
+                        for (escalated_tier, reason), n in self.escalations.items()
+                        if escalated_tier == tier
+                    },
+                    "mean_latency_sec": self.latency_sec[tier] / self.runs[tier],
+                }
+                for tier in self.runs
+            }
+
+    def summary(self) -> str:
+        lines = []
+        for tier, stats in self.as_dict().items():
+            escalated = ", ".join(f"{r} {n}" for r, n in stats["escalated"].items())
+            lines.append(
+                f"  {tier}: {stats['runs']} runs, answered {stats['answered']}, "
+                f"escalated: {escalated or 'none'}, "
+                f"mean {stats['mean_latency_sec']:.2f}s"
+            )
+        return "Cascade routing:\n" + "\n".join(lines)
+
+
+routing_stats = RoutingStats()
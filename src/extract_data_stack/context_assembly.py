@@ -0,0 +1,175 @@
+# src/extract_data_stack/context_assembly.py
+import math
+from typing import Any, Dict, Tuple
+
+from shared.schemas import TIMESTAMP_ATTRIBUTES, format_timestamp
+from shared.transcripts import merge_adjacent_chunks, parse_chunk_index
+
+# Per-call attributes that are identical for every chunk of the call.
+CALL_METADATA_KEYS = [
+    "name",
+    "gong_title_c",
+    "gong_call_start_c",
+    "gong_call_brief_c",
+]
+EMAIL_KEY = "gong_participants_emails_c"
+
+# A 2000-word transcript chunk is roughly 2700 tokens.
+ESTIMATED_CHUNK_TOKENS = 2700
+OPPORTUNITY_KEY = "gong_primary_opportunity_c"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text).
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / 4)
+
+
+def chunks_for_budget(token_budget: int) -> int:
+    """
+    Number of chunks worth fetching in full for a given token budget. One
+    extra chunk is allowed because adjacent chunks merge and shrink.
+    """
+    return max(1, math.ceil(token_budget / ESTIMATED_CHUNK_TOKENS) + 1)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Truncates text on a word boundary so that it fits in `max_tokens`.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Leave room for the truncation marker.
+    max_chars = max_tokens * 4 - len(" [...]")
+    cut = text.rfind(" ", 0, max_chars)
+    return text[: cut if cut > 0 else max_chars] + " [...]"
+
+
+def _group_results_by_call(results) -> Tuple[Dict[str, Dict[str, Any]], set]:
+    calls: Dict[str, Dict[str, Any]] = {}
+    opportunities = set()
+
+    for result in results:
+        attrs = result.attributes or {}
+        call_id = attrs.get("gong_call_id_c") or str(result.id).rsplit("-", 1)[0]
+        dist = result.dist if result.dist is not None else 1.0
+
+        if attrs.get(OPPORTUNITY_KEY):
+            opportunities.add(attrs[OPPORTUNITY_KEY])
+
+        call = calls.setdefault(
+            call_id,
+            {"metadata": {}, "emails": set(), "chunks": []},
+        )
+        for key in CALL_METADATA_KEYS:
+            if attrs.get(key) and key not in call["metadata"]:
+                value = attrs[key]
+                if key in TIMESTAMP_ATTRIBUTES:
+                    value = format_timestamp(value)
+                call["metadata"][key] = value
+        if attrs.get(EMAIL_KEY):
+            call["emails"].update(
+                e.strip() for e in attrs[EMAIL_KEY].split(",") if e.strip()
+            )
+        if attrs.get("transcript_text"):
+            call["chunks"].append(
+                {
+                    "chunk_index": parse_chunk_index(attrs.get("chunk_index")),
+                    "text": attrs["transcript_text"],
+                    "dist": dist,
+                }
+            )
+
+    return calls, opportunities
+
+
+def assemble_context(
+    results,
+    token_budget: int = 6000,
+    brief_max_chars: int = 600,
+    min_segment_tokens: int = 100,
+) -> Dict[str, Any]:
+    """
+    Builds the payload returned to the agent from raw turbopuffer query results.
+
+    - Chunks of the same call are merged when their `chunk_index` values are
+      adjacent, dropping the words repeated by the `chunk_text` overlap.
+    - Call metadata (title, start, brief, participants) is emitted once per
+      call, and the opportunity id once per payload.
+    - Segments are added in order of relevance (lowest cosine distance first)
+      until `token_budget` is spent; the last segment that does not fit is
+      truncated if at least `min_segment_tokens` remain.
+    """
+    calls, opportunities = _group_results_by_call(results)
+
+    ranked_segments = []
+    for call_id, call in calls.items():
+        for segment in merge_adjacent_chunks(call["chunks"]):
+            ranked_segments.append((segment["dist"], call_id, segment))
+    ranked_segments.sort(key=lambda item: item[0])
+
+    payload_calls: Dict[str, Dict[str, Any]] = {}
+    used_tokens = 0
+    raw_tokens = sum(
+        estimate_tokens(chunk["text"])
+        for call in calls.values()
+        for chunk in call["chunks"]
+    )
+
+    for dist, call_id, segment in ranked_segments:
+        remaining = token_budget - used_tokens
+        call_entry = payload_calls.get(call_id)
+        metadata_tokens = 0
+
+        if call_entry is None:
+            call = calls[call_id]
+            call_entry = {"gong_call_id_c": call_id, **call["metadata"]}
+            if "gong_call_brief_c" in call_entry:
+                call_entry["gong_call_brief_c"] = call_entry["gong_call_brief_c"][
+                    :brief_max_chars
+                ]
+            if call["emails"]:
+                call_entry[EMAIL_KEY] = sorted(call["emails"])
+            call_entry["relevance"] = round(1.0 - dist, 4)
+            call_entry["segments"] = []
+            metadata_tokens = estimate_tokens(str(call_entry))
+
+        segment_tokens = estimate_tokens(segment["text"])
+        text = segment["text"]
+        if metadata_tokens + segment_tokens > remaining:
+            available = remaining - metadata_tokens
+            if available < min_segment_tokens:
+                break
+            text = _truncate_to_tokens(text, available)
+            segment_tokens = estimate_tokens(text)
+
+        call_entry["segments"].append(
+            {
+                "chunks": segment["chunk_range"],
+                "first_index": segment["first_index"],
+                "transcript_text": text,
+            }
+        )
+        payload_calls[call_id] = call_entry
+        used_tokens += metadata_tokens + segment_tokens
+
+    for call_entry in payload_calls.values():
+        call_entry["segments"].sort(
+            key=lambda s: (s["first_index"] is None, s["first_index"] or 0)
+        )
+        for segment in call_entry["segments"]:
+            segment.pop("first_index")
+
+    print(
+        f"🧩 Assembled context: {len(payload_calls)} calls, "
+        f"~{used_tokens} tokens (raw chunks ~{raw_tokens} tokens, budget {token_budget})"
+    )
+
+    return {
+        OPPORTUNITY_KEY: sorted(opportunities),
+        "calls": list(payload_calls.values()),
+        "estimated_tokens": used_tokens,
+    }
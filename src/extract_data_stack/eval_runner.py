@@ -0,0 +1,385 @@
+# src/extract_data_stack/eval_runner.py
+"""
+Concurrent, record/replay evaluation runner for the tech stack agent.
+
+Cases are loaded from a JSON list, one object per opportunity:
+
+    [
+        {
+            "opp_id": "006Rm00000QuHC6IAN",
+            "name": "mwaa-on-aws",
+            "expected_primary_previous_solution": "Airflow (MWAA) AWS Managed",
+            "expected_secondary_previous_solutions": ["AWS Step Functions"],
+            "expected_cloud_provider": "AWS",
+            "confidence_band": [0.6, 1.0]
+        }
+    ]
+
+Every expectation is optional; only the ones present are scored.
+
+Modes:
+    live    call gpt-4o and turbopuffer, record nothing
+    record  call the live services and write one cassette per case
+    replay  answer LLM turns and transcript searches from the cassettes,
+            fully offline and deterministic
+
+Each case reports the run's usage (LLM requests, tokens and turn latencies,
+tool calls, retrieval timings; see shared.metrics), and the report ends with
+p50/p95/p99 tables across cases. Replays report the usage recorded with the
+cassette, so the tables describe the live run.
+
+Usage:
+    python eval_runner.py eval_cases.json --mode record
+    python eval_runner.py eval_cases.json --mode replay --report report.json
+    python eval_runner.py eval_cases.json --mode replay --latency-budget 20
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Tuple
+
+from cascade import DEFAULT_TIERS, CascadeTier, routing_stats
+from extract_stack import TechStackResult, run_extraction
+from pydantic import BaseModel
+from pydantic_ai.messages import ModelMessagesTypeAdapter, ModelResponse
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from shared.cassette import Cassette, use_cassette
+from shared.metrics import RunUsage, usage_tables
+from tech_stack_enums import CloudProvider, OrchestrationTool
+
+EvalMode = Literal["live", "record", "replay"]
+
+
+class EvalCase(BaseModel):
+    """A labeled opportunity."""
+
+    opp_id: str
+    name: Optional[str] = None
+    expected_primary_previous_solution: Optional[OrchestrationTool] = None
+    expected_secondary_previous_solutions: Optional[List[OrchestrationTool]] = None
+    expected_cloud_provider: Optional[CloudProvider] = None
+    confidence_band: Optional[Tuple[float, float]] = None
+
+    @property
+    def case_id(self) -> str:
+        return self.name or self.opp_id
+
+
+class CaseReport(BaseModel):
+    """Outcome, cost and latency of one evaluation case."""
+
+    case_id: str
+    opp_id: str
+    checks: Dict[str, bool] = {}
+    accuracy: Optional[float] = None
+    latency_sec: float = 0.0
+    llm_requests: int = 0
+    request_tokens: int = 0
+    response_tokens: int = 0
+    total_tokens: int = 0
+    tool_calls: int = 0
+    grounded: Optional[bool] = None
+    error: Optional[str] = None
+    result: Optional[TechStackResult] = None
+
+
+def load_cases(path: str) -> List[EvalCase]:
+    return [EvalCase(**case) for case in json.loads(Path(path).read_text())]
+
+
+def score_case(case: EvalCase, result: TechStackResult) -> Dict[str, bool]:
+    """
+    Returns one boolean per expectation set on the case.
+    """
+    checks = {}
+    stack = result.tech_stack
+
+    if case.expected_primary_previous_solution is not None:
+        checks["primary_previous_solution"] = (
+            stack.primary_previous_solution == case.expected_primary_previous_solution
+        )
+    if case.expected_secondary_previous_solutions is not None:
+        checks["secondary_previous_solutions"] = set(
+            stack.secondary_previous_solutions or []
+        ) == set(case.expected_secondary_previous_solutions)
+    if case.expected_cloud_provider is not None:
+        checks["cloud_provider"] = stack.cloud_provider == case.expected_cloud_provider
+    if case.confidence_band is not None:
+        low, high = case.confidence_band
+        checks["confidence_band"] = low <= result.confidence_score <= high
+
+    return checks
+
+
+def replay_model(recorded_messages: list) -> FunctionModel:
+    """
+    Builds a FunctionModel that answers each LLM turn with the response
+    recorded for that turn.
+    """
+    responses = [
+        message
+        for message in ModelMessagesTypeAdapter.validate_python(recorded_messages)
+        if isinstance(message, ModelResponse)
+    ]
+
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        turn = sum(isinstance(message, ModelResponse) for message in messages)
+        if turn >= len(responses):
+            raise RuntimeError(
+                f"Cassette has {len(responses)} recorded LLM turns, run asked for turn {turn + 1}"
+            )
+        return responses[turn]
+
+    return FunctionModel(respond, model_name="cassette-replay")
+
+
+async def run_case(
+    case: EvalCase,
+    mode: EvalMode,
+    cassette_dir: Path,
+    semaphore: asyncio.Semaphore,
+    context_token_budget: int,
+    use_tags: bool = True,
+    tiers: Optional[List[CascadeTier]] = None,
+    use_digests: bool = True,
+) -> CaseReport:
+    report = CaseReport(case_id=case.case_id, opp_id=case.opp_id)
+
+    async with semaphore:
+        cassette = None
+        model = None
+        start = time.perf_counter()
+        # A missing or corrupt cassette fails this case, not the whole eval.
+        try:
+            if mode != "live":
+                cassette = Cassette(cassette_dir / f"{case.case_id}.json", mode)
+            if mode == "replay":
+                recorded_llm = cassette.extras["llm"]
+                model = replay_model(recorded_llm["messages"])
+
+            with use_cassette(cassette):
+                run = await run_extraction(
+                    case.opp_id,
+                    context_token_budget=context_token_budget,
+                    model=model,
+                    use_tags=use_tags,
+                    tiers=tiers,
+                    use_digests=use_digests,
+                )
+
+                usage = run.data.usage
+                if mode == "record":
+                    cassette.extras["llm"] = {
+                        "messages": ModelMessagesTypeAdapter.dump_python(
+                            run.all_messages(), mode="json"
+                        ),
+                        "usage": {
+                            "requests": usage.llm_requests,
+                            "request_tokens": usage.request_tokens,
+                            "response_tokens": usage.response_tokens,
+                            "total_tokens": usage.total_tokens,
+                        },
+                        "run_usage": usage.model_dump(mode="json"),
+                    }
+
+            if mode == "replay":
+                # Tokens and LLM latencies of the replayed run are synthetic;
+                # report the recorded ones. Cassettes from before run_usage
+                # only have tokens.
+                if "run_usage" in recorded_llm:
+                    usage = RunUsage(**recorded_llm["run_usage"])
+                else:
+                    recorded_usage = recorded_llm["usage"]
+                    usage.llm_requests = recorded_usage["requests"]
+                    usage.request_tokens = recorded_usage["request_tokens"]
+                    usage.response_tokens = recorded_usage["response_tokens"]
+                    usage.total_tokens = recorded_usage["total_tokens"]
+                    usage.llm_turn_sec = []
+                run.data.usage = usage
+        except Exception as e:
+            report.latency_sec = time.perf_counter() - start
+            report.error = f"{type(e).__name__}: {e}"
+            print(f"❌ {case.case_id}: {report.error}")
+            return report
+
+    report.latency_sec = usage.total_sec
+    report.llm_requests = usage.llm_requests
+    report.request_tokens = usage.request_tokens
+    report.response_tokens = usage.response_tokens
+    report.total_tokens = usage.total_tokens
+    report.tool_calls = usage.tool_calls
+    report.result = run.data
+    if run.data.grounding is not None:
+        report.grounded = run.data.grounding.grounded
+    report.checks = score_case(case, run.data)
+    if report.checks:
+        report.accuracy = sum(report.checks.values()) / len(report.checks)
+
+    print(f"✅ {case.case_id}: accuracy={report.accuracy} ({report.latency_sec:.2f}s)")
+    return report
+
+
+async def run_evals(
+    cases: List[EvalCase],
+    mode: EvalMode = "replay",
+    cassette_dir: str = "cassettes",
+    max_concurrency: int = 8,
+    context_token_budget: int = 6000,
+    use_tags: bool = True,
+    tiers: Optional[List[CascadeTier]] = None,
+    use_digests: bool = True,
+) -> List[CaseReport]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    return await asyncio.gather(
+        *[
+            run_case(
+                case,
+                mode,
+                Path(cassette_dir),
+                semaphore,
+                context_token_budget,
+                use_tags=use_tags,
+                tiers=tiers,
+                use_digests=use_digests,
+            )
+            for case in cases
+        ]
+    )
+
+
+def print_report(
+    reports: List[CaseReport], latency_budget_sec: Optional[float] = None
+) -> None:
+    print("\nEvaluation Results:")
+    print(
+        f"{'case':<28} {'acc':>5} {'latency':>8} {'llm':>4} {'tools':>5} "
+        f"{'prompt':>7} {'compl':>6} {'ground':>6}  checks"
+    )
+    for r in reports:
+        accuracy = (
+            "err" if r.error else ("-" if r.accuracy is None else f"{r.accuracy:.2f}")
+        )
+        failed = [name for name, ok in r.checks.items() if not ok]
+        grounded = "-" if r.grounded is None else ("yes" if r.grounded else "NO")
+        print(
+            f"{r.case_id[:28]:<28} {accuracy:>5} {r.latency_sec:>7.2f}s {r.llm_requests:>4} "
+            f"{r.tool_calls:>5} {r.request_tokens:>7} {r.response_tokens:>6} {grounded:>6}  "
+            f"{'failed: ' + ', '.join(failed) if failed else r.error or 'ok'}"
+        )
+
+    scored = [r.accuracy for r in reports if r.accuracy is not None]
+    print()
+    print(f"Cases: {len(reports)}  errors: {sum(1 for r in reports if r.error)}")
+    if scored:
+        print(f"Mean accuracy: {statistics.mean(scored):.3f}")
+    check_names = sorted({name for r in reports for name in r.checks})
+    for name in check_names:
+        results = [r.checks[name] for r in reports if name in r.checks]
+        print(f"  {name}: {sum(results)}/{len(results)}")
+    grounding = [
+        snippet.status
+        for r in reports
+        if r.result is not None and r.result.grounding is not None
+        for snippet in r.result.grounding.snippets.values()
+    ]
+    if grounding:
+        counts = {status: grounding.count(status) for status in sorted(set(grounding))}
+        print(
+            f"Grounded cases: {sum(1 for r in reports if r.grounded)}/"
+            f"{sum(1 for r in reports if r.grounded is not None)}  snippets: "
+            + ", ".join(f"{status} {n}" for status, n in counts.items())
+        )
+    answered_by = [r.result.answered_by for r in reports if r.result is not None]
+    if any(answered_by):
+        print(
+            "Answered by: "
+            + ", ".join(
+                f"{name} {answered_by.count(name)}"
+                for name in sorted(set(answered_by), key=str)
+            )
+        )
+    if routing_stats.runs:
+        print(routing_stats.summary())
+    print(
+        f"Tokens: prompt {sum(r.request_tokens for r in reports)}, "
+        f"completion {sum(r.response_tokens for r in reports)}; "
+        f"tool calls {sum(r.tool_calls for r in reports)}"
+    )
+    usages = [r.result.usage for r in reports if r.result and r.result.usage]
+    if usages:
+        print()
+        print(usage_tables(usages))
+    if latency_budget_sec is not None:
+        over = sorted(
+            (r for r in reports if not r.error and r.latency_sec > latency_budget_sec),
+            key=lambda r: r.latency_sec,
+            reverse=True,
+        )
+        print(f"\nOver the {latency_budget_sec:.1f}s budget: {len(over)}")
+        for r in over:
+            print(
+                f"  {r.case_id} ({r.opp_id}): {r.latency_sec:.2f}s, "
+                f"{r.llm_requests} LLM requests, {r.tool_calls} tool calls, "
+                f"{r.total_tokens} tokens"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tech stack extraction evals")
+    parser.add_argument("cases", help="Path to a JSON list of labeled cases")
+    parser.add_argument(
+        "--mode", choices=["live", "record", "replay"], default="replay"
+    )
+    parser.add_argument("--cassette-dir", default="cassettes")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--context-token-budget", type=int, default=6000)
+    parser.add_argument("--report", default=None, help="Write the JSON report here")
+    parser.add_argument(
+        "--latency-budget",
+        type=float,
+        default=None,
+        help="list the cases whose run took longer than this many seconds",
+    )
+    parser.add_argument(
+        "--no-tags",
+        action="store_true",
+        help="do not look up transcript tags (needed for cassettes recorded before tagging)",
+    )
+    parser.add_argument(
+        "--no-digests",
+        action="store_true",
+        help="do not offer the agent the per-call digests tool",
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="live/record: run gpt-4o-mini first and escalate to gpt-4o when needed",
+    )
+    args = parser.parse_args()
+
+    reports = asyncio.run(
+        run_evals(
+            load_cases(args.cases),
+            mode=args.mode,
+            cassette_dir=args.cassette_dir,
+            max_concurrency=args.max_concurrency,
+            context_token_budget=args.context_token_budget,
+            use_tags=not args.no_tags,
+            tiers=DEFAULT_TIERS if args.cascade else None,
+            use_digests=not args.no_digests,
+        )
+    )
+    print_report(reports, latency_budget_sec=args.latency_budget)
+
+    if args.report:
+        Path(args.report).write_text(
+            json.dumps([r.model_dump(mode="json") for r in reports], indent=2)
+        )
+
+
+if __name__ == "__main__":
+    main()
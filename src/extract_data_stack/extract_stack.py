@@ -1,9 +1,32 @@
+import asyncio
+import time
+from functools import lru_cache
+
 from pydantic_ai import Agent, RunContext
+from pydantic_ai.tools import ToolDefinition
+from pydantic_ai.agent import AgentRunResult
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.usage import Usage
 from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
 from enum import Enum
 from typing import List, Optional, Literal
-import turbopuffer as tpuf
 from helper import embed_text, consolidate_and_print_metadata
+from context_assembly import assemble_context, chunks_for_budget
+from cascade import DEFAULT_TIERS, CascadeTier, escalation_reason, routing_stats
+from grounding import SNIPPET_FIELDS, GroundingReport, verify_grounding
+from shared.cassette import recorded, rows_from_dicts, rows_to_dicts
+from shared.digests import digest_for_agent, fetch_opportunity_digests
+from shared.metrics import RunUsage, collect_usage, current_usage, timed, tool_call
+from shared.profiling import profiled, profiling_enabled
+from shared.retrieval import two_phase_query
+from tag_evidence import (
+    TagVerdict,
+    fetch_tag_evidence,
+    find_unambiguous_stack,
+    mention_filters,
+    tag_hint,
+)
 import os
 from typing import Annotated
 from tech_stack_enums import OrchestrationTool, CloudProvider
@@ -39,6 +62,10 @@ class TechStackResult(BaseModel):
         None,
         description="Relevant transcript snippet for cloud provider",
     )
+    # Filled in after the run; not part of the schema the model sees.
+    grounding: SkipJsonSchema[Optional[GroundingReport]] = None
+    answered_by: SkipJsonSchema[Optional[str]] = None
+    usage: SkipJsonSchema[Optional[RunUsage]] = None
 
 
 class OpportunityContext(BaseModel):
@@ -47,11 +74,29 @@ class OpportunityContext(BaseModel):
     gong_primary_opportunity_c: str = Field(
         description="The Gong primary opportunity ID"
     )
+    context_token_budget: int = Field(
+        6000,
+        description="Approximate token budget for transcript context returned by the retrieval tool",
+    )
+    retrieved_chunks: List[str] = Field(
+        default_factory=list,
+        description="Transcript text returned to the agent by the retrieval tool",
+    )
+    use_digests: bool = Field(
+        True, description="Offer the agent the per-call digests tool"
+    )
+    tag_hint: Optional[str] = Field(
+        None,
+        description="Note on the opportunity's unambiguous ingestion-time tags, added to the prompt",
+    )
 
 
 # Define the agent with proper typing and configuration
 tech_stack_agent = Agent(
     model="openai:gpt-4o",
+    # The OpenAI provider (and its API key) is resolved on the first run, so
+    # importing this module works without credentials.
+    defer_model_check=True,
     deps_type=OpportunityContext,
     result_type=TechStackResult,
     system_prompt="""
@@ -61,45 +106,122 @@ tech_stack_agent = Agent(
     2. Identify their previous/current orchestration tools and cloud providers
     3. Provide confidence scores and relevant snippets to support your analysis
     
-    Use the query_transcript_vector_db_for_transcripts tool to find relevant information.
+    If the read_call_digests tool is available, start with it: digests are short
+    summaries of every call with verbatim evidence quotes. When the digests name
+    the orchestration tools and cloud provider and quote them, answer from them,
+    using the quotes as snippets.
+    Otherwise use the query_transcript_vector_db_for_transcripts tool to find relevant information.
     Always explain your reasoning and provide evidence from the transcripts.
     """,
 )
 
 
+TRANSCRIPT_NAMESPACE = "tay-sales-calls"
+# Phase one ranks on small attributes only; the heavy ones are fetched by id
+# for the chunks that fit in the context budget.
+RANK_ATTRIBUTES = [
+    "gong_call_id_c",
+    "chunk_index",
+    "gong_primary_opportunity_c",
+]
+HEAVY_ATTRIBUTES = [
+    "transcript_text",
+    "name",
+    "gong_participants_emails_c",
+    "gong_title_c",
+    "gong_call_brief_c",
+    "gong_call_start_c",
+]
+EXTRACTION_PROMPT = "Analyze the customer's data stack and identify their orchestration tools and cloud providers."
+
+
+def extraction_prompt(context: OpportunityContext) -> str:
+    if not context.tag_hint:
+        return EXTRACTION_PROMPT
+    return f"{EXTRACTION_PROMPT}\n\n{context.tag_hint}"
+
+
+def search_transcripts(
+    opp_id: str,
+    query_text: str,
+    top_k: int,
+    fetch_top_n: Optional[int] = None,
+    mentions: Optional[List[str]] = None,
+) -> list:
+    """
+    Embeds `query_text` and queries the opportunity's transcript chunks,
+    fetching transcript text only for the best `fetch_top_n` chunks. With
+    `mentions`, only chunks tagged with one of those tools or clouds are
+    searched. Recorded as a single interaction when a cassette is active.
+    """
+
+    def run_query():
+        with timed("embed"):
+            query_vector = embed_text(query_text)
+
+        filters = ["gong_primary_opportunity_c", "Eq", opp_id]
+        mention_filter = mention_filters(mentions or [])
+        if mention_filter:
+            filters = ["And", [filters, mention_filter]]
+
+        with timed("tpuf_query"):
+            return two_phase_query(
+                TRANSCRIPT_NAMESPACE,
+                vector=query_vector,
+                top_k=top_k,
+                filters=filters,
+                rank_attributes=RANK_ATTRIBUTES,
+                heavy_attributes=HEAVY_ATTRIBUTES,
+                fetch_top_n=fetch_top_n,
+            )
+
+    request = {
+        "opp_id": opp_id,
+        "query_text": query_text,
+        "top_k": top_k,
+        "fetch_top_n": fetch_top_n,
+    }
+    if mentions:
+        # Only keyed when set, so cassettes recorded before tagging still match.
+        request["mentions"] = mentions
+    return recorded(
+        "search_transcripts",
+        request,
+        run_query,
+        serialize=rows_to_dicts,
+        deserialize=rows_from_dicts,
+    )
+
+
 @tech_stack_agent.tool
+@profiled
 async def query_transcript_vector_db_for_transcripts(
     ctx: RunContext[OpportunityContext],
     query_text: str = "What is the customer's data stack?",
     top_k: int = 3,
-) -> List[dict]:
-    """Query the vector database for relevant transcript snippets"""
-    query_vector = embed_text(query_text)
-    namespace = "tay-sales-calls"
-    ns = tpuf.Namespace(namespace)
-
-    filters = [
-        "gong_primary_opportunity_c",
-        "Eq",
-        ctx.deps.gong_primary_opportunity_c,
-    ]
+    mentions: Optional[List[str]] = None,
+) -> dict:
+    """
+    Query the vector database for relevant transcript snippets.
 
-    results = ns.query(
-        vector=query_vector,
-        distance_metric="cosine_distance",
-        top_k=top_k,
-        filters=filters,
-        include_attributes=[
-            "transcript_text",
-            "name",
-            "gong_call_id_c",
-            "gong_participants_emails_c",
-            "gong_primary_opportunity_c",
-            "gong_title_c",
-            "gong_call_brief_c",
-            "gong_call_start_c",
-        ],
-    )
+    Args:
+        query_text: What to search the transcripts for.
+        top_k: Number of transcript chunks to return.
+        mentions: Optional orchestration tool or cloud provider names (e.g.
+            "Airflow (MWAA) AWS Managed", "AWS"); only chunks that mention
+            one of them are searched.
+    """
+    # Run the blocking embedding + query calls off the event loop so that
+    # concurrent extractions do not serialize on them.
+    with tool_call():
+        results = await asyncio.to_thread(
+            search_transcripts,
+            ctx.deps.gong_primary_opportunity_c,
+            query_text,
+            top_k,
+            chunks_for_budget(ctx.deps.context_token_budget),
+            mentions,
+        )
 
     consolidate_and_print_metadata(results)
 
@@ -108,26 +230,250 @@ async def query_transcript_vector_db_for_transcripts(
             f"No transcript snippets returned for opportunity id {ctx.deps.gong_primary_opportunity_c}"
         )
 
-    return results
+    # Merge overlapping chunks of the same call and fit them into the token budget
+    context = assemble_context(results, token_budget=ctx.deps.context_token_budget)
+    ctx.deps.retrieved_chunks.extend(
+        segment["transcript_text"]
+        for call in context["calls"]
+        for segment in call.get("segments", [])
+    )
+    return context
+
+
+async def _digests_enabled(
+    ctx: RunContext[OpportunityContext], tool_def: ToolDefinition
+) -> Optional[ToolDefinition]:
+    return tool_def if ctx.deps.use_digests else None
+
+
+@tech_stack_agent.tool(prepare=_digests_enabled)
+@profiled
+async def read_call_digests(ctx: RunContext[OpportunityContext]) -> dict:
+    """
+    Read compact digests of the opportunity's calls, most recent first: a
+    summary, tools mentioned, infrastructure, stakeholders, pain points and
+    verbatim evidence quotes per call. Much cheaper than transcript search.
+    """
+    with tool_call("digests"):
+        rows = await asyncio.to_thread(
+            fetch_opportunity_digests,
+            TRANSCRIPT_NAMESPACE,
+            ctx.deps.gong_primary_opportunity_c,
+        )
+    digests = [digest_for_agent(row) for row in rows]
+    # The quotes shown are the exact transcript spans the digest's quotes
+    # matched when it was written (see shared.digests), so snippets are
+    # grounded against transcript text, not the digest's own wording.
+    ctx.deps.retrieved_chunks.extend(
+        quote for digest in digests for quote in digest["evidence_quotes"]
+    )
+    if not digests:
+        return {"calls": [], "note": "No digests; search the transcripts instead."}
+    return {"calls": digests}
+
+
+def ground_result(result: TechStackResult, context: OpportunityContext) -> None:
+    """Attaches the grounding of the result's snippets in the retrieved text."""
+    result.grounding = verify_grounding(
+        {field: getattr(result, field) for field in SNIPPET_FIELDS},
+        context.retrieved_chunks,
+    )
+
+
+class TimedModel(WrapperModel):
+    """Records each request's latency and tokens in the active RunUsage."""
+
+    async def request(self, *args, **kwargs):
+        start = time.perf_counter()
+        response, usage = await super().request(*args, **kwargs)
+        run_usage = current_usage()
+        if run_usage is not None:
+            run_usage.add_turn(
+                time.perf_counter() - start,
+                request_tokens=usage.request_tokens or 0,
+                response_tokens=usage.response_tokens or 0,
+            )
+        return response, usage
+
+
+@lru_cache(maxsize=None)
+def _timed_known_model(name: str) -> TimedModel:
+    return TimedModel(name)
+
+
+def timed_model(model) -> TimedModel:
+    """
+    Wraps `model` in a TimedModel. Models given by name are inferred once
+    and reused, so repeated runs share one provider client.
+    """
+    if isinstance(model, str):
+        return _timed_known_model(model)
+    return TimedModel(model)
+
+
+async def run_cascade(
+    opp_id: str,
+    context_token_budget: int,
+    tiers: List[CascadeTier],
+    tag_rows: Optional[list] = None,
+    use_digests: bool = True,
+    tag_hint: Optional[str] = None,
+):
+    """
+    Runs the agent with each tier's model in turn until a tier's answer is
+    kept (see cascade). Returns the kept run and its context; the run's
+    usage includes the escalated tiers.
+    """
+    usage = Usage()
+    for i, tier in enumerate(tiers):
+        context = OpportunityContext(
+            gong_primary_opportunity_c=opp_id,
+            context_token_budget=context_token_budget,
+            use_digests=use_digests,
+            tag_hint=tag_hint,
+        )
+        start = time.perf_counter()
+        result = await tech_stack_agent.run(
+            extraction_prompt(context),
+            deps=context,
+            model=timed_model(tier.model),
+            usage=usage,
+        )
+        routing_stats.record_run(tier.name, time.perf_counter() - start)
+
+        is_last = i == len(tiers) - 1
+        reason = None if is_last else escalation_reason(result.data, tier, tag_rows)
+        if reason is None:
+            routing_stats.record_answer(tier.name)
+            result.data.answered_by = tier.name
+            return result, context
+        routing_stats.record_escalation(tier.name, reason)
+        print(f"⤴️ {tier.name} answer for {opp_id} escalated: {reason}")
+
+
+async def run_extraction(
+    opp_id: str,
+    context_token_budget: int = 6000,
+    model=None,
+    use_tags: bool = True,
+    tiers: Optional[List[CascadeTier]] = None,
+    use_digests: bool = True,
+) -> AgentRunResult:
+    """
+    Runs the tech stack agent for one opportunity without the Prefect flow
+    wrapper, so several extractions can run concurrently. `model` overrides
+    the agent's model (e.g. a pydantic_ai FunctionModel for offline runs).
+    With `use_tags`, unambiguous ingestion-time tags are noted in the prompt
+    as a hint the agent confirms in the transcripts (see tag_evidence), and
+    the answer comes from the model cascade (`tiers`, default DEFAULT_TIERS)
+    starting at its cheapest tier, which escalates only if its answer is
+    unsure or contradicts the tags. With `tiers` (and no `model`), every
+    answer comes from the cascade.
+    With `use_digests`, the agent can read per-call digests before searching
+    raw transcript chunks. The result's `usage` holds the run's LLM turns, tokens, tool calls and
+    retrieval timings (see shared.metrics).
+    """
+    with collect_usage() as usage:
+        tag_rows = None
+        hint = None
+        if use_tags:
+            with timed("tag_lookup"):
+                tag_rows = await asyncio.to_thread(
+                    fetch_tag_evidence, TRANSCRIPT_NAMESPACE, opp_id
+                )
+                verdict: Optional[TagVerdict] = await asyncio.to_thread(
+                    find_unambiguous_stack,
+                    TRANSCRIPT_NAMESPACE,
+                    opp_id,
+                    rows=tag_rows,
+                )
+            if verdict is not None:
+                hint = tag_hint(verdict)
+                print(
+                    f"🏷️ Tags for {opp_id} point at {verdict.tool.value} on "
+                    f"{verdict.cloud.value}; asking the cheapest tier to confirm"
+                )
+
+        if model is None and (tiers or hint is not None):
+            result, context = await run_cascade(
+                opp_id,
+                context_token_budget,
+                tiers or DEFAULT_TIERS,
+                tag_rows=tag_rows,
+                use_digests=use_digests,
+                tag_hint=hint,
+            )
+        else:
+            context = OpportunityContext(
+                gong_primary_opportunity_c=opp_id,
+                context_token_budget=context_token_budget,
+                use_digests=use_digests,
+                tag_hint=hint,
+            )
+            answered_by = timed_model(model or tech_stack_agent.model)
+            result = await tech_stack_agent.run(
+                extraction_prompt(context),
+                deps=context,
+                model=answered_by,
+            )
+            result.data.answered_by = answered_by.model_name
+        # Grounding is CPU-bound; keep it off the event loop that serves
+        # concurrent extractions.
+        await asyncio.to_thread(ground_result, result.data, context)
+    result.data.usage = usage
+    return result
+
+
+def format_usage(usage: RunUsage) -> str:
+    llm_sec = sum(usage.llm_turn_sec)
+    return (
+        f"{usage.total_sec:.2f}s total, {usage.llm_requests} LLM requests "
+        f"({llm_sec:.2f}s), {usage.tool_calls} tool calls, "
+        f"{usage.request_tokens} prompt + {usage.response_tokens} completion tokens"
+    )
 
 
 @flow(log_prints=True)
-def extract_data_stack(opp_id: str) -> TechStackResult:
+def extract_data_stack(
+    opp_id: str,
+    context_token_budget: int = 6000,
+    profile: bool = False,
+    use_tags: bool = True,
+    cascade: bool = False,
+    use_digests: bool = True,
+) -> TechStackResult:
     """
     Extract information about the data stack from call transcripts
     filtered by the provided opportunity ID.
 
     Args:
         opp_id: The Gong primary opportunity ID
+        context_token_budget: Approximate token budget for each retrieval tool result
+        profile: Profile each retrieval tool call (see shared.profiling)
+        use_tags: Note unambiguous ingestion-time tech tags in the prompt as
+            a hint for the agent to confirm
+        cascade: Try gpt-4o-mini first and escalate to gpt-4o only for
+            low-confidence answers or answers that contradict the tags
+        use_digests: Let the agent read per-call digests before searching
+            raw transcript chunks
 
     Returns:
         TechStackResult containing the extracted tech stack information,
         confidence score, and supporting evidence
     """
-    context = OpportunityContext(gong_primary_opportunity_c=opp_id)
-    result = tech_stack_agent.run_sync(
-        "Analyze the customer's data stack and identify their orchestration tools and cloud providers.",
-        deps=context,
+    with profiling_enabled(profile):
+        result = asyncio.run(
+            run_extraction(
+                opp_id,
+                context_token_budget=context_token_budget,
+                use_tags=use_tags,
+                tiers=DEFAULT_TIERS if cascade else None,
+                use_digests=use_digests,
+            )
+        )
+    grounding = ", ".join(
+        f"{name.removesuffix('_snippet')}: {g.status}"
+        for name, g in result.data.grounding.snippets.items()
     )
     print(f"""
     Tech Stack for {opp_id}:
@@ -146,17 +492,23 @@ def extract_data_stack(opp_id: str) -> TechStackResult:
     • {result.data.cloud_provider_snippet}
     ___ ___ ___
 
+    Snippet Grounding: {grounding}
+    Answered By: {result.data.answered_by}
+    Usage: {format_usage(result.data.usage)}
+
     """)
+    if cascade:
+        print(routing_stats.summary())
 
     return result.data
 
 
 if __name__ == "__main__":
     opp_ids = [
-        '006Rm00000QuHC6IAN',
-        '006Rm00000R5yiLIAR',
-        '006Rm00000OemRXIAZ',
-        '006Rm00000OG8LZIA1'
+        "006Rm00000QuHC6IAN",
+        "006Rm00000R5yiLIAR",
+        "006Rm00000OemRXIAZ",
+        "006Rm00000OG8LZIA1",
     ]
     tech_stacks = []
     for opp_id in opp_ids:
@@ -4,8 +4,7 @@ from pydantic_ai import Agent, RunContext
 from pydantic import BaseModel, Field
 from enum import Enum
 from typing import List, Optional, Literal
-import turbopuffer as tpuf
-from helper import embed_text, consolidate_and_print_metadata
+from helper import embed_text, consolidate_and_print_metadata, get_namespace
 import os
 from typing import Annotated
 from tech_stack_enums import OrchestrationTool
@@ -73,7 +72,7 @@ async def query_transcript_vector_db_for_transcripts(
     """Query the vector database for relevant transcript snippets"""
     query_vector = embed_text(query_text)
     namespace = "tay-sales-calls"
-    ns = tpuf.Namespace(namespace)
+    ns = get_namespace(namespace)
 
     filters = [
         "gong_primary_opportunity_c",
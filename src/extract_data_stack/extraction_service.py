@@ -0,0 +1,306 @@
+# src/extract_data_stack/extraction_service.py
+"""
+Long-running extraction service.
+
+Running `extract_data_stack` as a script pays for the prefect and
+pydantic_ai imports, the agent construction and fresh OpenAI and
+turbopuffer connections on every invocation. The service pays them once:
+one process keeps the agent, the model clients (on a single, long-lived
+event loop, so their async connection pools stay open), the embedding
+client, the turbopuffer session and the chunk cache warm, and serves
+extractions over a local HTTP interface:
+
+    POST /extract   {"opp_id": "006Rm00000QuHC6IAN", "cascade": false,
+                     "use_tags": true, "use_digests": true,
+                     "context_token_budget": 6000}
+                    -> the TechStackResult as JSON, with its usage
+    GET  /healthz   -> {"status": "ok"}
+    GET  /stats     -> queue depth, in-flight, completed and cancelled
+                       requests, queue-wait and run latency percentiles
+
+Requests wait in a bounded queue for one of `concurrency` workers; when
+the queue is full, /extract answers 503 right away instead of queueing
+without bound. A request that is not answered within the timeout answers
+504 and its job is cancelled, so abandoned work does not hold a worker.
+
+Usage:
+    python src/cli.py serve --port 8765 --concurrency 8
+    curl -s localhost:8765/extract -d '{"opp_id": "006Rm00000QuHC6IAN"}'
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from cascade import DEFAULT_TIERS, routing_stats
+from extract_stack import TRANSCRIPT_NAMESPACE, run_extraction, timed_model
+from helper import embed_text, get_namespace
+from pydantic import BaseModel
+from shared.clients import get_openai_client
+from shared.metrics import summarize
+
+# Latencies kept for /stats.
+STATS_WINDOW = 1000
+
+
+class ExtractionRequest(BaseModel):
+    opp_id: str
+    context_token_budget: int = 6000
+    use_tags: bool = True
+    use_digests: bool = True
+    cascade: bool = False
+
+
+class QueueFull(Exception):
+    """Raised when the request queue has no room."""
+
+
+@dataclass
+class _Job:
+    request: ExtractionRequest
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    # The running extraction, once a worker has picked the job up.
+    task: Optional[asyncio.Task] = None
+
+
+class ExtractionService:
+    """A bounded request queue served by `concurrency` extraction workers."""
+
+    def __init__(self, concurrency: int = 8, queue_size: int = 64):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.loop = asyncio.new_event_loop()
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="extraction-service", daemon=True
+        )
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.queue_wait_sec: deque = deque(maxlen=STATS_WINDOW)
+        self.run_sec: deque = deque(maxlen=STATS_WINDOW)
+        self.started_at = time.time()
+
+    def start(self, warmup: bool = True) -> None:
+        self._thread.start()
+        if warmup:
+            self.warm_up()
+        asyncio.run_coroutine_threadsafe(self._start_workers(), self.loop).result()
+
+    def warm_up(self) -> None:
+        """
+        Creates the clients and opens their connections before the first
+        request: the embedding client and turbopuffer session with one call
+        each, and the tier models' async OpenAI clients with a model lookup
+        on the service loop, whose connection pool they keep.
+        """
+        started = time.perf_counter()
+        get_openai_client()
+        embed_text("warm-up")
+        get_namespace(TRANSCRIPT_NAMESPACE).exists()
+        asyncio.run_coroutine_threadsafe(
+            self._open_model_connections(), self.loop
+        ).result()
+        print(f"🔥 Warmed up in {time.perf_counter() - started:.2f}s")
+
+    async def _open_model_connections(self) -> None:
+        for tier in DEFAULT_TIERS:
+            model = timed_model(tier.model)
+            client = getattr(model, "client", None)
+            if client is not None:
+                await client.models.retrieve(model.model_name)
+
+    def stop(self) -> None:
+        """Cancels the workers and their jobs and stops the service loop."""
+
+        async def cancel_workers() -> None:
+            workers = [
+                task
+                for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            ]
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(cancel_workers(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    async def _start_workers(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        for i in range(self.concurrency):
+            self.loop.create_task(self._worker(), name=f"extraction-worker-{i}")
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            if job.future.done():
+                # Timed out while queued.
+                self.cancelled += 1
+                self._queue.task_done()
+                continue
+            self.queue_wait_sec.append(time.perf_counter() - job.enqueued_at)
+            self.in_flight += 1
+            started = time.perf_counter()
+            request = job.request
+            job.task = self.loop.create_task(
+                run_extraction(
+                    request.opp_id,
+                    context_token_budget=request.context_token_budget,
+                    use_tags=request.use_tags,
+                    tiers=DEFAULT_TIERS if request.cascade else None,
+                    use_digests=request.use_digests,
+                )
+            )
+            try:
+                run = await job.task
+            except asyncio.CancelledError:
+                if not job.future.cancelled():
+                    # The worker itself is being stopped.
+                    raise
+                # Timed out; the caller has already been answered.
+                self.cancelled += 1
+            except Exception as e:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self.completed += 1
+                if not job.future.done():
+                    job.future.set_result(run.data)
+            finally:
+                self.in_flight -= 1
+                self.run_sec.append(time.perf_counter() - started)
+                self._queue.task_done()
+
+    async def _submit(self, request: ExtractionRequest, timeout: float):
+        job = _Job(request=request, future=self.loop.create_future())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull(f"{self.queue_size} requests already queued")
+        try:
+            return await asyncio.wait_for(job.future, timeout)
+        except asyncio.TimeoutError:
+            # wait_for cancelled the future, so a queued job is skipped;
+            # a running one is cancelled. Blocking calls it runs in threads
+            # finish in the background, but their results are dropped.
+            if job.task is not None:
+                job.task.cancel()
+            raise
+
+    def extract(self, request: ExtractionRequest, timeout: float = 300):
+        """
+        Queues `request` and blocks until it is answered. Safe to call from
+        any thread but the service loop's. Raises QueueFull, TimeoutError
+        or the extraction's own exception.
+        """
+        submitted = asyncio.run_coroutine_threadsafe(
+            self._submit(request, timeout), self.loop
+        )
+        try:
+            return submitted.result()
+        except (asyncio.TimeoutError, FutureTimeout):
+            raise TimeoutError(f"No answer for {request.opp_id} in {timeout}s")
+
+    async def _stats(self) -> Dict[str, Any]:
+        return {
+            "uptime_sec": round(time.time() - self.started_at, 1),
+            "concurrency": self.concurrency,
+            "queued": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "queue_wait_sec": summarize(list(self.queue_wait_sec)),
+            "run_sec": summarize(list(self.run_sec)),
+            "cascade": routing_stats.as_dict(),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return asyncio.run_coroutine_threadsafe(self._stats(), self.loop).result()
+
+
+def make_handler(service: ExtractionService, request_timeout: float):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Any) -> None:
+            payload = json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/healthz":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._send(200, service.stats())
+            else:
+                self._send(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/extract":
+                self._send(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                request = ExtractionRequest.model_validate_json(
+                    self.rfile.read(length) or b"{}"
+                )
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            try:
+                result = service.extract(request, timeout=request_timeout)
+            except QueueFull as e:
+                self._send(503, {"error": str(e)})
+            except TimeoutError as e:
+                self._send(504, {"error": str(e)})
+            except Exception as e:
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            else:
+                self._send(200, result.model_dump(mode="json"))
+
+        def log_message(self, format, *args):
+            print(f"🌐 {self.address_string()} {format % args}")
+
+    return Handler
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    concurrency: int = 8,
+    queue_size: int = 64,
+    request_timeout: float = 300,
+    warmup: bool = True,
+) -> None:
+    """Runs the extraction service until interrupted."""
+    service = ExtractionService(concurrency=concurrency, queue_size=queue_size)
+    service.start(warmup=warmup)
+    server = ThreadingHTTPServer((host, port), make_handler(service, request_timeout))
+    print(
+        f"🚀 Serving extractions on http://{host}:{port} "
+        f"({concurrency} workers, queue of {queue_size})"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
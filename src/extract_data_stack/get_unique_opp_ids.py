@@ -1,6 +1,4 @@
-import turbopuffer as tpuf
-import os
-from dotenv import load_dotenv
+from helper import get_namespace
 
 
 def get_unique_gong_primary_opportunities(
@@ -11,14 +9,8 @@ def get_unique_gong_primary_opportunities(
     Query the vectorstore for documents in the specified namespace,
     and return a list of unique 'gong_primary_opportunity_c' values.
     """
-    load_dotenv()
-
-    # Configure the Turbopuffer API
-    tpuf.api_key = os.getenv("TURBOPUFFER_API_KEY")
-    tpuf.api_base_url = "https://gcp-us-central1.turbopuffer.com"
-
     # Instantiate the namespace
-    ns = tpuf.Namespace(namespace)
+    ns = get_namespace(namespace)
 
     # Query the namespace.
     results = ns.query(top_k=top_k, include_attributes=["gong_primary_opportunity_c"])
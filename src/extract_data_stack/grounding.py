@@ -0,0 +1,198 @@
+# src/extract_data_stack/grounding.py
+"""
+Checks that the snippets an extraction quotes actually occur in the
+transcript text the agent retrieved.
+
+The retrieved chunks are normalized (lowercase, punctuation and runs of
+whitespace collapsed to single spaces) and indexed with a suffix automaton,
+which recognizes every substring of the chunks. Scoring a snippet then walks
+the automaton once over the normalized snippet:
+
+    exact    the whole snippet is a substring of one chunk
+    fuzzy    at least `fuzzy_threshold` of its characters are covered by
+             verbatim pieces of `min_match_chars` or more (paraphrased
+             joins, dropped filler words, elided middles)
+    missing  anything less
+    empty    the extraction gave no snippet
+
+Building the index is linear in the retrieved text and scoring is linear in
+the snippet length, so grounding can run on every extraction.
+"""
+
+import re
+from typing import Dict, Iterable, List, Literal, Optional
+
+from pydantic import BaseModel
+
+GroundingStatus = Literal["exact", "fuzzy", "missing", "empty"]
+
+# Snippet fields of TechStackResult that are checked.
+SNIPPET_FIELDS = ["primary_previous_solution_snippet", "cloud_provider_snippet"]
+
+# Separates chunks in the automaton; never produced by normalize().
+_CHUNK_SEPARATOR = "\x00"
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+class SuffixAutomaton:
+    """Suffix automaton over a set of texts."""
+
+    def __init__(self, texts: Iterable[str] = ()):
+        # State 0 is the initial state.
+        self.transitions: List[Dict[str, int]] = [{}]
+        self.links: List[int] = [-1]
+        self.lengths: List[int] = [0]
+        self._last = 0
+        for text in texts:
+            self.add_text(text)
+
+    def add_text(self, text: str) -> None:
+        for char in text:
+            self._extend(char)
+        self._extend(_CHUNK_SEPARATOR)
+
+    def _new_state(self, length: int, link: int, transitions: Dict[str, int]) -> int:
+        self.transitions.append(transitions)
+        self.links.append(link)
+        self.lengths.append(length)
+        return len(self.lengths) - 1
+
+    def _extend(self, char: str) -> None:
+        current = self._new_state(self.lengths[self._last] + 1, -1, {})
+        state = self._last
+        while state != -1 and char not in self.transitions[state]:
+            self.transitions[state][char] = current
+            state = self.links[state]
+
+        if state == -1:
+            self.links[current] = 0
+        else:
+            target = self.transitions[state][char]
+            if self.lengths[state] + 1 == self.lengths[target]:
+                self.links[current] = target
+            else:
+                clone = self._new_state(
+                    self.lengths[state] + 1,
+                    self.links[target],
+                    dict(self.transitions[target]),
+                )
+                while state != -1 and self.transitions[state].get(char) == target:
+                    self.transitions[state][char] = clone
+                    state = self.links[state]
+                self.links[target] = clone
+                self.links[current] = clone
+        self._last = current
+
+    def longest_prefix_match(self, text: str, start: int) -> int:
+        """Length of the longest prefix of text[start:] that occurs in the texts."""
+        state = 0
+        position = start
+        while position < len(text):
+            state = self.transitions[state].get(text[position], -1)
+            if state == -1:
+                break
+            position += 1
+        return position - start
+
+    def match_starts(self, text: str) -> List[int]:
+        """
+        Matching statistics of `text` in one pass: for every end position
+        `end` in 0..len(text), the smallest `start` such that text[start:end]
+        occurs in the texts. On a mismatch the walk follows suffix links
+        instead of restarting, so the whole pass is linear in len(text).
+        """
+        starts = [0]
+        state = 0
+        length = 0
+        for end, char in enumerate(text, start=1):
+            while state != 0 and char not in self.transitions[state]:
+                state = self.links[state]
+                length = self.lengths[state]
+            if char in self.transitions[state]:
+                state = self.transitions[state][char]
+                length += 1
+            else:
+                length = 0
+            starts.append(end - length)
+        return starts
+
+    def contains(self, text: str) -> bool:
+        return self.longest_prefix_match(text, 0) == len(text)
+
+
+class SnippetGrounding(BaseModel):
+    status: GroundingStatus
+    coverage: float = 0.0
+
+
+class GroundingReport(BaseModel):
+    """Per-snippet grounding of one extraction."""
+
+    snippets: Dict[str, SnippetGrounding] = {}
+
+    @property
+    def grounded(self) -> bool:
+        """True if no quoted snippet is missing from the retrieved text."""
+        return all(s.status != "missing" for s in self.snippets.values())
+
+
+class GroundingIndex:
+    """Normalized suffix-automaton index over retrieved chunks."""
+
+    def __init__(
+        self,
+        chunks: Iterable[str],
+        min_match_chars: int = 12,
+        fuzzy_threshold: float = 0.6,
+    ):
+        self.automaton = SuffixAutomaton(normalize(chunk) for chunk in chunks)
+        self.min_match_chars = min_match_chars
+        self.fuzzy_threshold = fuzzy_threshold
+
+    def coverage(self, normalized_snippet: str) -> float:
+        """
+        Fraction of the snippet's characters covered by verbatim pieces of at
+        least `min_match_chars`, matched greedily left to right.
+        """
+        # text[i:end] occurs iff starts[end] <= i, and starts never decreases,
+        # so the longest match from i ends at the last `end` with
+        # starts[end] <= i. Both i and end only move forward.
+        starts = self.automaton.match_starts(normalized_snippet)
+        covered = 0
+        i = 0
+        end = 0
+        while i < len(normalized_snippet):
+            while end + 1 < len(starts) and starts[end + 1] <= i:
+                end += 1
+            length = end - i
+            if length >= self.min_match_chars:
+                covered += length
+                i = end
+            else:
+                i += 1
+        return covered / len(normalized_snippet)
+
+    def score(self, snippet: Optional[str]) -> SnippetGrounding:
+        normalized = normalize(snippet or "")
+        if not normalized:
+            return SnippetGrounding(status="empty")
+        if self.automaton.contains(normalized):
+            return SnippetGrounding(status="exact", coverage=1.0)
+
+        coverage = self.coverage(normalized)
+        status = "fuzzy" if coverage >= self.fuzzy_threshold else "missing"
+        return SnippetGrounding(status=status, coverage=round(coverage, 3))
+
+
+def verify_grounding(
+    snippets: Dict[str, Optional[str]], chunks: List[str], **index_kwargs
+) -> GroundingReport:
+    """Scores each named snippet against the retrieved `chunks`."""
+    index = GroundingIndex(chunks, **index_kwargs)
+    return GroundingReport(
+        snippets={name: index.score(snippet) for name, snippet in snippets.items()}
+    )
@@ -1,34 +1,10 @@
-import turbopuffer as tpuf
-import os
-import datetime
-import json
-import os
-from typing import Any, Dict, List
-
-from dotenv import load_dotenv
-from openai import OpenAI
-
-
-def embed_text(text: str) -> List[float]:
-    """
-    Generates an embedding vector for the provided text using OpenAI's API.
-    """
-
-    load_dotenv()
-
-    # Initialize the OpenAI client once
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    if not OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY is not set in the environment variables.")
-
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
-    try:
-        response = client.embeddings.create(input=text, model="text-embedding-3-small")
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error embedding text: {e}")
-        return []
+from shared.clients import (
+    embed_text,
+    embed_texts,
+    get_namespace,
+    load_env,
+)
+from shared.schemas import TIMESTAMP_ATTRIBUTES, format_timestamp
 
 
 def consolidate_and_print_metadata(results):
@@ -66,7 +42,10 @@ def consolidate_and_print_metadata(results):
     for metadata in transcript_metadata:
         for key in list_keys:
             if key in metadata:
-                consolidated[key].append(metadata[key])
+                value = metadata[key]
+                if key in TIMESTAMP_ATTRIBUTES:
+                    value = format_timestamp(value)
+                consolidated[key].append(value)
         for key in unique_keys:
             if key in metadata:
                 consolidated[key].add(metadata[key])
@@ -92,6 +71,3 @@ def consolidate_and_print_metadata(results):
     for email in consolidated[email_key]:
         print(f"- {email}")
     print()
-
-
-# TODO: Ask nate how do i avoid needing to make a copy of this file in every directory?
@@ -1,34 +1,7 @@
-import turbopuffer as tpuf
-import os
-import datetime
-import json
-import os
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
-from dotenv import load_dotenv
-from openai import OpenAI
-
-
-def embed_text(text: str) -> List[float]:
-    """
-    Generates an embedding vector for the provided text using OpenAI's API.
-    """
-
-    load_dotenv()
-
-    # Initialize the OpenAI client once
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    if not OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY is not set in the environment variables.")
-
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
-    try:
-        response = client.embeddings.create(input=text, model="text-embedding-3-small")
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error embedding text: {e}")
-        return []
+from helper import embed_text, embed_texts, get_namespace
 
 
 def query_namespace(
@@ -37,20 +10,20 @@ def query_namespace(
     top_k: int = 3,
     include_attributes: list[str] = ["name", "gong_call_id_c"],
     n_characters: int = 500,
-    gong_primary_opportunity_c: str = "006Rm00000QuHC6IAN",
+    gong_primary_opportunity_c: Optional[str] = "006Rm00000QuHC6IAN",
 ) -> list:
     # Convert query into a vector
     query_vector = embed_text(query_text)
-
-    # Configure your API key and base URL
-    tpuf.api_key = os.getenv("TURBOPUFFER_API_KEY")
-    tpuf.api_base_url = "https://gcp-us-central1.turbopuffer.com"
+    if not query_vector:
+        raise RuntimeError(f"Could not embed query: {query_text!r}")
 
     # Query the namespace using the vector
-    ns = tpuf.Namespace(namespace)
+    ns = get_namespace(namespace)
 
     # Define a filter to restrict results to documents with the specified opportunity.
-    filters = ["gong_primary_opportunity_c", "Eq", gong_primary_opportunity_c]
+    filters = None
+    if gong_primary_opportunity_c:
+        filters = ["gong_primary_opportunity_c", "Eq", gong_primary_opportunity_c]
 
     results = ns.query(
         vector=query_vector,
@@ -60,8 +33,9 @@ def query_namespace(
         filters=filters,
     )
 
-    if n_characters > len(results[0].attributes["transcript_text"]):
-        n_characters = len(results[0].attributes["transcript_text"])
+    if not results:
+        print("\nNo results.")
+        return results
 
     for result in results:
         print("\nResult:")
@@ -69,12 +43,13 @@ def query_namespace(
         print(f"  Distance: {result.dist:.4f}")
         print("  Attributes:")
         for attr, value in result.attributes.items():
-            if attr == "transcript_text":
+            if attr == "transcript_text" and isinstance(value, str):
+                shown = min(n_characters, len(value))
                 print("")
                 print("-----")
-                print(f"Transcript Text ({n_characters} characters):")
+                print(f"Transcript Text ({shown} characters):")
                 print("")
-                print(f"{value[:n_characters]}...")
+                print(f"{value[:shown]}...")
 
                 print("")
                 print("Last 400 characters:")
@@ -90,13 +65,76 @@ def query_namespace(
     return results
 
 
-def print_namespace_schema(namespace: str = "tay-test"):
-    # Configure your API key and base URL
-    tpuf.api_key = os.getenv("TURBOPUFFER_API_KEY")
-    tpuf.api_base_url = "https://gcp-us-central1.turbopuffer.com"
+def query_namespace_multi(
+    namespace: str = "tay-sales-calls",
+    query_texts: List[str] = [
+        "Find me a call about sports data.",
+        "Find sections that talk about the cloud provider",
+        "find me a call where data orchestration was discussed",
+    ],
+    top_k: int = 3,
+    include_attributes: List[str] = ["gong_title_c", "gong_call_id_c", "chunk_index"],
+    filters: Optional[list] = None,
+    gong_primary_opportunity_c: Optional[str] = None,
+    max_workers: int = 8,
+    print_results: bool = True,
+) -> List[List[dict]]:
+    """
+    Runs several queries against one namespace.
+
+    The distinct query strings are embedded in a single batched request and
+    the vector queries are issued concurrently. An optional filter (either
+    `filters`, or the `gong_primary_opportunity_c` shortcut) is applied to
+    every query.
+
+    Returns one [{"id", "dist", "attributes"}, ...] list per entry of
+    `query_texts`, in the same order; repeated queries share their results.
+    Raises RuntimeError if any query could not be embedded.
+    """
+    if gong_primary_opportunity_c:
+        opp_filter = ["gong_primary_opportunity_c", "Eq", gong_primary_opportunity_c]
+        filters = ["And", [filters, opp_filter]] if filters else opp_filter
+
+    unique_texts = list(dict.fromkeys(query_texts))
+    query_vectors = embed_texts(unique_texts)
+    failed = [text for text, vector in zip(unique_texts, query_vectors) if not vector]
+    if failed:
+        raise RuntimeError(f"Could not embed {len(failed)} queries: {failed}")
+    ns = get_namespace(namespace)
+
+    def run_query(query_vector: List[float]) -> List[dict]:
+        results = ns.query(
+            vector=query_vector,
+            distance_metric="cosine_distance",
+            top_k=top_k,
+            include_attributes=include_attributes,
+            filters=filters,
+        )
+        return [
+            {"id": result.id, "dist": result.dist, "attributes": result.attributes}
+            for result in results
+        ]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        by_text = dict(zip(unique_texts, executor.map(run_query, query_vectors)))
+    grouped = [by_text[query_text] for query_text in query_texts]
+
+    if print_results:
+        for query_text, results in zip(query_texts, grouped):
+            print(f"\nQuery: {query_text}")
+            for result in results:
+                print(f"  {result['dist']:.4f}  {result['id']}")
+                for attr, value in (result["attributes"] or {}).items():
+                    if isinstance(value, str) and len(value) > 200:
+                        value = value[:200] + "..."
+                    print(f"      {attr}: {value}")
+
+    return grouped
+
 
+def print_namespace_schema(namespace: str = "tay-test"):
     # Instantiate your namespace object
-    ns = tpuf.Namespace(namespace)
+    ns = get_namespace(namespace)
 
     schema = ns.schema()
 
@@ -123,14 +161,8 @@ def get_unique_gong_primary_opportunities(
     Query the vectorstore for documents in the specified namespace,
     and return a list of unique 'gong_primary_opportunity_c' values.
     """
-    load_dotenv()
-
-    # Configure the Turbopuffer API
-    tpuf.api_key = os.getenv("TURBOPUFFER_API_KEY")
-    tpuf.api_base_url = "https://gcp-us-central1.turbopuffer.com"
-
     # Instantiate the namespace
-    ns = tpuf.Namespace(namespace)
+    ns = get_namespace(namespace)
 
     # Query the namespace.
     # Here we don't provide a vector or rank_by, so the API should return
@@ -0,0 +1,613 @@
+# src/extract_data_stack/query_load.py
+"""
+Load test and latency benchmark for the retrieval query paths.
+
+Replays a query mix at a target rate against three paths:
+
+    tool             the agent tool query_transcript_vector_db_for_transcripts
+                     (embedding, two-phase turbopuffer query, chunk cache,
+                     context assembly)
+    query_namespace  print_tpuf_queries.query_namespace
+    raggy            raggy's TurboPuffer.query on the docs namespace, as in
+                     get_product_docs/test_query_tpuf.py
+
+Requests are scheduled open-loop at `qps` (or back to back with `qps=0`)
+and at most `concurrency` run at once. Latency is measured from the time a
+request was scheduled, so time spent waiting for a free slot counts;
+"service" is the time the call itself took. The report gives p50/p95/p99
+latency, throughput and error rate per path, the embed/tpuf_query split of
+the tool path (see shared.metrics) and the chunk cache hit rate.
+
+Against the real backends the run costs real embedding and query requests.
+With a FakeBackend, the OpenAI client and turbopuffer namespaces are
+replaced (see shared.clients.override_clients) by fakes whose latency is
+drawn from a log-normal model with a given median and p99, and which fail
+at a given rate; fake rows are deterministic, so the chunk cache behaves as
+it would on the real namespace. raggy builds its own clients, so in fake
+mode its path is an equivalent embed + ANN query against the fakes.
+
+The mix is a JSON list of QuerySpec objects, the default mix below, or the
+tool calls recorded in eval cassettes (`mix_from_cassettes`), which is what
+the agent actually asks.
+
+Usage:
+    python src/cli.py loadtest --fake --qps 50 --concurrency 16 --requests 1000
+    python src/cli.py loadtest --paths tool --qps 5 --requests 100 --report load.json
+    python src/cli.py loadtest --cases eval_cases.json --cassette-dir cassettes --fake
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Literal, Optional
+
+from extract_stack import (
+    TRANSCRIPT_NAMESPACE,
+    OpportunityContext,
+    query_transcript_vector_db_for_transcripts,
+)
+from print_tpuf_queries import query_namespace
+from pydantic import BaseModel
+from shared.aliases import ALIAS_NAMESPACE, resolve_namespace
+from shared.cassette import CassetteRow
+from shared.clients import EMBEDDING_DIMENSIONS, override_clients
+from shared.metrics import collect_usage, format_table, summarize
+from shared.retrieval import chunk_cache
+
+QueryPath = Literal["tool", "query_namespace", "raggy"]
+PATHS = ("tool", "query_namespace", "raggy")
+TOOL_NAME = "query_transcript_vector_db_for_transcripts"
+
+DOCS_NAMESPACE = "test-tay"
+DEFAULT_OPP_IDS = ["006Rm00000QuHC6IAN", "006Rm00000R5yiLIAR", "006Rm00000OG8LZIA1"]
+TRANSCRIPT_QUERIES = [
+    "What is the customer's data stack?",
+    "Which orchestration tool do they use today?",
+    "Which cloud provider do they run on?",
+    "find me a call where data orchestration was discussed",
+    "Find sections that talk about the cloud provider",
+]
+DOCS_QUERIES = [
+    "What is the best doc to use when I want a Prefect quickstart?",
+    "How should I begin using Prefect?",
+    "How do I deploy a flow to ECS?",
+    "How do I retry a failed task?",
+]
+QUERY_NAMESPACE_ATTRIBUTES = [
+    "gong_title_c",
+    "gong_call_id_c",
+    "chunk_index",
+    "transcript_text",
+]
+
+# z-score of the 99th percentile of a standard normal.
+_Z99 = 2.3263
+# Shape of a fake namespace: calls per opportunity and chunks per call.
+_FAKE_CALLS = 6
+_FAKE_CHUNKS = 8
+_FAKE_WORDS = (
+    "we run airflow on aws today the data team schedules dbt jobs into "
+    "snowflake from kubernetes and the pipeline breaks when retries pile up"
+).split()
+
+
+class QuerySpec(BaseModel):
+    """One query of the mix."""
+
+    path: QueryPath
+    query_text: str
+    opp_id: Optional[str] = None
+    top_k: int = 3
+    mentions: Optional[List[str]] = None
+
+
+def default_mix() -> List[QuerySpec]:
+    """
+    Mostly agent tool calls, some ad-hoc namespace queries and docs lookups,
+    interleaved.
+    """
+    mix = [
+        QuerySpec(path="tool", query_text=text, opp_id=opp_id)
+        for opp_id in DEFAULT_OPP_IDS
+        for text in TRANSCRIPT_QUERIES
+    ]
+    mix += [
+        QuerySpec(
+            path="tool",
+            query_text="Which cloud provider do they run on?",
+            opp_id=opp_id,
+            mentions=["AWS", "GCP", "Azure"],
+        )
+        for opp_id in DEFAULT_OPP_IDS
+    ]
+    mix += [
+        QuerySpec(path="query_namespace", query_text=text, opp_id=opp_id)
+        for opp_id in DEFAULT_OPP_IDS
+        for text in TRANSCRIPT_QUERIES[3:]
+    ]
+    mix += [QuerySpec(path="raggy", query_text=text, top_k=2) for text in DOCS_QUERIES]
+    random.Random(0).shuffle(mix)
+    return mix
+
+
+def load_mix(path: str) -> List[QuerySpec]:
+    return [QuerySpec(**spec) for spec in json.loads(Path(path).read_text())]
+
+
+def mix_from_cassettes(cases_path: str, cassette_dir: str) -> List[QuerySpec]:
+    """The retrieval tool calls recorded in eval cassettes (see eval_runner)."""
+    from eval_runner import load_cases
+
+    mix = []
+    for case in load_cases(cases_path):
+        path = Path(cassette_dir) / f"{case.case_id}.json"
+        if not path.exists():
+            continue
+        extras = json.loads(path.read_text()).get("extras", {})
+        for message in extras.get("llm", {}).get("messages", []):
+            for part in message.get("parts", []):
+                if part.get("part_kind") != "tool-call":
+                    continue
+                if part.get("tool_name") != TOOL_NAME:
+                    continue
+                args = part.get("args") or {}
+                if isinstance(args, str):
+                    args = json.loads(args or "{}")
+                mix.append(QuerySpec(path="tool", opp_id=case.opp_id, **args))
+    return mix
+
+
+@dataclass
+class LatencyModel:
+    """Log-normal latency with the given median and p99, and a failure rate."""
+
+    median_ms: float
+    p99_ms: float
+    error_rate: float = 0.0
+
+    @classmethod
+    def parse(cls, value: str, error_rate: float = 0.0) -> "LatencyModel":
+        """From "median_ms,p99_ms"."""
+        median_ms, p99_ms = (float(v) for v in value.split(","))
+        return cls(median_ms, p99_ms, error_rate)
+
+    def sample(self, rng: random.Random) -> float:
+        """A latency in seconds."""
+        sigma = math.log(max(self.p99_ms / self.median_ms, 1.0)) / _Z99
+        return rng.lognormvariate(math.log(self.median_ms / 1000), sigma)
+
+
+class FakeBackendError(Exception):
+    """A failure injected by a fake backend."""
+
+
+def _filter_value(filters: Any, attribute: str) -> Any:
+    """The value `attribute` is compared with somewhere in `filters`, if any."""
+    if not isinstance(filters, (list, tuple)) or not filters:
+        return None
+    if filters[0] in ("And", "Or"):
+        for clause in filters[1]:
+            value = _filter_value(clause, attribute)
+            if value is not None:
+                return value
+        return None
+    if len(filters) == 3 and filters[0] == attribute:
+        return filters[2]
+    return None
+
+
+class FakeBackend:
+    """Latency-modelled stand-ins for the OpenAI client and turbopuffer."""
+
+    def __init__(
+        self,
+        embed_latency: LatencyModel,
+        query_latency: LatencyModel,
+        seed: int = 0,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+    ):
+        self.embed_latency = embed_latency
+        self.query_latency = query_latency
+        self.dimensions = dimensions
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self, model: LatencyModel, what: str) -> None:
+        with self._lock:
+            delay = model.sample(self._rng)
+            failed = self._rng.random() < model.error_rate
+        time.sleep(delay)
+        if failed:
+            raise FakeBackendError(f"injected {what} failure")
+
+    def vector(self, text: str) -> List[float]:
+        rng = random.Random(hashlib.sha256(text.encode()).digest())
+        return [rng.uniform(-1, 1) for _ in range(self.dimensions)]
+
+    def create_embeddings(self, input, model: str = "") -> SimpleNamespace:
+        self.wait(self.embed_latency, "embedding")
+        texts = [input] if isinstance(input, str) else input
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=self.vector(text))
+                for i, text in enumerate(texts)
+            ]
+        )
+
+    def openai_client(self) -> SimpleNamespace:
+        return SimpleNamespace(
+            embeddings=SimpleNamespace(create=self.create_embeddings)
+        )
+
+    def namespace(self, name: str) -> "FakeNamespace":
+        if name == ALIAS_NAMESPACE:
+            # No aliases: every logical name is its own fake namespace.
+            return FakeAliasNamespace()
+        return FakeNamespace(self, name)
+
+
+class FakeAliasNamespace:
+    """An empty alias table (see shared.aliases)."""
+
+    def exists(self) -> bool:
+        return True
+
+    def query(self, **kwargs) -> List[CassetteRow]:
+        return []
+
+
+class FakeNamespace:
+    """
+    Answers `query` like a turbopuffer namespace holding `_FAKE_CALLS` calls
+    of `_FAKE_CHUNKS` chunks per opportunity. The same query vector always
+    ranks the same rows.
+    """
+
+    def __init__(self, backend: FakeBackend, name: str):
+        self.backend = backend
+        self.name = name
+
+    def exists(self) -> bool:
+        return True
+
+    def query(
+        self,
+        vector: Optional[List[float]] = None,
+        top_k: int = 10,
+        filters: Optional[list] = None,
+        include_attributes: Optional[List[str]] = None,
+        rank_by: Optional[Any] = None,
+        **kwargs,
+    ) -> List[CassetteRow]:
+        self.backend.wait(self.backend.query_latency, "query")
+        if rank_by is not None and rank_by[0] == "vector":
+            vector = rank_by[2]
+        if vector is not None and not vector:
+            raise FakeBackendError("query vector is empty")
+
+        ids = _filter_value(filters, "id")
+        if ids is not None:
+            row_ids = list(ids)[:top_k]
+        else:
+            owner = _filter_value(filters, "gong_primary_opportunity_c") or self.name
+            pool = [
+                f"{owner}-{call}-{chunk}"
+                for call in range(_FAKE_CALLS)
+                for chunk in range(_FAKE_CHUNKS)
+            ]
+            rng = random.Random(repr((vector or [])[:4]))
+            row_ids = rng.sample(pool, min(top_k, len(pool)))
+
+        rng = random.Random(repr(row_ids))
+        dists = sorted(rng.uniform(0.2, 0.8) for _ in row_ids)
+        attributes = include_attributes if isinstance(include_attributes, list) else []
+        return [
+            CassetteRow(
+                id=row_id,
+                dist=dist,
+                attributes={attr: _fake_attribute(row_id, attr) for attr in attributes},
+            )
+            for row_id, dist in zip(row_ids, dists)
+        ]
+
+
+def _fake_attribute(row_id: str, attribute: str) -> Any:
+    owner, call, chunk = str(row_id).rsplit("-", 2)
+    if attribute in ("transcript_text", "text"):
+        rng = random.Random(row_id)
+        return " ".join(rng.choice(_FAKE_WORDS) for _ in range(300))
+    if attribute == "chunk_index":
+        return f"-{chunk}- of {_FAKE_CHUNKS}"
+    if attribute == "gong_call_id_c":
+        return f"{owner}-{call}"
+    if attribute == "gong_primary_opportunity_c":
+        return owner
+    if attribute == "gong_call_start_c":
+        return 1704067200 + int(call) * 86400
+    return f"{attribute} of {row_id}"
+
+
+class FakeDocsStore:
+    """raggy's TurboPuffer.query (embed, then ANN query) against the fakes."""
+
+    def __init__(self, backend: FakeBackend, namespace: str):
+        self.backend = backend
+        self.ns = backend.namespace(namespace)
+
+    def query(self, text: str, top_k: int = 10) -> List[CassetteRow]:
+        vector = self.backend.create_embeddings(text).data[0].embedding
+        return self.ns.query(
+            rank_by=("vector", "ANN", vector),
+            top_k=top_k,
+            include_attributes=["text"],
+        )
+
+
+@dataclass
+class PathStats:
+    """Outcomes of one query path."""
+
+    latency_sec: List[float] = field(default_factory=list)
+    service_sec: List[float] = field(default_factory=list)
+    errors: Counter = field(default_factory=Counter)
+    spans: Dict[str, List[float]] = field(default_factory=dict)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latency_sec) + sum(self.errors.values())
+
+
+class QueryRunner:
+    """Runs a QuerySpec on its path; sync paths run in the loop's executor."""
+
+    def __init__(
+        self,
+        namespace: str = TRANSCRIPT_NAMESPACE,
+        docs_namespace: str = DOCS_NAMESPACE,
+        fake: Optional[FakeBackend] = None,
+    ):
+        self.namespace = namespace
+        self.docs_namespace = docs_namespace
+        self.fake = fake
+        self._docs_store = None
+        self._exit_stack = contextlib.ExitStack()
+
+    def open_docs_store(self) -> None:
+        """Opens the raggy store once; raises ImportError if raggy is unusable."""
+        if self.fake is not None:
+            self._docs_store = FakeDocsStore(
+                self.fake, resolve_namespace(self.docs_namespace)
+            )
+            return
+        from raggy.vectorstores.tpuf import TurboPuffer
+
+        self._docs_store = self._exit_stack.enter_context(
+            TurboPuffer(namespace=resolve_namespace(self.docs_namespace))
+        )
+
+    def close(self) -> None:
+        self._exit_stack.close()
+
+    async def run(self, spec: QuerySpec, stats: PathStats) -> None:
+        if spec.path == "tool":
+            ctx = SimpleNamespace(
+                deps=OpportunityContext(gong_primary_opportunity_c=spec.opp_id)
+            )
+            with collect_usage() as usage:
+                await query_transcript_vector_db_for_transcripts(
+                    ctx, spec.query_text, spec.top_k, spec.mentions
+                )
+            for name, seconds in usage.spans.items():
+                stats.spans.setdefault(name, []).extend(seconds)
+        elif spec.path == "query_namespace":
+            await asyncio.to_thread(
+                query_namespace,
+                self.namespace,
+                spec.query_text,
+                top_k=spec.top_k,
+                include_attributes=QUERY_NAMESPACE_ATTRIBUTES,
+                gong_primary_opportunity_c=spec.opp_id,
+            )
+        else:
+            await asyncio.to_thread(
+                self._docs_store.query, spec.query_text, top_k=spec.top_k
+            )
+
+
+@dataclass
+class LoadResult:
+    """Per-path outcomes of a load test run."""
+
+    requests: int
+    qps: float
+    concurrency: int
+    elapsed_sec: float
+    paths: Dict[str, PathStats]
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    @property
+    def cache_hit_rate(self) -> Optional[float]:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {
+            "requests": self.requests,
+            "target_qps": self.qps,
+            "concurrency": self.concurrency,
+            "elapsed_sec": self.elapsed_sec,
+            "throughput_qps": self.requests / self.elapsed_sec,
+            "chunk_cache_hit_rate": self.cache_hit_rate,
+            "paths": {},
+        }
+        for path, stats in self.paths.items():
+            report["paths"][path] = {
+                "requests": stats.requests,
+                "ok": len(stats.latency_sec),
+                "errors": dict(stats.errors),
+                "error_rate": sum(stats.errors.values()) / stats.requests,
+                "throughput_qps": len(stats.latency_sec) / self.elapsed_sec,
+                "latency_sec": summarize(stats.latency_sec),
+                "service_sec": summarize(stats.service_sec),
+                "spans_sec": {
+                    name: summarize(seconds) for name, seconds in stats.spans.items()
+                },
+            }
+        return report
+
+
+async def run_load(
+    mix: List[QuerySpec],
+    runner: QueryRunner,
+    requests: int = 200,
+    qps: float = 10.0,
+    concurrency: int = 8,
+    warmup: int = 0,
+) -> LoadResult:
+    """
+    Sends `requests` queries, cycling through `mix`, after `warmup` unmeasured
+    ones. With `qps` of 0, a new query starts as soon as a slot is free.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    for spec in mix[:warmup]:
+        with contextlib.suppress(Exception):
+            await runner.run(spec, PathStats())
+
+    stats = {path: PathStats() for path in PATHS}
+    semaphore = asyncio.Semaphore(concurrency)
+    cache_hits, cache_misses = chunk_cache.hits, chunk_cache.misses
+    started = time.perf_counter()
+
+    async def send(i: int, spec: QuerySpec) -> None:
+        path_stats = stats[spec.path]
+        if qps:
+            scheduled = started + i / qps
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        async with semaphore:
+            begun = time.perf_counter()
+            if not qps:
+                scheduled = begun
+            try:
+                await runner.run(spec, path_stats)
+            except Exception as e:
+                path_stats.errors[type(e).__name__] += 1
+                return
+            finished = time.perf_counter()
+            path_stats.latency_sec.append(finished - scheduled)
+            path_stats.service_sec.append(finished - begun)
+
+    await asyncio.gather(*[send(i, mix[i % len(mix)]) for i in range(requests)])
+    return LoadResult(
+        requests=requests,
+        qps=qps,
+        concurrency=concurrency,
+        elapsed_sec=time.perf_counter() - started,
+        paths={path: s for path, s in stats.items() if s.requests},
+        cache_hits=chunk_cache.hits - cache_hits,
+        cache_misses=chunk_cache.misses - cache_misses,
+    )
+
+
+def print_report(result: LoadResult) -> None:
+    print(
+        f"\n{result.requests} requests in {result.elapsed_sec:.1f}s "
+        f"({result.requests / result.elapsed_sec:.1f}/s, "
+        f"{f'target {result.qps}/s' if result.qps else 'back to back'}, "
+        f"concurrency {result.concurrency})"
+    )
+    for path, stats in result.paths.items():
+        error_rate = sum(stats.errors.values()) / stats.requests
+        errors = ", ".join(f"{n} {name}" for name, n in stats.errors.items())
+        print(
+            f"  {path:<16} {stats.requests:>6} sent {len(stats.latency_sec):>6} ok "
+            f"{error_rate:>7.1%} errors "
+            f"{len(stats.latency_sec) / result.elapsed_sec:>7.1f}/s"
+            + (f"  ({errors})" if errors else "")
+        )
+    if result.cache_hit_rate is not None:
+        print(f"  chunk cache hit rate {result.cache_hit_rate:.1%}")
+
+    tables = [
+        format_table(
+            "latency (s)", {p: s.latency_sec for p, s in result.paths.items()}
+        ),
+        format_table(
+            "service (s)", {p: s.service_sec for p, s in result.paths.items()}
+        ),
+    ]
+    if "tool" in result.paths and result.paths["tool"].spans:
+        tables.append(format_table("tool stages (s)", result.paths["tool"].spans))
+    print()
+    print("\n\n".join(tables))
+
+
+def load_test(
+    mix: Optional[List[QuerySpec]] = None,
+    paths: Optional[List[str]] = None,
+    requests: int = 200,
+    qps: float = 10.0,
+    concurrency: int = 8,
+    warmup: int = 0,
+    fake: Optional[FakeBackend] = None,
+    namespace: str = TRANSCRIPT_NAMESPACE,
+    docs_namespace: str = DOCS_NAMESPACE,
+    cold_cache: bool = False,
+    quiet: bool = True,
+    report_path: Optional[str] = None,
+) -> LoadResult:
+    """
+    Runs the load test and prints the report. With `quiet`, the output the
+    query functions print for every result is discarded while it runs.
+    """
+    mix = [spec for spec in (mix or default_mix()) if spec.path in (paths or PATHS)]
+    runner = QueryRunner(namespace, docs_namespace, fake=fake)
+    if cold_cache:
+        chunk_cache.clear()
+
+    clients = (
+        override_clients(fake.openai_client(), namespace_factory=fake.namespace)
+        if fake is not None
+        else contextlib.nullcontext()
+    )
+    # The docs namespace is resolved through the (possibly fake) alias table,
+    # so the store is opened inside the override.
+    with clients, contextlib.ExitStack() as stack:
+        stack.callback(runner.close)
+        if any(spec.path == "raggy" for spec in mix):
+            try:
+                runner.open_docs_store()
+            except ImportError as e:
+                print(f"⚠️ Skipping the raggy path, raggy is not usable here: {e}")
+                mix = [spec for spec in mix if spec.path != "raggy"]
+        if not mix:
+            raise ValueError("The query mix is empty")
+        print(
+            f"🚦 {requests} requests from a mix of {len(mix)} queries "
+            f"({', '.join(sorted({spec.path for spec in mix}))})"
+            f"{' against fakes' if fake else ''}"
+        )
+        if quiet:
+            stack.enter_context(
+                contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w")))
+            )
+        result = asyncio.run(
+            run_load(mix, runner, requests, qps, concurrency, warmup=warmup)
+        )
+
+    print_report(result)
+    if report_path:
+        Path(report_path).write_text(json.dumps(result.as_dict(), indent=2))
+    return result
@@ -0,0 +1,220 @@
+# src/extract_data_stack/tag_evidence.py
+"""
+Reads an opportunity's tech stack off ingestion-time tags, when they are
+unambiguous, as a hint for the extraction agent and a reason to answer with
+a cheaper model.
+
+Tags come from shared.tech_tagging. The evidence for an opportunity is every
+chunk of its calls that mentions a tool or a cloud. It is unambiguous when
+
+    - exactly one orchestration tool is mentioned, in at least
+      `min_mentions` chunks (a generic "Airflow" mention counts towards the
+      one specific Airflow flavor mentioned, if there is one), and
+    - exactly one cloud provider is mentioned, or none is and the tool
+      implies one (MWAA -> AWS, Cloud Composer -> GCP, ...), and the two
+      do not contradict each other.
+
+Tags are keyword matches and cannot tell current tools from evaluated,
+replaced or secondary ones, so an unambiguous verdict is never the answer:
+`tag_hint` turns it into a note for the agent, which still confirms it in
+the transcripts it retrieves. With the note the confirmation is easy, so
+run_extraction sends these opportunities to the cascade's cheapest tier,
+which escalates when its answer contradicts the tags (see cascade). Tag values that are not enum members (from
+older synonym lists) are ignored.
+
+Lookups go through the active cassette, so evaluations replay them offline.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from shared.cassette import recorded, rows_from_dicts, rows_to_dicts
+from shared.clients import get_namespace
+from shared.retrieval import fetch_attributes_by_id
+from shared.tech_stack_enums import CloudProvider, OrchestrationTool
+from shared.tech_tagging import (
+    AIRFLOW_FLAVORS,
+    CLOUDS_ATTRIBUTE,
+    IMPLIED_CLOUD,
+    TOOLS_ATTRIBUTE,
+    get_matcher,
+)
+
+# Most tagged chunks read per opportunity.
+MAX_EVIDENCE_CHUNKS = 1000
+
+
+@dataclass
+class TagVerdict:
+    tool: OrchestrationTool
+    cloud: CloudProvider
+    tool_mentions: int
+    cloud_mentions: int
+    tool_snippet: Optional[str] = None
+    cloud_snippet: Optional[str] = None
+
+
+def mention_filters(mentions: List[str]) -> Optional[list]:
+    """
+    Filter for chunks tagged with any of `mentions` (tool or cloud enum
+    values); unknown names are ignored.
+    """
+    tools = [m for m in mentions if m in OrchestrationTool._value2member_map_]
+    clouds = [m for m in mentions if m in CloudProvider._value2member_map_]
+    conditions = []
+    if tools:
+        conditions.append([TOOLS_ATTRIBUTE, "ContainsAny", tools])
+    if clouds:
+        conditions.append([CLOUDS_ATTRIBUTE, "ContainsAny", clouds])
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else ["Or", conditions]
+
+
+def fetch_tag_evidence(
+    namespace: str, opp_id: str, limit: int = MAX_EVIDENCE_CHUNKS
+) -> list:
+    """The opportunity's chunks that mention any tool or cloud, tags only."""
+
+    def run_query():
+        return get_namespace(namespace).query(
+            top_k=limit,
+            filters=[
+                "And",
+                [
+                    ["gong_primary_opportunity_c", "Eq", opp_id],
+                    [
+                        "Or",
+                        [
+                            [TOOLS_ATTRIBUTE, "NotEq", None],
+                            [CLOUDS_ATTRIBUTE, "NotEq", None],
+                        ],
+                    ],
+                ],
+            ],
+            include_attributes=[TOOLS_ATTRIBUTE, CLOUDS_ATTRIBUTE],
+        )
+
+    return recorded(
+        "tag_evidence",
+        {"namespace": namespace, "opp_id": opp_id, "limit": limit},
+        run_query,
+        serialize=rows_to_dicts,
+        deserialize=rows_from_dicts,
+    )
+
+
+def _chunks_mentioning(rows: list, attribute: str, values: set) -> List[Any]:
+    return [
+        row.id
+        for row in rows
+        if values & set((row.attributes or {}).get(attribute) or [])
+    ]
+
+
+def decide_from_tags(rows: list, min_mentions: int = 2) -> Optional[TagVerdict]:
+    """Returns the verdict for tagged `rows`, or None if they are ambiguous."""
+    known_tools = OrchestrationTool._value2member_map_
+    known_clouds = CloudProvider._value2member_map_
+    tools: Counter = Counter()
+    clouds: Counter = Counter()
+    for row in rows:
+        attributes = row.attributes or {}
+        tools.update(set(attributes.get(TOOLS_ATTRIBUTE) or []) & known_tools.keys())
+        clouds.update(set(attributes.get(CLOUDS_ATTRIBUTE) or []) & known_clouds.keys())
+
+    mentioned = {OrchestrationTool(value) for value in tools}
+    generic = OrchestrationTool.AIRFLOW_NOT_SPECIFIED
+    flavors = mentioned & AIRFLOW_FLAVORS
+    if generic in mentioned and len(flavors) == 1:
+        mentioned.discard(generic)
+    if len(mentioned) != 1:
+        return None
+    tool = mentioned.pop()
+    tool_values = {tool.value} | ({generic.value} if tool in flavors else set())
+    tool_mentions = len(_chunks_mentioning(rows, TOOLS_ATTRIBUTE, tool_values))
+    if tool_mentions < min_mentions:
+        return None
+
+    implied = IMPLIED_CLOUD.get(tool)
+    if len(clouds) > 1:
+        return None
+    if clouds:
+        cloud = CloudProvider(next(iter(clouds)))
+        if implied and implied != cloud:
+            return None
+    elif implied:
+        cloud = implied
+    else:
+        return None
+
+    return TagVerdict(
+        tool=tool,
+        cloud=cloud,
+        tool_mentions=tool_mentions,
+        cloud_mentions=clouds.get(cloud.value, 0),
+    )
+
+
+def find_unambiguous_stack(
+    namespace: str,
+    opp_id: str,
+    min_mentions: int = 2,
+    rows: Optional[list] = None,
+) -> Optional[TagVerdict]:
+    """
+    Looks up the opportunity's tags (unless `rows` from fetch_tag_evidence
+    are given) and, if they are unambiguous, returns the verdict with
+    transcript snippets quoting the tool and the cloud.
+    """
+    if rows is None:
+        rows = fetch_tag_evidence(namespace, opp_id)
+    verdict = decide_from_tags(rows, min_mentions=min_mentions)
+    if verdict is None:
+        return None
+
+    tool_chunk = _chunks_mentioning(rows, TOOLS_ATTRIBUTE, {verdict.tool.value})
+    cloud_chunk = _chunks_mentioning(rows, CLOUDS_ATTRIBUTE, {verdict.cloud.value})
+    chunk_ids = list(dict.fromkeys(tool_chunk[:1] + cloud_chunk[:1]))
+
+    texts = recorded(
+        "tag_snippets",
+        {"namespace": namespace, "ids": chunk_ids},
+        lambda: {
+            str(row_id): values.get("transcript_text") or ""
+            for row_id, values in fetch_attributes_by_id(
+                namespace, chunk_ids, ["transcript_text"]
+            ).items()
+        },
+    )
+
+    matcher = get_matcher()
+    tool_text = texts.get(str(tool_chunk[0]), "")
+    verdict.tool_snippet = matcher.snippet(tool_text, verdict.tool)
+    if cloud_chunk:
+        cloud_text = texts.get(str(cloud_chunk[0]), "")
+        verdict.cloud_snippet = matcher.snippet(cloud_text, verdict.cloud)
+    return verdict
+
+
+def tag_hint(verdict: TagVerdict) -> str:
+    """The note on `verdict` added to the agent's prompt."""
+    cloud = (
+        f"{verdict.cloud.value} ({verdict.cloud_mentions} chunks)"
+        if verdict.cloud_mentions
+        else f"{verdict.cloud.value} (implied by the tool)"
+    )
+    lines = [
+        "Keyword tags on this opportunity's transcripts mention only "
+        f"{verdict.tool.value} ({verdict.tool_mentions} chunks) and {cloud}.",
+        "Tags are keyword matches, not conclusions: confirm them by searching "
+        f'the transcripts (mentions=["{verdict.tool.value}", '
+        f'"{verdict.cloud.value}"]), quote the transcripts you retrieve rather '
+        "than the excerpts below, and look for secondary tools too.",
+    ]
+    excerpts = dict.fromkeys(
+        s for s in (verdict.tool_snippet, verdict.cloud_snippet) if s
+    )
+    lines.extend(f'Tagged excerpt: "{excerpt}"' for excerpt in excerpts)
+    return "\n".join(lines)
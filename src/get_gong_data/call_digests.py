@@ -0,0 +1,286 @@
+# src/get_gong_data/call_digests.py
+"""
+Writes a compact, structured digest of each sales call (see shared.digests)
+into the `<namespace>-call-digests` side namespace.
+
+A digest covers the tools mentioned, infrastructure, stakeholders and pain
+points of a call, plus up to three verbatim quotes naming the tools or
+cloud. Each quote is located in the transcript and the exact transcript
+text it matched is stored as an evidence span; quotes that do not occur in
+the transcript are dropped, so the extraction agent can quote the spans as
+grounded evidence. The transcript is rebuilt from the call's chunks with
+the words repeated by the chunk overlap removed (see shared.transcripts).
+
+Digests are generated in batch with bounded concurrency, and incrementally:
+calls that already have a digest are skipped. Ingestion writes digests for
+the calls it just loaded (`refresh_gong_transcripts(write_digests=True)`);
+`generate_call_digests` backfills a whole namespace from a snapshot.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from helper import embed_texts, get_namespace
+from prefect import flow, task
+from pydantic_ai import Agent
+from shared.digests import CallDigest, digest_namespace, find_verbatim_span
+from shared.schemas import conform_columns, namespace_schema
+from shared.snapshot import export_namespace_snapshot, load_snapshot
+from shared.tech_tagging import CLOUDS_ATTRIBUTE, TOOLS_ATTRIBUTE, get_matcher
+from shared.transcripts import merge_adjacent_chunks, parse_chunk_index
+
+DIGEST_MODEL = "openai:gpt-4o-mini"
+# Longer calls are cut; gpt-4o-mini reads ~16k tokens comfortably.
+MAX_TRANSCRIPT_WORDS = 12_000
+MAX_EVIDENCE_QUOTES = 3
+# Calls checked for existing digests, or read from a snapshot, at a time.
+BATCH_SIZE = 200
+
+CHUNK_COLUMNS = [
+    "gong_call_id_c",
+    "gong_primary_opportunity_c",
+    "gong_title_c",
+    "gong_call_start_c",
+    "chunk_index",
+    "transcript_text",
+]
+
+digest_agent = Agent(
+    DIGEST_MODEL,
+    result_type=CallDigest,
+    defer_model_check=True,
+    system_prompt="""
+    You summarize B2B sales call transcripts for a data orchestration company.
+    Record only what the customer side says about their own stack and
+    situation. Keep every list item short (a few words). Evidence quotes must
+    be copied character for character from the transcript.
+    """,
+)
+
+
+@dataclass
+class CallTranscript:
+    call_id: str
+    opp_id: Optional[str]
+    title: Optional[str]
+    start: Any
+    chunks: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        segments = merge_adjacent_chunks(
+            [
+                {"chunk_index": index, "text": text, "dist": 0.0}
+                for index, text in self.chunks
+            ]
+        )
+        words = " ".join(segment["text"] for segment in segments).split()
+        return " ".join(words[:MAX_TRANSCRIPT_WORDS])
+
+
+def calls_from_chunks(attributes: Dict[str, List[Any]]) -> Dict[str, CallTranscript]:
+    """Groups chunk attribute columns (CHUNK_COLUMNS) into one entry per call."""
+    calls: Dict[str, CallTranscript] = {}
+    for i, call_id in enumerate(attributes["gong_call_id_c"]):
+        call_id = str(call_id)
+        call = calls.get(call_id)
+        if call is None:
+            call = calls[call_id] = CallTranscript(
+                call_id=call_id,
+                opp_id=attributes["gong_primary_opportunity_c"][i],
+                title=attributes["gong_title_c"][i],
+                start=attributes["gong_call_start_c"][i],
+            )
+        index = parse_chunk_index(attributes["chunk_index"][i])
+        if index is None:
+            index = len(call.chunks)
+        call.chunks.append((index, attributes["transcript_text"][i] or ""))
+    return calls
+
+
+def existing_digests(namespace: str, call_ids: List[str]) -> Set[str]:
+    """The subset of `call_ids` that already have a digest."""
+    import turbopuffer as tpuf
+
+    ns = get_namespace(digest_namespace(namespace))
+    found: Set[str] = set()
+    for start in range(0, len(call_ids), BATCH_SIZE):
+        batch = call_ids[start : start + BATCH_SIZE]
+        try:
+            rows = ns.query(top_k=len(batch), filters=["id", "In", batch])
+        except tpuf.NotFoundError:
+            return found
+        found.update(str(row.id) for row in rows)
+    return found
+
+
+def render_digest(digest: CallDigest) -> str:
+    """The text a digest is embedded as."""
+    return "\n".join(
+        [
+            digest.summary,
+            "Tools: " + ", ".join(digest.tools_mentioned),
+            "Infrastructure: " + ", ".join(digest.infrastructure),
+            "Pain points: " + "; ".join(digest.pain_points),
+        ]
+    )
+
+
+async def digest_call(call: CallTranscript, model=None) -> Tuple[CallDigest, int]:
+    """Returns the call's digest and the tokens it took."""
+    text = call.text
+    tools, clouds = get_matcher().tag(text)
+    prompt = (
+        f"Call: {call.title}\n"
+        f"Tagged mentions: {', '.join(tools + clouds) or 'none'}\n\n"
+        f"Transcript:\n{text}"
+    )
+    result = await digest_agent.run(prompt, model=model)
+    digest = result.data
+    matched = [
+        (quote, find_verbatim_span(quote, text)) for quote in digest.evidence_quotes
+    ]
+    matched = [(quote, span) for quote, span in matched if span][:MAX_EVIDENCE_QUOTES]
+    digest.evidence_quotes = [quote for quote, _ in matched]
+    digest.evidence_spans = [span for _, span in matched]
+    return digest, result.usage().total_tokens or 0
+
+
+async def digest_calls(
+    calls: List[CallTranscript], max_concurrency: int = 8, model=None
+) -> Dict[str, CallDigest]:
+    """Digests `calls` concurrently; calls that fail are logged and skipped."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tokens = 0
+
+    async def run(call: CallTranscript) -> Optional[CallDigest]:
+        nonlocal tokens
+        async with semaphore:
+            try:
+                digest, used = await digest_call(call, model=model)
+            except Exception as e:
+                print(f"Digest failed for call {call.title}-{call.call_id}: {e}")
+                return None
+            tokens += used
+            return digest
+
+    digests = await asyncio.gather(*[run(call) for call in calls])
+    print(f"📝 Digested {len(calls)} calls with {tokens} tokens")
+    return {
+        call.call_id: digest
+        for call, digest in zip(calls, digests)
+        if digest is not None
+    }
+
+
+def write_digests(
+    namespace: str,
+    calls: Dict[str, CallTranscript],
+    digests: Dict[str, CallDigest],
+    batch_size: int = 100,
+) -> int:
+    call_ids = sorted(digests)
+    vectors = embed_texts([render_digest(digests[c]) for c in call_ids])
+    kept = [i for i, vector in enumerate(vectors) if vector]
+    call_ids = [call_ids[i] for i in kept]
+    vectors = [vectors[i] for i in kept]
+
+    matcher = get_matcher()
+    tags = [matcher.tag(calls[c].text) for c in call_ids]
+    attributes = {
+        "gong_call_id_c": call_ids,
+        "gong_primary_opportunity_c": [calls[c].opp_id for c in call_ids],
+        "gong_title_c": [calls[c].title for c in call_ids],
+        "gong_call_start_c": [calls[c].start for c in call_ids],
+        "digest_json": [digests[c].model_dump_json() for c in call_ids],
+        TOOLS_ATTRIBUTE: [tools or None for tools, _ in tags],
+        CLOUDS_ATTRIBUTE: [clouds or None for _, clouds in tags],
+    }
+    attributes = conform_columns("call-digests", attributes)
+    schema = namespace_schema("call-digests", attributes)
+    ns = get_namespace(digest_namespace(namespace))
+
+    def upsert(start: int) -> None:
+        end = start + batch_size
+        ns.upsert(
+            ids=call_ids[start:end],
+            vectors=vectors[start:end],
+            attributes={k: v[start:end] for k, v in attributes.items()},
+            schema=schema,
+            distance_metric="cosine_distance",
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(upsert, range(0, len(call_ids), batch_size)))
+    return len(call_ids)
+
+
+@task
+def write_call_digests(
+    namespace: str,
+    attributes: Dict[str, List[Any]],
+    max_concurrency: int = 8,
+    model=None,
+) -> int:
+    """
+    Digests the calls in freshly processed chunk attributes (the output of
+    process_and_embed_transcripts, or CHUNK_COLUMNS of a snapshot) that do
+    not have a digest yet. Returns the number of digests written.
+    """
+    calls = calls_from_chunks(attributes)
+    done = existing_digests(namespace, sorted(calls))
+    new_calls = [call for call_id, call in calls.items() if call_id not in done]
+    print(f"📝 {len(new_calls)} of {len(calls)} calls need a digest")
+    if not new_calls:
+        return 0
+    digests = asyncio.run(
+        digest_calls(new_calls, max_concurrency=max_concurrency, model=model)
+    )
+    written = write_digests(namespace, calls, digests)
+    print(f"📝 Wrote {written} digests to {digest_namespace(namespace)}")
+    return written
+
+
+@flow(log_prints=True, persist_result=False)
+def generate_call_digests(
+    namespace: str = "tay-sales-calls",
+    snapshot_dir: Optional[str] = None,
+    export: bool = True,
+    max_concurrency: int = 8,
+    limit: Optional[int] = None,
+) -> int:
+    """
+    Backfills digests for every call in a namespace that lacks one.
+
+    Exports a fresh snapshot first unless `export` is False (then
+    `snapshot_dir` must already hold one). Only the chunks of calls without
+    a digest are read from the snapshot, `BATCH_SIZE` calls at a time.
+    With `limit`, at most that many calls are digested.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    snapshot_dir = snapshot_dir or f"snapshots/{namespace}"
+    if export:
+        export_namespace_snapshot(namespace, snapshot_dir)
+    _, attributes, _ = load_snapshot(snapshot_dir, columns=CHUNK_COLUMNS)
+    call_column = pc.cast(attributes.column("gong_call_id_c"), pa.string())
+
+    call_ids = sorted(set(call_column.to_pylist()) - {None})
+    done = existing_digests(namespace, call_ids)
+    pending = [call_id for call_id in call_ids if call_id not in done]
+    if limit is not None:
+        pending = pending[:limit]
+    print(f"📝 {len(pending)} of {len(call_ids)} calls need a digest")
+
+    written = 0
+    for start in range(0, len(pending), BATCH_SIZE):
+        batch = pending[start : start + BATCH_SIZE]
+        mask = pc.is_in(call_column, value_set=pa.array(batch))
+        chunks = attributes.filter(mask).to_pydict()
+        written += write_call_digests.fn(
+            namespace, chunks, max_concurrency=max_concurrency
+        )
+    return written
@@ -0,0 +1,403 @@
+# src/get_gong_data/cluster_calls.py
+"""
+Topic map of the sales calls in a namespace.
+
+Works on a local snapshot of the namespace (see shared.snapshot): the
+chunk vectors of each call are averaged into one unit vector per call, the
+calls are grouped with mini-batch k-means over float32 NumPy arrays, and
+each cluster is labelled with the terms that are most distinctive of its
+transcripts (class-based TF-IDF: each cluster's text is one document).
+
+The cluster of each call is written to a side namespace next to the chunks
+(`<namespace>-call-clusters`), one row per call with the call's mean vector
+and its `call_cluster_id`, so the chunk rows themselves are never
+rewritten. `cluster_filter` turns a cluster into a chunk filter:
+
+    filters=cluster_filter("tay-sales-calls", 7)
+
+The topic map (cluster sizes, terms and calls) is saved next to the
+snapshot as clusters.json.
+"""
+
+import json
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from helper import get_namespace
+from prefect import flow, task
+from shared.aliases import resolve_namespace
+from shared.schemas import CALL_CLUSTERS_SCHEMA
+from shared.snapshot import export_namespace_snapshot, load_snapshot
+
+CLUSTER_ATTRIBUTE = "call_cluster_id"
+CLUSTERS_FILE = "clusters.json"
+# Call ids read per request from the side namespace.
+PAGE_SIZE = 1000
+
+_TOKEN = re.compile(r"[a-z][a-z0-9+#.-]{2,}")
+# English function words plus the filler that dominates spoken transcripts.
+STOPWORDS = frozenset("""
+    about above after again all also and any are aren because been before
+    being below between both but can cannot could did didn does doesn doing
+    don down during each few for from further had hadn has hasn have haven
+    having her here hers herself him himself his how into isn its itself
+    just let more most mustn myself nor not now off once only other ought
+    our ours ourselves out over own same shan she should shouldn some such
+    than that the their theirs them themselves then there these they this
+    those through too under until very was wasn were weren what when where
+    which while who whom why will with won would wouldn you your yours
+    yourself yourselves yeah yes okay like know think really right going
+    gonna want wanna thing things kind sort actually mean something get got
+    one two see well sure good great much lot lots maybe probably yep cool
+    awesome totally definitely stuff way look looking make made take said
+    say saying go come thank thanks hey everybody everyone today little
+    bit pretty able need use using used work working guys time
+    """.split())
+
+
+@dataclass
+class ClusterSummary:
+    cluster_id: int
+    size: int
+    terms: List[str]
+    call_ids: List[str]
+
+
+def call_vectors(
+    vectors: np.ndarray, call_ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Averages chunk vectors per call.
+
+    Returns (unique call ids, unit-length float32 mean vectors, and for
+    every chunk the index of its call).
+    """
+    calls, inverse = np.unique(call_ids, return_inverse=True)
+    if len(calls) == 0:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dims = vectors.shape[1] if vectors.ndim == 2 else 0
+        return calls, np.empty((0, dims), dtype=np.float32), inverse
+    order = np.argsort(inverse, kind="stable")
+    counts = np.bincount(inverse, minlength=len(calls))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    sums = np.add.reduceat(np.asarray(vectors, dtype=np.float32)[order], starts)
+    means = sums / counts[:, None]
+    return calls, _unit(means), inverse
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return (x / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def _sq_distances(x: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Squared Euclidean distances between the rows of x and centers."""
+    d = (
+        (x * x).sum(axis=1)[:, None]
+        - 2.0 * x @ centers.T
+        + (centers * centers).sum(axis=1)[None, :]
+    )
+    return np.maximum(d, 0.0)
+
+
+def _kmeans_plus_plus(x: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    centers = np.empty((k, x.shape[1]), dtype=np.float32)
+    centers[0] = x[rng.integers(len(x))]
+    closest = _sq_distances(x, centers[:1])[:, 0]
+    for i in range(1, k):
+        total = closest.sum()
+        if total <= 0:
+            index = rng.integers(len(x))
+        else:
+            index = rng.choice(len(x), p=closest / total)
+        centers[i] = x[index]
+        closest = np.minimum(closest, _sq_distances(x, centers[i : i + 1])[:, 0])
+    return centers
+
+
+def assign(x: np.ndarray, centers: np.ndarray, block_rows: int = 65_536):
+    """Returns (nearest center per row, sum of squared distances)."""
+    labels = np.empty(len(x), dtype=np.int64)
+    inertia = 0.0
+    for start in range(0, len(x), block_rows):
+        d = _sq_distances(x[start : start + block_rows], centers)
+        labels[start : start + block_rows] = d.argmin(axis=1)
+        inertia += float(d.min(axis=1).sum())
+    return labels, inertia
+
+
+def minibatch_kmeans(
+    x: np.ndarray,
+    k: int,
+    batch_size: int = 1024,
+    max_iter: int = 200,
+    tol: float = 1e-4,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Mini-batch k-means (Sculley, 2010) with k-means++ initialization.
+
+    Each step assigns a random batch to its nearest centers and moves every
+    center towards the mean of its batch members with a per-center learning
+    rate of (members in this batch) / (members seen so far). Stops when the
+    centers move less than `tol` (mean squared shift) or after `max_iter`
+    batches. Returns (centers, labels, inertia); no centers for no rows.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    k = min(k, len(x))
+    if k == 0:
+        dims = x.shape[1] if x.ndim == 2 else 0
+        return np.empty((0, dims), dtype=np.float32), np.empty(0, np.int64), 0.0
+    rng = np.random.default_rng(seed)
+    centers = _kmeans_plus_plus(x, k, rng)
+    seen = np.zeros(k, dtype=np.float64)
+
+    for _ in range(max_iter):
+        batch = x[rng.choice(len(x), size=min(batch_size, len(x)), replace=False)]
+        labels = _sq_distances(batch, centers).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k).astype(np.float64)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, batch)
+
+        updated = counts > 0
+        seen += counts
+        rate = (counts[updated] / seen[updated])[:, None].astype(np.float32)
+        batch_means = sums[updated] / counts[updated, None].astype(np.float32)
+        previous = centers.copy()
+        centers[updated] += rate * (batch_means - centers[updated])
+
+        if float(((centers - previous) ** 2).sum(axis=1).mean()) < tol:
+            break
+
+    labels, inertia = assign(x, centers)
+    return centers, labels, inertia
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = (token.strip(".-") for token in _TOKEN.findall(text.lower()))
+    return [token for token in tokens if len(token) > 2 and token not in STOPWORDS]
+
+
+def cluster_terms(
+    call_texts: List[str],
+    labels: np.ndarray,
+    k: int,
+    top_n: int = 8,
+    max_df: float = 0.5,
+) -> List[List[str]]:
+    """
+    Labels each cluster with its `top_n` class-based TF-IDF terms: term
+    frequency within the cluster's calls, weighted by log(calls / calls
+    containing the term). Terms in more than `max_df` of the calls, or in
+    only one call, are ignored.
+    """
+    call_counts = [Counter(tokenize(text)) for text in call_texts]
+    document_frequency: Counter = Counter()
+    for counts in call_counts:
+        document_frequency.update(counts.keys())
+
+    n_calls = len(call_texts)
+    vocabulary = {
+        term: i
+        for i, term in enumerate(
+            term
+            for term, df in document_frequency.items()
+            if 1 < df <= max_df * n_calls
+        )
+    }
+    if not vocabulary:
+        return [[] for _ in range(k)]
+
+    tf = np.zeros((k, len(vocabulary)), dtype=np.float32)
+    for counts, label in zip(call_counts, labels):
+        for term, count in counts.items():
+            column = vocabulary.get(term)
+            if column is not None:
+                tf[label, column] += count
+    tf /= np.maximum(tf.sum(axis=1, keepdims=True), 1.0)
+
+    df = np.zeros(len(vocabulary), dtype=np.float32)
+    for term, column in vocabulary.items():
+        df[column] = document_frequency[term]
+    scores = tf * np.log(n_calls / df)
+
+    terms = np.array(list(vocabulary))
+    return [
+        [str(term) for term in terms[np.argsort(-row)[:top_n]] if term]
+        for row in scores
+    ]
+
+
+def _call_texts(attributes, inverse: np.ndarray, n_calls: int) -> List[str]:
+    texts: List[List[str]] = [[] for _ in range(n_calls)]
+    for call_index, text in zip(inverse, attributes.column("transcript_text")):
+        if text.is_valid:
+            texts[call_index].append(text.as_py())
+    return [" ".join(parts) for parts in texts]
+
+
+@task
+def cluster_snapshot(
+    snapshot_dir: str, n_clusters: int = 20, top_n_terms: int = 8, seed: int = 0
+) -> Dict:
+    """Clusters the calls in a snapshot and saves the topic map."""
+    started = time.perf_counter()
+    vectors, attributes, manifest = load_snapshot(
+        snapshot_dir, columns=["gong_call_id_c", "transcript_text"]
+    )
+    call_ids = np.array(
+        [str(c) for c in attributes.column("gong_call_id_c").to_pylist()]
+    )
+    calls, means, inverse = call_vectors(vectors, call_ids)
+    print(f"📐 Averaged {len(call_ids)} chunks into {len(calls)} call vectors")
+
+    _, labels, inertia = minibatch_kmeans(means, n_clusters, seed=seed)
+    # An empty snapshot has no calls and so no clusters.
+    k = int(labels.max()) + 1 if len(labels) else 0
+    terms = cluster_terms(_call_texts(attributes, inverse, len(calls)), labels, k)
+
+    clusters = [
+        ClusterSummary(
+            cluster_id=cluster_id,
+            size=int((labels == cluster_id).sum()),
+            terms=terms[cluster_id][:top_n_terms],
+            call_ids=[str(c) for c in calls[labels == cluster_id]],
+        )
+        for cluster_id in range(k)
+    ]
+    topic_map = {
+        "namespace": manifest["namespace"],
+        "snapshot_version": manifest["version"],
+        "n_clusters": k,
+        "inertia": inertia,
+        "clusters": [asdict(cluster) for cluster in clusters],
+        "call_clusters": {str(c): int(label) for c, label in zip(calls, labels)},
+    }
+    (Path(snapshot_dir) / CLUSTERS_FILE).write_text(json.dumps(topic_map, indent=2))
+
+    print(f"🗺️ Clustered {len(calls)} calls in {time.perf_counter() - started:.1f}s")
+    for cluster in sorted(clusters, key=lambda c: -c.size):
+        print(
+            f"  [{cluster.cluster_id:>3}] {cluster.size:>5} calls: {', '.join(cluster.terms)}"
+        )
+    return topic_map
+
+
+def cluster_namespace(namespace: str) -> str:
+    return f"{namespace}-call-clusters"
+
+
+@task
+def write_cluster_ids(
+    namespace: str,
+    snapshot_dir: str,
+    call_clusters: Dict[str, int],
+    batch_size: int = 256,
+    max_workers: int = 8,
+) -> int:
+    """
+    Writes one row per call (mean vector, `call_cluster_id`) to the
+    side namespace and deletes the rows of calls that are no longer in the
+    snapshot.
+
+    Refuses to write if the namespace alias now points at a different
+    physical namespace than the one the snapshot was exported from.
+    """
+    vectors, attributes, manifest = load_snapshot(
+        snapshot_dir, columns=["gong_call_id_c"]
+    )
+    exported_from = manifest.get("physical_namespace", manifest["namespace"])
+    if resolve_namespace(namespace) != exported_from:
+        raise ValueError(
+            f"{snapshot_dir} was exported from {exported_from}, but {namespace} "
+            f"now resolves to {resolve_namespace(namespace)}; re-export first"
+        )
+
+    call_ids = np.array(
+        [str(c) for c in attributes.column("gong_call_id_c").to_pylist()]
+    )
+    calls, means, _ = call_vectors(vectors, call_ids)
+    keep = [i for i, call in enumerate(calls) if str(call) in call_clusters]
+    ids = [str(calls[i]) for i in keep]
+    written_at = int(time.time())
+    ns = get_namespace(cluster_namespace(namespace))
+
+    def upsert(start: int) -> None:
+        batch_ids = ids[start : start + batch_size]
+        ns.upsert(
+            ids=batch_ids,
+            vectors=means[keep[start : start + batch_size]].tolist(),
+            attributes={
+                CLUSTER_ATTRIBUTE: [call_clusters[i] for i in batch_ids],
+                "clustered_at": [written_at] * len(batch_ids),
+            },
+            schema=CALL_CLUSTERS_SCHEMA,
+            distance_metric="cosine_distance",
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(upsert, range(0, len(ids), batch_size)))
+
+    # Calls from earlier runs that are not in this snapshot.
+    stale = ns.delete_by_filter(["clustered_at", "Lt", written_at]) or 0
+    print(
+        f"🏷️ Wrote {CLUSTER_ATTRIBUTE} for {len(ids)} calls to "
+        f"{cluster_namespace(namespace)}, removed {stale} stale calls"
+    )
+    return len(ids)
+
+
+def cluster_call_ids(namespace: str, cluster_id: int) -> List[str]:
+    """The ids of the calls in a cluster."""
+    ns = get_namespace(cluster_namespace(namespace))
+    ids: List[str] = []
+    last_id = None
+    while True:
+        filters = [CLUSTER_ATTRIBUTE, "Eq", cluster_id]
+        if last_id is not None:
+            filters = ["And", [filters, ["id", "Gt", last_id]]]
+        rows = list(ns.query(top_k=PAGE_SIZE, filters=filters, rank_by=["id", "asc"]))
+        ids.extend(str(row.id) for row in rows)
+        if len(rows) < PAGE_SIZE:
+            return ids
+        last_id = rows[-1].id
+
+
+def cluster_filter(namespace: str, cluster_id: int) -> list:
+    """A chunk filter matching the calls in a cluster."""
+    return ["gong_call_id_c", "In", cluster_call_ids(namespace, cluster_id)]
+
+
+@flow(log_prints=True, persist_result=False)
+def cluster_calls(
+    namespace: str = "tay-sales-calls",
+    snapshot_dir: Optional[str] = None,
+    n_clusters: int = 20,
+    export: bool = True,
+    write_back: bool = True,
+    seed: int = 0,
+) -> Dict:
+    """
+    Clusters the calls in a namespace into topics.
+
+    Exports a fresh snapshot first unless `export` is False (then
+    `snapshot_dir` must already hold one), and writes each call's cluster
+    to the side namespace unless `write_back` is False.
+    """
+    snapshot_dir = snapshot_dir or f"snapshots/{namespace}"
+    if export:
+        export_namespace_snapshot(namespace, snapshot_dir)
+    topic_map = cluster_snapshot(snapshot_dir, n_clusters=n_clusters, seed=seed)
+    if write_back:
+        write_cluster_ids(namespace, snapshot_dir, topic_map["call_clusters"])
+    return topic_map
+
+
+if __name__ == "__main__":
+    cluster_calls(namespace="tay-test", n_clusters=8)
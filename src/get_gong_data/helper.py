@@ -1,33 +1,14 @@
 # src/get_gong_data/helper.py
-import datetime
 import json
-import os
 from typing import Any, Dict, List
 
-from dotenv import load_dotenv
-from openai import OpenAI
-
-
-def embed_text(text: str) -> List[float]:
-    """
-    Generates an embedding vector for the provided text using OpenAI's API.
-    """
-
-    load_dotenv()
-
-    # Initialize the OpenAI client once
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    if not OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY is not set in the environment variables.")
-
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
-    try:
-        response = client.embeddings.create(input=text, model="text-embedding-3-small")
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error embedding text: {e}")
-        return []
+from shared.clients import (
+    embed_text,
+    embed_texts,
+    get_namespace,
+    load_env,
+)
+from shared.schemas import TIMESTAMP_ATTRIBUTES, to_epoch
 
 
 def clean_attribute_value(key: str, value: Any) -> Any:
@@ -46,20 +27,9 @@ def clean_attribute_value(key: str, value: Any) -> Any:
         except (ValueError, TypeError):
             return None
 
-    # For datetime/date fields, return ISO format.
-    if key in (
-        "gong_call_start_c",
-        "gong_opp_close_date_time_of_call_c",
-        "gong_scheduled_c",
-    ):
-        if isinstance(value, (datetime.datetime, datetime.date)):
-            return value.isoformat()
-        # If already a string, try to parse and re-format it.
-        try:
-            parsed = datetime.datetime.fromisoformat(value)
-            return parsed.isoformat()
-        except (ValueError, TypeError):
-            return value  # leave as is if parsing fails
+    # For datetime/date fields, return epoch seconds (see shared.schemas).
+    if key in TIMESTAMP_ATTRIBUTES:
+        return to_epoch(value)
 
     # For keys that are supposed to hold JSON data.
     if "json" in key:
@@ -0,0 +1,235 @@
+# src/get_gong_data/opp_centroids.py
+"""
+One centroid vector per opportunity, for "accounts like this one" lookups.
+
+The centroid of an opportunity is the mean of the embeddings of all its
+transcript chunks. Centroids live in a small side namespace next to the
+chunks (`<namespace>-opp-centroids`), one row per
+`gong_primary_opportunity_c`, with
+
+    vector          mean chunk embedding
+    chunk_count     chunks averaged into it
+    gong_call_ids   calls already counted
+
+so finding similar opportunities is one vector search over a few thousand
+rows instead of over every chunk.
+
+Ingestion updates centroids incrementally: the chunks of newly ingested
+calls are folded into the running mean, and calls already in
+`gong_call_ids` are skipped so re-ingesting a call does not count it twice.
+`rebuild_centroids` recomputes every centroid from a snapshot, e.g. after
+re-chunking.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+from helper import get_namespace
+from prefect import task
+from shared.schemas import OPP_CENTROIDS_SCHEMA
+from shared.snapshot import load_snapshot
+
+OPP_ATTRIBUTE = "gong_primary_opportunity_c"
+CALL_ATTRIBUTE = "gong_call_id_c"
+CENTROID_ATTRIBUTES = ["chunk_count", "gong_call_ids"]
+
+# Opportunities fetched or written per request.
+BATCH_SIZE = 500
+
+
+def centroid_namespace(namespace: str) -> str:
+    return f"{namespace}-opp-centroids"
+
+
+class CentroidAccumulator:
+    """Per-opportunity vector sums, chunk counts and call ids."""
+
+    def __init__(self):
+        self.sums: Dict[str, np.ndarray] = {}
+        self.counts: Dict[str, int] = {}
+        self.calls: Dict[str, Set[str]] = {}
+
+    def add_call(self, opp_id: str, call_id: str, vectors: np.ndarray) -> None:
+        total = np.asarray(vectors, dtype=np.float64).sum(axis=0)
+        if opp_id in self.sums:
+            self.sums[opp_id] += total
+        else:
+            self.sums[opp_id] = total
+        self.counts[opp_id] = self.counts.get(opp_id, 0) + len(vectors)
+        self.calls.setdefault(opp_id, set()).add(call_id)
+
+    def merge_existing(self, opp_id: str, vector: List[float], attributes: Dict):
+        """Folds a stored centroid (mean and count) back into the sums."""
+        count = int(attributes.get("chunk_count") or 0)
+        self.sums[opp_id] += np.asarray(vector, dtype=np.float64) * count
+        self.counts[opp_id] += count
+        self.calls[opp_id].update(attributes.get("gong_call_ids") or [])
+
+    def rows(self) -> Dict[str, Any]:
+        opp_ids = sorted(self.sums)
+        return {
+            "ids": opp_ids,
+            "vectors": [
+                (self.sums[opp] / self.counts[opp]).astype(np.float32).tolist()
+                for opp in opp_ids
+            ],
+            "attributes": {
+                "chunk_count": [self.counts[opp] for opp in opp_ids],
+                "gong_call_ids": [sorted(self.calls[opp]) for opp in opp_ids],
+            },
+        }
+
+
+def fetch_centroids(namespace: str, opp_ids: List[str]) -> Dict[str, Any]:
+    """Returns {opp_id: row} for the opportunities that have a centroid."""
+    ns = get_namespace(centroid_namespace(namespace))
+    if not ns.exists():
+        return {}
+    found = {}
+    for start in range(0, len(opp_ids), BATCH_SIZE):
+        batch = opp_ids[start : start + BATCH_SIZE]
+        results = ns.query(
+            top_k=len(batch),
+            filters=["id", "In", batch],
+            include_vectors=True,
+            include_attributes=CENTROID_ATTRIBUTES,
+        )
+        found.update({row.id: row for row in results})
+    return found
+
+
+def write_centroids(namespace: str, accumulator: CentroidAccumulator) -> int:
+    rows = accumulator.rows()
+    ns = get_namespace(centroid_namespace(namespace))
+
+    def upsert(start: int) -> None:
+        end = start + BATCH_SIZE
+        ns.upsert(
+            ids=rows["ids"][start:end],
+            vectors=rows["vectors"][start:end],
+            attributes={k: v[start:end] for k, v in rows["attributes"].items()},
+            schema=OPP_CENTROIDS_SCHEMA,
+            distance_metric="cosine_distance",
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(upsert, range(0, len(rows["ids"]), BATCH_SIZE)))
+    return len(rows["ids"])
+
+
+@task
+def update_opportunity_centroids(
+    namespace: str,
+    doc_vectors: List[List[float]],
+    attributes: Dict[str, List[Any]],
+) -> int:
+    """
+    Folds freshly embedded chunks (the output of
+    process_and_embed_transcripts) into their opportunities' centroids.
+    Returns the number of centroids written.
+    """
+    by_call: Dict[tuple, List[int]] = {}
+    for i, (opp_id, call_id) in enumerate(
+        zip(attributes[OPP_ATTRIBUTE], attributes[CALL_ATTRIBUTE])
+    ):
+        if opp_id:
+            by_call.setdefault((opp_id, str(call_id)), []).append(i)
+    if not by_call:
+        return 0
+
+    existing = fetch_centroids(namespace, sorted({opp for opp, _ in by_call}))
+    vectors = np.asarray(doc_vectors, dtype=np.float32)
+    accumulator = CentroidAccumulator()
+    for (opp_id, call_id), rows in by_call.items():
+        counted = existing.get(opp_id)
+        if counted and call_id in (
+            (counted.attributes or {}).get("gong_call_ids") or []
+        ):
+            continue
+        accumulator.add_call(opp_id, call_id, vectors[rows])
+
+    for opp_id in accumulator.sums:
+        if opp_id in existing:
+            row = existing[opp_id]
+            accumulator.merge_existing(opp_id, row.vector, row.attributes or {})
+
+    written = write_centroids(namespace, accumulator)
+    print(
+        f"🎯 Updated {written} opportunity centroids in {centroid_namespace(namespace)}"
+    )
+    return written
+
+
+def rebuild_centroids(namespace: str, snapshot_dir: str) -> int:
+    """
+    Recomputes every opportunity centroid from a snapshot of `namespace`
+    and overwrites the centroid namespace with them.
+    """
+    vectors, attributes, _ = load_snapshot(
+        snapshot_dir, columns=[OPP_ATTRIBUTE, CALL_ATTRIBUTE]
+    )
+    opp_ids = np.array(
+        [str(o) if o else "" for o in attributes.column(OPP_ATTRIBUTE).to_pylist()]
+    )
+    call_ids = attributes.column(CALL_ATTRIBUTE).to_pylist()
+
+    opps, inverse = np.unique(opp_ids, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    counts = np.bincount(inverse, minlength=len(opps))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    sums = np.add.reduceat(np.asarray(vectors, dtype=np.float64)[order], starts)
+
+    accumulator = CentroidAccumulator()
+    for index, opp_id in enumerate(opps):
+        if opp_id:
+            accumulator.sums[opp_id] = sums[index]
+            accumulator.counts[opp_id] = int(counts[index])
+            accumulator.calls[opp_id] = set()
+    for opp_id, call_id in zip(opp_ids, call_ids):
+        if opp_id:
+            accumulator.calls[opp_id].add(str(call_id))
+
+    ns = get_namespace(centroid_namespace(namespace))
+    if ns.exists():
+        ns.delete_all()
+    written = write_centroids(namespace, accumulator)
+    print(f"🎯 Rebuilt {written} opportunity centroids from {snapshot_dir}")
+    return written
+
+
+def similar_opportunities(
+    opp_id: str,
+    namespace: str = "tay-sales-calls",
+    top_k: int = 10,
+    min_chunks: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    Returns the `top_k` opportunities whose centroids are closest to
+    `opp_id`'s, as dicts of opp id, cosine distance and chunk count.
+    """
+    existing = fetch_centroids(namespace, [opp_id])
+    if opp_id not in existing:
+        print(
+            f"No centroid for opportunity {opp_id} in {centroid_namespace(namespace)}"
+        )
+        return []
+
+    filters: Optional[list] = ["id", "NotEq", opp_id]
+    if min_chunks > 1:
+        filters = ["And", [filters, ["chunk_count", "Gte", min_chunks]]]
+    results = get_namespace(centroid_namespace(namespace)).query(
+        vector=existing[opp_id].vector,
+        distance_metric="cosine_distance",
+        top_k=top_k,
+        filters=filters,
+        include_attributes=["chunk_count"],
+    )
+    return [
+        {
+            "opp_id": row.id,
+            "dist": row.dist,
+            "chunk_count": (row.attributes or {}).get("chunk_count"),
+        }
+        for row in results
+    ]
@@ -1,6 +1,4 @@
-import turbopuffer as tpuf
-from helper import embed_text
-import os
+from helper import embed_text, get_namespace
 
 
 def query_namespace(
@@ -13,12 +11,8 @@ def query_namespace(
     # Convert query into a vector
     query_vector = embed_text(query_text)
 
-    # Configure your API key and base URL
-    tpuf.api_key = os.getenv("TURBOPUFFER_API_KEY")
-    tpuf.api_base_url = "https://gcp-us-central1.turbopuffer.com"
-
     # Query the namespace using the vector
-    ns = tpuf.Namespace(namespace)
+    ns = get_namespace(namespace)
     results = ns.query(
         vector=query_vector,
         distance_metric="cosine_distance",
@@ -57,12 +51,8 @@ def query_namespace(
 
 
 def print_namespace_schema(namespace: str = "tay-test"):
-    # Configure your API key and base URL
-    tpuf.api_key = os.getenv("TURBOPUFFER_API_KEY")
-    tpuf.api_base_url = "https://gcp-us-central1.turbopuffer.com"
-
     # Instantiate your namespace object
-    ns = tpuf.Namespace(namespace)
+    ns = get_namespace(namespace)
 
     schema = ns.schema()
 
@@ -2,23 +2,28 @@
 import os
 from typing import Dict, List
 
-import turbopuffer as tpuf
-from dotenv import load_dotenv
 from google.cloud import bigquery
 from helper import (
     clean_attributes_for_row,
     embed_text,
+    get_namespace,
+    load_env,
     process_combined_transcript,
     chunk_text,
 )
+from call_digests import write_call_digests
+from opp_centroids import update_opportunity_centroids
 from queries import attributes, transcript_query
+from shared.profiling import profiled, profiling_enabled
+from shared.schemas import namespace_schema
+from shared.tech_tagging import CLOUDS_ATTRIBUTE, TOOLS_ATTRIBUTE, tag_chunk
 from prefect import task, flow
 from prefect.cache_policies import TASK_SOURCE, INPUTS
 
 
 @task
 def fetch_transcripts_from_bigquery(limit_n_calls):
-    load_dotenv()
+    load_env()
     gcp_project_id = os.getenv("GCP_PROJECT_ID")
     client = bigquery.Client(project=gcp_project_id)
 
@@ -33,6 +38,7 @@ def fetch_transcripts_from_bigquery(limit_n_calls):
 
 
 @task
+@profiled
 def process_and_embed_transcripts(
     rows: List[Dict], chunk_size: int = 2000, overlap: int = 200
 ) -> Dict:
@@ -46,6 +52,9 @@ def process_and_embed_transcripts(
     # Initialize a new key for the chunk index.
     upsert_attributes["chunk_index"] = []
     upsert_attributes["transcript_text"] = []
+    # Orchestration tools and cloud providers mentioned in each chunk.
+    upsert_attributes[TOOLS_ATTRIBUTE] = []
+    upsert_attributes[CLOUDS_ATTRIBUTE] = []
 
     for row in rows:
         call_id = row.get("gong_call_id_c")
@@ -91,6 +100,8 @@ def process_and_embed_transcripts(
                 upsert_attributes[attr_key].append(value)
             upsert_attributes["chunk_index"].append(f"-{idx}- of {len(chunks)}")
             upsert_attributes["transcript_text"].append(chunk)
+            for attr_key, value in tag_chunk(chunk).items():
+                upsert_attributes[attr_key].append(value)
 
     return {
         "doc_ids": doc_ids,
@@ -100,6 +111,7 @@ def process_and_embed_transcripts(
 
 
 @task
+@profiled
 def batch_upsert(
     namespace: str,
     doc_ids: List[str],
@@ -108,12 +120,11 @@ def batch_upsert(
     batch_size: int = 50,
 ):
     """
-    Upsert documents in smaller batches.
+    Upsert documents in smaller batches, with the declared sales-call schema
+    (see shared.schemas).
     """
-    load_dotenv()
-    tpuf.api_key = os.getenv("TURBOPUFFER_API_KEY")
-    tpuf.api_base_url = "https://gcp-us-central1.turbopuffer.com"
-    ns = tpuf.Namespace(namespace)
+    ns = get_namespace(namespace)
+    schema = namespace_schema("sales-calls", attributes)
 
     for i in range(0, len(doc_ids), batch_size):
         print(
@@ -123,8 +134,12 @@ def batch_upsert(
         batch_vectors = doc_vectors[i : i + batch_size]
         # For attributes, slice each list so that every attribute list is the same length as the batch.
         batch_attributes = {k: v[i : i + batch_size] for k, v in attributes.items()}
-        ns = tpuf.Namespace(namespace)
-        ns.upsert(ids=batch_ids, vectors=batch_vectors, attributes=batch_attributes)
+        ns.upsert(
+            ids=batch_ids,
+            vectors=batch_vectors,
+            attributes=batch_attributes,
+            schema=schema,
+        )
 
 
 @flow(log_prints=True, persist_result=False)
@@ -133,18 +148,39 @@ def refresh_gong_transcripts(
     limit_n_calls: int = 50,
     chunk_size: int = 2000,
     overlap: int = 200,
+    profile: bool = False,
+    update_centroids: bool = True,
+    write_digests: bool = False,
 ):
     """
     Get the transcript data from Gong
+
+    With `profile` (or PROFILING=1), the embedding and upsert tasks save
+    cProfile stats, flamegraphs and peak memory (see shared.profiling).
+    With `update_centroids`, the new chunks are folded into the
+    per-opportunity centroids (see opp_centroids). With `write_digests`,
+    calls without a digest get one (see call_digests).
+
+    Call timestamps are written as epoch seconds; namespaces created
+    before that must be migrated first (`cli.py migrate-schema`).
     """
-    rows = fetch_transcripts_from_bigquery(limit_n_calls)
-    vector_and_attributes = process_and_embed_transcripts(rows)
-    batch_upsert(
-        namespace,
-        vector_and_attributes["doc_ids"],
-        vector_and_attributes["doc_vectors"],
-        vector_and_attributes["attributes"],
-    )
+    with profiling_enabled(profile):
+        rows = fetch_transcripts_from_bigquery(limit_n_calls)
+        vector_and_attributes = process_and_embed_transcripts(rows)
+        batch_upsert(
+            namespace,
+            vector_and_attributes["doc_ids"],
+            vector_and_attributes["doc_vectors"],
+            vector_and_attributes["attributes"],
+        )
+    if update_centroids:
+        update_opportunity_centroids(
+            namespace,
+            vector_and_attributes["doc_vectors"],
+            vector_and_attributes["attributes"],
+        )
+    if write_digests:
+        write_call_digests(namespace, vector_and_attributes["attributes"])
 
 
 if __name__ == "__main__":
@@ -1,7 +1,11 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from typing import List, Literal, Optional
 
+from incremental_crawl import refresh_sitemaps_incrementally
+from incremental_github import refresh_github_incrementally
+from ingest_state import save_state
 from prefect import flow, task
 from prefect.tasks import task_input_hash
 from raggy.documents import Document
@@ -9,6 +13,81 @@ from raggy.loaders.base import Loader
 from raggy.loaders.github import GitHubRepoLoader
 from raggy.loaders.web import SitemapLoader
 from raggy.vectorstores.tpuf import TurboPuffer
+from shared.aimd import AIMDController
+from shared.aliases import (
+    discard_shadow,
+    promote_shadow,
+    resolve_namespace,
+    shadow_namespace_name,
+)
+from shared.clients import get_namespace
+from shared.schemas import apply_schema
+from streaming import stream_loaders_to_tpuf, write_documents
+
+# A shadow namespace takes no query traffic while it is built, so reset
+# rebuilds write with at least this many concurrent batches.
+SHADOW_MAX_CONCURRENT = 32
+# Upper bound for the adaptive write concurrency.
+ADAPTIVE_MAX_CONCURRENT = 64
+
+
+def write_controller(
+    mode: Literal["upsert", "reset"], max_concurrent: int, adaptive: bool
+) -> Optional[AIMDController]:
+    """
+    Returns an AIMD controller starting at `max_concurrent` in-flight
+    batches, or None for fixed concurrency.
+    """
+    if not adaptive:
+        return None
+    if mode == "reset":
+        max_concurrent = max(max_concurrent, SHADOW_MAX_CONCURRENT)
+    return AIMDController(
+        initial_limit=max_concurrent,
+        max_limit=max(ADAPTIVE_MAX_CONCURRENT, max_concurrent),
+    )
+
+
+async def upsert_documents(
+    tpuf: TurboPuffer,
+    documents: List[Document],
+    batch_size: int,
+    max_concurrent: int,
+    controller: Optional[AIMDController] = None,
+) -> None:
+    """
+    Upserts in batches, either `max_concurrent` at a time or with as many
+    batches in flight as `controller` allows. Each batch is embedded on the
+    event loop and written from its own thread, so in-flight batches really
+    write concurrently and the controller times the service, not the loop.
+    """
+    batches = [
+        documents[i : i + batch_size] for i in range(0, len(documents), batch_size)
+    ]
+    limit = controller.max_limit if controller else max_concurrent
+    with ThreadPoolExecutor(
+        max_workers=limit, thread_name_prefix="tpuf-write"
+    ) as executor:
+        if controller is None:
+            semaphore = asyncio.Semaphore(max_concurrent)
+
+            async def write(batch: List[Document]) -> None:
+                async with semaphore:
+                    await write_documents(tpuf, batch, executor)
+
+            await asyncio.gather(*[write(batch) for batch in batches])
+            return
+
+        await asyncio.gather(
+            *[
+                controller.run(
+                    lambda batch=batch: write_documents(tpuf, batch, executor),
+                    items=len(batch),
+                )
+                for batch in batches
+            ]
+        )
+    print(f"⚙️ Adaptive writes: {controller.summary()}")
 
 
 @task(
@@ -25,18 +104,240 @@ async def run_loader(loader: Loader) -> List[Document]:
 
 @task(cache_key_fn=task_input_hash, cache_expiration=timedelta(days=1))
 async def add_documents(
-    tpuf: TurboPuffer,
+    namespace: str,
     documents: list[Document],
     mode: Literal["upsert", "reset"],
     batch_size: int = 100,
     max_concurrent: int = 8,
+    adaptive_concurrency: bool = True,
+    delete_previous: bool = True,
 ) -> None:
-    """Add documents to TurboPuffer with batching support"""
+    """
+    Add documents to TurboPuffer with batching support.
+
+    "upsert" writes into the namespace the alias currently points at.
+    "reset" bulk-loads a new shadow namespace, verifies its row count and
+    points the alias at it, so queries keep hitting a complete namespace for
+    the whole rebuild. The shadow gets the declared docs schema (see
+    shared.schemas) before it is promoted. With `delete_previous` the
+    namespace it replaced is deleted once readers' alias caches have
+    expired (see shared.aliases).
+
+    With `adaptive_concurrency` the number of in-flight batches starts at
+    `max_concurrent` and is tuned by an AIMD controller from write latency
+    and throttling.
+    """
+    controller = write_controller(mode, max_concurrent, adaptive_concurrency)
+    if mode == "reset":
+        shadow = shadow_namespace_name(namespace)
+        print(f"Building shadow namespace {shadow} for {namespace}")
+        try:
+            with TurboPuffer(namespace=shadow) as tpuf:
+                await upsert_documents(
+                    tpuf,
+                    documents,
+                    batch_size=batch_size,
+                    max_concurrent=max(max_concurrent, SHADOW_MAX_CONCURRENT),
+                    controller=controller,
+                )
+            await asyncio.to_thread(apply_schema, shadow, "docs")
+        except Exception:
+            await asyncio.to_thread(discard_shadow, shadow)
+            raise
+        await asyncio.to_thread(
+            promote_shadow,
+            namespace,
+            shadow,
+            len(documents),
+            delete_previous=delete_previous,
+        )
+        # Incremental state describes excerpts of the replaced namespace.
+        save_state(namespace, {})
+    else:
+        with TurboPuffer(namespace=resolve_namespace(namespace)) as tpuf:
+            await upsert_documents(
+                tpuf,
+                documents,
+                batch_size=batch_size,
+                max_concurrent=max_concurrent,
+                controller=controller,
+            )
+
+
+@task(task_run_name="Stream {namespace} ({mode})")
+async def stream_documents(
+    namespace: str,
+    loaders: List[Loader],
+    mode: Literal["upsert", "reset"],
+    batch_size: int = 100,
+    max_concurrent: int = 8,
+    adaptive_concurrency: bool = True,
+    delete_previous: bool = True,
+) -> int:
+    """
+    Crawl and upsert concurrently through a bounded queue. Loaders run
+    through `run_loader`, so they are retried. In reset mode the documents
+    stream into a shadow namespace that gets the docs schema and is
+    promoted at the end (deleting the replaced namespace with
+    `delete_previous`, as in add_documents); if a loader or write fails, the
+    shadow is deleted and the namespace is left as it was.
+    """
+    controller = write_controller(mode, max_concurrent, adaptive_concurrency)
     if mode == "reset":
-        raise NotImplementedError("Reset mode is not implemented")
+        target = shadow_namespace_name(namespace)
+        max_concurrent = max(max_concurrent, SHADOW_MAX_CONCURRENT)
     else:
-        await tpuf.upsert_batched(
-            documents=documents, batch_size=batch_size, max_concurrent=max_concurrent
+        target = resolve_namespace(namespace)
+
+    try:
+        with TurboPuffer(namespace=target) as tpuf:
+            count = await stream_loaders_to_tpuf(
+                tpuf,
+                loaders,
+                batch_size=batch_size,
+                max_concurrent=max_concurrent,
+                controller=controller,
+                load=run_loader,
+            )
+        if mode == "reset":
+            await asyncio.to_thread(apply_schema, target, "docs")
+    except Exception:
+        if mode == "reset":
+            await asyncio.to_thread(discard_shadow, target)
+        raise
+
+    if mode == "reset":
+        await asyncio.to_thread(
+            promote_shadow, namespace, target, count, delete_previous=delete_previous
+        )
+        save_state(namespace, {})
+    return count
+
+
+@task(task_run_name="Incremental crawl of {sitemap_urls}")
+async def crawl_sitemaps_incrementally(
+    namespace: str,
+    sitemap_urls: List[str],
+    sitemap_exclude: Optional[List[str]] = None,
+    batch_size: int = 100,
+    max_concurrent: int = 8,
+    target: Optional[str] = None,
+) -> dict:
+    """
+    Upsert only the sitemap pages that changed since the last crawl, into
+    the physical namespace `target` (default: the one `namespace` resolves to)
+    """
+    with TurboPuffer(namespace=target or resolve_namespace(namespace)) as tpuf:
+        return await refresh_sitemaps_incrementally(
+            tpuf,
+            namespace=namespace,
+            sitemap_urls=sitemap_urls,
+            exclude=sitemap_exclude,
+            batch_size=batch_size,
+            max_concurrent=max_concurrent,
+        )
+
+
+@task(task_run_name="Incremental sync of {github_repo}")
+async def sync_github_incrementally(
+    namespace: str,
+    github_repo: str,
+    github_include_globs: List[str],
+    batch_size: int = 100,
+    target: Optional[str] = None,
+) -> dict:
+    """
+    Upsert only the repo files that changed since the last ingested commit,
+    into the physical namespace `target` (default: the one `namespace`
+    resolves to)
+    """
+    with TurboPuffer(namespace=target or resolve_namespace(namespace)) as tpuf:
+        return await refresh_github_incrementally(
+            tpuf,
+            namespace=namespace,
+            repo=github_repo,
+            include_globs=github_include_globs,
+            batch_size=batch_size,
+        )
+
+
+def has_full_refresh_excerpts(namespace: str) -> bool:
+    """
+    Whether `namespace` holds excerpts written by the full loaders. Those
+    have random ids and no `link` attribute, so the incremental crawl can
+    neither overwrite nor delete them.
+    """
+    import turbopuffer as tpuf
+
+    try:
+        rows = get_namespace(namespace).query(top_k=1, filters=["link", "Eq", None])
+    except tpuf.NotFoundError:
+        return False
+    return bool(rows)
+
+
+async def refresh_incrementally(
+    namespace: str,
+    sitemap_urls: Optional[List[str]],
+    sitemap_exclude: Optional[List[str]],
+    github_repo: Optional[str],
+    github_include_globs: Optional[List[str]],
+    batch_size: int,
+    max_concurrent: int,
+    delete_previous: bool = True,
+) -> None:
+    """
+    Incremental refresh of the sitemaps and GitHub repo. The first run
+    against a namespace built by the full loaders is a one-time migration:
+    it rebuilds the namespace with stable ids from these sources into a
+    shadow namespace and promotes it, so the pages are not stored twice
+    under two kinds of id (deleting the replaced namespace with
+    `delete_previous`). Later runs update the namespace in place.
+    """
+    target = None
+    if await asyncio.to_thread(has_full_refresh_excerpts, namespace):
+        target = shadow_namespace_name(namespace)
+        print(
+            f"{namespace} was written by a full refresh; rebuilding it into "
+            f"{target} with stable excerpt ids"
+        )
+        # Every page and file must be written to the new namespace.
+        save_state(namespace, {})
+
+    stats = []
+    try:
+        if sitemap_urls:
+            stats.append(
+                await crawl_sitemaps_incrementally(
+                    namespace=namespace,
+                    sitemap_urls=sitemap_urls,
+                    sitemap_exclude=sitemap_exclude,
+                    batch_size=batch_size,
+                    max_concurrent=max_concurrent,
+                    target=target,
+                )
+            )
+        if github_repo:
+            stats.append(
+                await sync_github_incrementally(
+                    namespace=namespace,
+                    github_repo=github_repo,
+                    github_include_globs=github_include_globs or ["README.md"],
+                    batch_size=batch_size,
+                    target=target,
+                )
+            )
+        if target:
+            await asyncio.to_thread(apply_schema, target, "docs")
+    except Exception:
+        if target:
+            await asyncio.to_thread(discard_shadow, target)
+        raise
+
+    if target:
+        count = sum(s["upserted"] - s["deleted"] for s in stats)
+        await asyncio.to_thread(
+            promote_shadow, namespace, target, count, delete_previous=delete_previous
         )
 
 
@@ -54,16 +355,50 @@ async def refresh_tpuf(
     # Batch processing params
     batch_size: int = 100,
     max_concurrent: int = 8,
+    # Only re-ingest pages and repo files that changed since the last run
+    incremental: bool = False,
+    # Upsert while loaders are still crawling instead of after all of them
+    streaming: bool = False,
+    # Tune the number of in-flight batches from write latency and throttling,
+    # starting at max_concurrent
+    adaptive_concurrency: bool = True,
+    # Delete the namespace a rebuild replaced once readers' alias caches
+    # have expired
+    delete_previous: bool = True,
 ):
     """
     Flow updating the TurboPuffer vectorstore with documents from one or more data sources:
      - Zero or more sitemaps (SitemapLoader)
      - Optionally a GitHub repo (GitHubRepoLoader)
+
+    With `incremental=True` (upsert mode only) sitemaps are crawled with
+    lastmod/ETag checks and the GitHub repo is diffed against the last
+    ingested commit, using the state saved by the previous run; only changed
+    pages and files are re-embedded. The first incremental run after a full
+    refresh rebuilds the namespace once with stable ids (see
+    refresh_incrementally).
+
+    With `streaming=True` loaders feed a bounded queue that upsert workers
+    drain while the crawl is still running.
     """
     loaders = []
 
+    if incremental and mode == "reset":
+        raise ValueError("Incremental refresh is only supported in upsert mode")
+
+    if incremental:
+        await refresh_incrementally(
+            namespace,
+            sitemap_urls=sitemap_urls,
+            sitemap_exclude=sitemap_exclude,
+            github_repo=github_repo,
+            github_include_globs=github_include_globs,
+            batch_size=batch_size,
+            max_concurrent=max_concurrent,
+            delete_previous=delete_previous,
+        )
     # Add the sitemap loader if URLs are provided
-    if sitemap_urls:
+    elif sitemap_urls:
         loaders.append(
             SitemapLoader(
                 urls=sitemap_urls,
@@ -72,7 +407,7 @@ async def refresh_tpuf(
         )
 
     # Add the GitHub loader if a repo is provided
-    if github_repo:
+    if github_repo and not incremental:
         loaders.append(
             GitHubRepoLoader(
                 repo=github_repo,
@@ -82,7 +417,21 @@ async def refresh_tpuf(
 
     # If no loaders were provided, you might want to raise an error or skip
     if not loaders:
-        print("No loaders specified — nothing to do.")
+        if not (incremental and (sitemap_urls or github_repo)):
+            print("No loaders specified — nothing to do.")
+        return
+
+    if streaming:
+        count = await stream_documents(
+            namespace=namespace,
+            loaders=loaders,
+            mode=mode,
+            batch_size=batch_size,
+            max_concurrent=max_concurrent,
+            adaptive_concurrency=adaptive_concurrency,
+            delete_previous=delete_previous,
+        )
+        print(f"Added {count} documents to the {namespace} namespace.")
         return
 
     # Orchestrate loading of documents
@@ -94,15 +443,16 @@ async def refresh_tpuf(
 
     print(f"Loaded {len(documents)} documents from specified sources.")
 
-    with TurboPuffer(namespace=namespace) as tpuf:
-        await add_documents(
-            tpuf=tpuf,
-            documents=documents,
-            mode=mode,
-            batch_size=batch_size,
-            max_concurrent=max_concurrent,
-        )
-        print(f"Added {len(documents)} documents to the {namespace} namespace.")
+    await add_documents(
+        namespace=namespace,
+        documents=documents,
+        mode=mode,
+        batch_size=batch_size,
+        max_concurrent=max_concurrent,
+        adaptive_concurrency=adaptive_concurrency,
+        delete_previous=delete_previous,
+    )
+    print(f"Added {len(documents)} documents to the {namespace} namespace.")
 
 
 if __name__ == "__main__":
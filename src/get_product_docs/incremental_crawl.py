@@ -0,0 +1,272 @@
+# src/get_product_docs/incremental_crawl.py
+"""
+Incremental sitemap crawl for the docs refresh.
+
+For every URL we remember the sitemap `lastmod`, the response's ETag and
+Last-Modified headers, a hash of the extracted text and the ids of the
+excerpts we wrote. On the next run:
+
+    - URLs whose sitemap `lastmod` is unchanged are skipped without a request
+    - other URLs are fetched with If-None-Match / If-Modified-Since; a 304 is
+      skipped
+    - a 200 whose extracted text hashes to the same value is skipped
+    - only pages that really changed are split into excerpts and upserted,
+      and excerpts that no longer exist are deleted
+    - URLs that disappeared from the sitemap have their excerpts deleted
+
+The sitemap URL can point anywhere, including a local `python -m http.server`
+serving a sitemap.xml, which is how the incremental behaviour can be
+exercised without hitting the real docs site.
+"""
+
+import asyncio
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import raggy
+from ingest_state import content_hash, load_state, save_state, stable_id
+from raggy.documents import Document, document_to_excerpts
+
+if TYPE_CHECKING:
+    from raggy.vectorstores.tpuf import TurboPuffer
+
+STATE_SECTION = "sitemap"
+
+
+@dataclass
+class SitemapEntry:
+    url: str
+    lastmod: Optional[str]
+    sitemap: str
+
+
+@dataclass
+class PageChange:
+    """A page whose excerpts must be (re)written and/or deleted."""
+
+    url: str
+    documents: List[Document] = field(default_factory=list)
+    delete_ids: List[str] = field(default_factory=list)
+    # New state record for the URL, or None if the URL was removed.
+    record: Optional[Dict[str, Any]] = None
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+async def fetch_sitemap_entries(
+    client: httpx.AsyncClient, sitemap_url: str
+) -> List[SitemapEntry]:
+    """
+    Returns the (url, lastmod) entries of a sitemap, following sitemap indexes.
+    """
+    response = await client.get(sitemap_url)
+    response.raise_for_status()
+    root = ET.fromstring(response.content)
+
+    def child_text(element, name: str) -> Optional[str]:
+        for child in element:
+            if _local_name(child.tag) == name and child.text:
+                return child.text.strip()
+        return None
+
+    if _local_name(root.tag) == "sitemapindex":
+        child_sitemaps = [
+            child_text(element, "loc")
+            for element in root
+            if _local_name(element.tag) == "sitemap"
+        ]
+        nested = await asyncio.gather(
+            *[fetch_sitemap_entries(client, url) for url in child_sitemaps if url]
+        )
+        return [entry for entries in nested for entry in entries]
+
+    return [
+        SitemapEntry(
+            url=child_text(element, "loc"),
+            lastmod=child_text(element, "lastmod"),
+            sitemap=sitemap_url,
+        )
+        for element in root
+        if _local_name(element.tag) == "url" and child_text(element, "loc")
+    ]
+
+
+async def page_to_documents(url: str, text: str) -> List[Document]:
+    """
+    Splits a page into raggy excerpts with ids that are stable per URL and
+    excerpt position.
+    """
+    document = Document(text=text, metadata={"link": url, "source": "sitemap"})
+    excerpts = await document_to_excerpts(document)
+    return [
+        excerpt.model_copy(update={"id": stable_id(url, i)})
+        for i, excerpt in enumerate(excerpts)
+    ]
+
+
+async def _check_page(
+    client: httpx.AsyncClient,
+    entry: SitemapEntry,
+    record: Optional[Dict[str, Any]],
+    semaphore: asyncio.Semaphore,
+) -> Optional[PageChange]:
+    """
+    Returns a PageChange if the page changed. Header-only updates (new ETag,
+    new lastmod, same content) are applied to `record` in place.
+    """
+    if record and entry.lastmod and record.get("lastmod") == entry.lastmod:
+        return None
+
+    headers = {}
+    if record and record.get("etag"):
+        headers["If-None-Match"] = record["etag"]
+    if record and record.get("last_modified"):
+        headers["If-Modified-Since"] = record["last_modified"]
+
+    async with semaphore:
+        try:
+            response = await client.get(entry.url, headers=headers)
+        except httpx.HTTPError as e:
+            print(f"Error fetching {entry.url}: {e}")
+            return None
+
+    if response.status_code == 304:
+        record["lastmod"] = entry.lastmod
+        return None
+    if response.status_code != 200:
+        print(f"Received status {response.status_code} from {entry.url}")
+        return None
+
+    text = raggy.settings.html_parser(response.text)
+    new_record = {
+        "sitemap": entry.sitemap,
+        "lastmod": entry.lastmod,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_hash": content_hash(text),
+        "excerpt_ids": (record or {}).get("excerpt_ids", []),
+    }
+    if record and record.get("content_hash") == new_record["content_hash"]:
+        record.update(new_record)
+        return None
+
+    documents = await page_to_documents(entry.url, text)
+    new_ids = [doc.id for doc in documents]
+    new_record["excerpt_ids"] = new_ids
+    old_ids = (record or {}).get("excerpt_ids", [])
+    return PageChange(
+        url=entry.url,
+        documents=documents,
+        delete_ids=[i for i in old_ids if i not in set(new_ids)],
+        record=new_record,
+    )
+
+
+async def iter_changed_pages(
+    sitemap_urls: List[str],
+    sitemap_state: Dict[str, Dict[str, Any]],
+    exclude: Optional[List[str]] = None,
+    max_concurrent: int = 16,
+    headers: Optional[Dict[str, str]] = None,
+) -> AsyncIterator[PageChange]:
+    """
+    Yields a PageChange for every page that was added, changed or removed
+    since the state was recorded, as soon as each page has been checked.
+    """
+    exclude = exclude or []
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async with httpx.AsyncClient(
+        headers=headers, timeout=30, follow_redirects=True
+    ) as client:
+        sitemap_entries = await asyncio.gather(
+            *[fetch_sitemap_entries(client, url) for url in sitemap_urls]
+        )
+        entries = {}
+        for sitemap_url, group in zip(sitemap_urls, sitemap_entries):
+            for entry in group:
+                if any(pattern in entry.url for pattern in exclude):
+                    continue
+                # Track pages by the sitemap they were requested through, not
+                # the child sitemap of an index they were found in.
+                entry.sitemap = sitemap_url
+                entries[entry.url] = entry
+        print(f"🗺️ {len(entries)} URLs in {len(sitemap_urls)} sitemap(s)")
+
+        # Pages that were ingested from these sitemaps but are gone now.
+        for url, record in list(sitemap_state.items()):
+            if record.get("sitemap") in sitemap_urls and url not in entries:
+                yield PageChange(url=url, delete_ids=record.get("excerpt_ids", []))
+
+        checks = [
+            _check_page(client, entry, sitemap_state.get(url), semaphore)
+            for url, entry in entries.items()
+        ]
+        for check in asyncio.as_completed(checks):
+            change = await check
+            if change is not None:
+                yield change
+
+
+async def refresh_sitemaps_incrementally(
+    tpuf: "TurboPuffer",
+    namespace: str,
+    sitemap_urls: List[str],
+    exclude: Optional[List[str]] = None,
+    batch_size: int = 100,
+    max_concurrent: int = 16,
+) -> Dict[str, int]:
+    """
+    Upserts only the changed pages of `sitemap_urls` into `tpuf` and deletes
+    excerpts of changed or removed pages that no longer exist. State is saved
+    after the writes succeed.
+    """
+    state = load_state(namespace)
+    sitemap_state = state.setdefault(STATE_SECTION, {})
+    stats = {"changed_pages": 0, "removed_pages": 0, "upserted": 0, "deleted": 0}
+    pending: List[PageChange] = []
+
+    async def flush():
+        documents = [doc for change in pending for doc in change.documents]
+        delete_ids = [i for change in pending for i in change.delete_ids]
+        if documents:
+            await asyncio.to_thread(
+                tpuf.upsert,
+                documents=documents,
+                attributes={"link": [doc.metadata.link for doc in documents]},
+            )
+        if delete_ids:
+            await asyncio.to_thread(tpuf.delete, delete_ids)
+        for change in pending:
+            if change.record is None:
+                sitemap_state.pop(change.url, None)
+            else:
+                sitemap_state[change.url] = change.record
+        stats["upserted"] += len(documents)
+        stats["deleted"] += len(delete_ids)
+        pending.clear()
+
+    async for change in iter_changed_pages(
+        sitemap_urls, sitemap_state, exclude=exclude, max_concurrent=max_concurrent
+    ):
+        if change.record is None:
+            stats["removed_pages"] += 1
+        else:
+            stats["changed_pages"] += 1
+        pending.append(change)
+        if sum(len(c.documents) for c in pending) >= batch_size:
+            await flush()
+
+    await flush()
+    save_state(namespace, state)
+
+    print(
+        f"🔁 Incremental crawl: {stats['changed_pages']} changed, "
+        f"{stats['removed_pages']} removed, {stats['upserted']} excerpts upserted, "
+        f"{stats['deleted']} deleted"
+    )
+    return stats
@@ -0,0 +1,222 @@
+# src/get_product_docs/incremental_github.py
+"""
+Incremental GitHub ingestion for the docs refresh.
+
+The repo is kept as a bare mirror under GITHUB_MIRROR_DIR (default
+`.ingest_state/repos/`) and fetched on every run. The commit SHA that was
+last ingested into a namespace is stored with the namespace's ingest state,
+so a run only has to:
+
+    - `git diff --name-status <last sha> HEAD` the mirror
+    - load and upsert the added or modified files that match the globs
+    - delete the excerpts of removed files (and of files that stopped
+      matching the globs)
+
+`repo` is either "owner/repo" on GitHub or the path of a local git
+repository, which makes the incremental path easy to exercise against a
+bare repo made with `git init --bare`.
+"""
+
+import asyncio
+import base64
+import os
+import subprocess
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from ingest_state import load_state, save_state, stable_id
+from raggy.documents import Document, document_to_excerpts
+
+if TYPE_CHECKING:
+    from raggy.vectorstores.tpuf import TurboPuffer
+
+STATE_SECTION = "github"
+
+
+def _git(*args: str, cwd: Optional[Path] = None) -> str:
+    extra = []
+    token = os.getenv("GITHUB_TOKEN")
+    if token:
+        basic = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+        extra = ["-c", f"http.extraHeader=Authorization: Basic {basic}"]
+    result = subprocess.run(
+        ["git", *extra, *args],
+        cwd=cwd,
+        capture_output=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise OSError(f"git {' '.join(args)} failed:\n{result.stderr.decode()}")
+    return result.stdout.decode("utf-8", errors="replace")
+
+
+def repo_remote(repo: str) -> str:
+    if Path(repo).exists():
+        return str(Path(repo).resolve())
+    return f"https://github.com/{repo}.git"
+
+
+def repo_link(repo: str, commit_sha: str, path: str) -> str:
+    if Path(repo).exists():
+        return f"{repo_remote(repo)}/{path}@{commit_sha}"
+    return f"https://github.com/{repo}/blob/{commit_sha}/{path}"
+
+
+def update_mirror(repo: str) -> Path:
+    """
+    Clones `repo` as a bare mirror on first use and fetches it afterwards.
+    Returns the mirror path.
+    """
+    mirror_dir = Path(os.getenv("GITHUB_MIRROR_DIR", ".ingest_state/repos"))
+    mirror = mirror_dir / (repo.strip("/").replace("/", "__") + ".git")
+    if mirror.exists():
+        _git("remote", "update", "--prune", cwd=mirror)
+    else:
+        mirror_dir.mkdir(parents=True, exist_ok=True)
+        _git("clone", "--mirror", repo_remote(repo), str(mirror))
+    return mirror
+
+
+def matches_globs(path: str, include_globs: List[str]) -> bool:
+    # fnmatch's "*" already crosses "/", so "docs/**/*.md" only needs the
+    # extra "docs/*.md" form to also match files directly under docs/.
+    return any(
+        fnmatch(path, pattern) or fnmatch(path, pattern.replace("**/", ""))
+        for pattern in include_globs
+    )
+
+
+def list_files(mirror: Path, commit_sha: str) -> List[str]:
+    return _git("ls-tree", "-r", "--name-only", commit_sha, cwd=mirror).splitlines()
+
+
+def changed_files(mirror: Path, old_sha: Optional[str], new_sha: str) -> List[str]:
+    """
+    Returns the paths added or modified between two commits. Without a usable
+    `old_sha` every file at `new_sha` counts as added.
+    """
+    if old_sha:
+        try:
+            _git("cat-file", "-e", f"{old_sha}^{{commit}}", cwd=mirror)
+        except OSError:
+            print(f"Commit {old_sha} is no longer in the repo, re-ingesting all files")
+            old_sha = None
+
+    if not old_sha:
+        return list_files(mirror, new_sha)
+
+    diff = _git("diff", "--name-status", "--no-renames", old_sha, new_sha, cwd=mirror)
+    return [
+        line.split("\t", 1)[1] for line in diff.splitlines() if not line.startswith("D")
+    ]
+
+
+async def file_to_documents(
+    repo: str, commit_sha: str, path: str, text: str
+) -> List[Document]:
+    """
+    Splits a file into raggy excerpts with ids that are stable per repo, path
+    and excerpt position, so a modified file overwrites its old vectors.
+    """
+    document = Document(
+        text=text,
+        metadata={
+            "source": "github source code",
+            "link": repo_link(repo, commit_sha, path),
+            "title": Path(path).name,
+            "filename": Path(path).name,
+        },
+    )
+    excerpts = await document_to_excerpts(document)
+    return [
+        excerpt.model_copy(update={"id": stable_id(repo, path, i)})
+        for i, excerpt in enumerate(excerpts)
+    ]
+
+
+async def refresh_github_incrementally(
+    tpuf: "TurboPuffer",
+    namespace: str,
+    repo: str,
+    include_globs: List[str],
+    batch_size: int = 100,
+) -> Dict[str, int]:
+    """
+    Brings `namespace` up to date with HEAD of `repo`, touching only the
+    files that changed since the last ingested commit.
+    """
+    state = load_state(namespace)
+    repo_state = state.setdefault(STATE_SECTION, {}).setdefault(
+        repo, {"commit_sha": None, "files": {}}
+    )
+    file_ids: Dict[str, List[str]] = repo_state["files"]
+
+    # git runs in a subprocess; keep it off the event loop the other
+    # refresh tasks share.
+    mirror = await asyncio.to_thread(update_mirror, repo)
+    head_sha = (await asyncio.to_thread(_git, "rev-parse", "HEAD", cwd=mirror)).strip()
+    old_sha = repo_state["commit_sha"]
+    stats = {"upserted_files": 0, "deleted_files": 0, "upserted": 0, "deleted": 0}
+
+    globs = sorted(include_globs)
+    if repo_state.get("include_globs") != globs:
+        # Files that now match the globs may predate the last ingested commit.
+        old_sha = None
+    elif old_sha == head_sha:
+        print(f"✅ {repo} is already ingested at {head_sha[:12]}")
+        return stats
+
+    changed = await asyncio.to_thread(changed_files, mirror, old_sha, head_sha)
+    upserted_paths = [p for p in changed if matches_globs(p, include_globs)]
+    # Ingested files that were deleted or no longer match the globs.
+    files = await asyncio.to_thread(list_files, mirror, head_sha)
+    current_paths = {p for p in files if matches_globs(p, include_globs)}
+    deleted_paths = [p for p in file_ids if p not in current_paths]
+    print(
+        f"🔀 {repo} {old_sha[:12] if old_sha else '(new)'}..{head_sha[:12]}: "
+        f"{len(upserted_paths)} files to upsert, {len(deleted_paths)} to delete"
+    )
+
+    pending: List[Document] = []
+    delete_ids: List[str] = []
+
+    async def flush():
+        if pending:
+            await asyncio.to_thread(
+                tpuf.upsert,
+                documents=list(pending),
+                attributes={"link": [doc.metadata.link for doc in pending]},
+            )
+            stats["upserted"] += len(pending)
+            pending.clear()
+
+    for path in upserted_paths:
+        text = await asyncio.to_thread(_git, "show", f"{head_sha}:{path}", cwd=mirror)
+        documents = await file_to_documents(repo, head_sha, path, text)
+        new_ids = [doc.id for doc in documents]
+        delete_ids.extend(i for i in file_ids.get(path, []) if i not in new_ids)
+        file_ids[path] = new_ids
+        pending.extend(documents)
+        stats["upserted_files"] += 1
+        if len(pending) >= batch_size:
+            await flush()
+    await flush()
+
+    for path in deleted_paths:
+        delete_ids.extend(file_ids.pop(path))
+        stats["deleted_files"] += 1
+    if delete_ids:
+        await asyncio.to_thread(tpuf.delete, delete_ids)
+        stats["deleted"] = len(delete_ids)
+
+    repo_state["commit_sha"] = head_sha
+    repo_state["include_globs"] = globs
+    save_state(namespace, state)
+
+    print(
+        f"🔁 Incremental GitHub sync: {stats['upserted_files']} files upserted "
+        f"({stats['upserted']} excerpts), {stats['deleted_files']} files deleted "
+        f"({stats['deleted']} excerpts)"
+    )
+    return stats
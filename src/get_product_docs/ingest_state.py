@@ -0,0 +1,117 @@
+# src/get_product_docs/ingest_state.py
+"""
+Small JSON state store for incremental docs ingestion.
+
+The state of a namespace has a section per source type, e.g.
+
+    {
+        "sitemap": {"<url>": {"lastmod": ..., "etag": ..., "content_hash": ...}},
+        "github": {"<repo>": {"commit_sha": ..., "files": {...}}}
+    }
+
+It lives next to the data it describes, so a refresh on any host, CI runner
+or Prefect worker picks up where the last one stopped: one row per
+(namespace, section) in the turbopuffer namespace INGEST_STATE_NAMESPACE.
+Two refreshes of the same namespace must still not run at the same time;
+the last one to save wins.
+
+For local work without turbopuffer, INGEST_STATE_BACKEND=file keeps one file
+per namespace under INGEST_STATE_DIR (default `.ingest_state/`) instead.
+Writes go to a temporary file that is then renamed over the old one, so an
+interrupted refresh never leaves a half-written state file behind.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from shared.schemas import LARGE_TEXT
+
+INGEST_STATE_NAMESPACE = os.getenv("INGEST_STATE_NAMESPACE", "ingest-state")
+
+
+def state_backend() -> str:
+    return os.getenv("INGEST_STATE_BACKEND", "turbopuffer")
+
+
+def state_path(namespace: str) -> Path:
+    state_dir = Path(os.getenv("INGEST_STATE_DIR", ".ingest_state"))
+    return state_dir / f"{namespace}.json"
+
+
+def _state_namespace():
+    from shared.clients import get_namespace
+
+    return get_namespace(INGEST_STATE_NAMESPACE, resolve=False)
+
+
+def _state_rows(namespace: str) -> list:
+    import turbopuffer as tpuf
+
+    try:
+        return _state_namespace().query(
+            top_k=10_000,
+            include_attributes=["section", "state"],
+            filters=["namespace", "Eq", namespace],
+        )
+    except tpuf.NotFoundError:
+        return []
+
+
+def load_state(namespace: str) -> Dict[str, Any]:
+    if state_backend() == "file":
+        path = state_path(namespace)
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
+
+    return {
+        row.attributes["section"]: json.loads(row.attributes["state"])
+        for row in _state_rows(namespace)
+    }
+
+
+def save_state(namespace: str, state: Dict[str, Any]) -> None:
+    if state_backend() == "file":
+        path = state_path(namespace)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True))
+        os.replace(tmp_path, path)
+        return
+
+    ns = _state_namespace()
+    ids = {section: f"{namespace}/{section}" for section in sorted(state)}
+    stale = [row.id for row in _state_rows(namespace) if row.id not in ids.values()]
+    if ids:
+        # turbopuffer requires a vector per row; state is only ever listed,
+        # never ranked.
+        ns.upsert(
+            ids=list(ids.values()),
+            vectors=[[1.0] for _ in ids],
+            attributes={
+                "namespace": [namespace for _ in ids],
+                "section": list(ids),
+                "state": [json.dumps(state[s], sort_keys=True) for s in ids],
+                "updated_at": [int(time.time()) for _ in ids],
+            },
+            schema={"state": LARGE_TEXT},
+            distance_metric="cosine_distance",
+        )
+    if stale:
+        ns.delete(stale)
+
+
+def stable_id(*parts: Any) -> str:
+    """
+    Deterministic document id, so re-ingesting a changed page or file
+    overwrites its previous vectors instead of adding new ones.
+    """
+    return hashlib.sha1("\0".join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
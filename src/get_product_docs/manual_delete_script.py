@@ -1,4 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
 import turbopuffer as tpuf
+from shared.clients import get_namespace
+from shared.schemas import to_epoch
+
+# Rows fetched per page when resolving ids, and ids per delete request.
+ID_PAGE_SIZE = 1000
+DELETE_BATCH_SIZE = 1000
+# Characters with a meaning in turbopuffer Glob patterns.
+GLOB_SPECIAL = "*?[{}"
 
 
 def delete_namespace(namespace: str):
@@ -6,13 +17,123 @@ def delete_namespace(namespace: str):
     print(f"Deleting namespace: {namespace}")
 
     try:
-        ns = tpuf.Namespace(namespace)
+        ns = get_namespace(namespace)
         ns.delete_all()  # Using delete_all() as per the docs
         print(f"Successfully deleted namespace: {namespace}")
     except tpuf.APIError as e:  # Specifically catch APIError
         print(f"Error deleting namespace {namespace}: {e}")
 
 
+def _epoch_arg(value: str) -> int:
+    epoch = to_epoch(value)
+    if epoch is None:
+        raise ValueError(f"Not an ISO date: {value!r}")
+    return epoch
+
+
+def glob_escape(text: str) -> str:
+    """Matches `text` literally in a Glob pattern, e.g. "a*b" -> "a[*]b"."""
+    return "".join(f"[{c}]" if c in GLOB_SPECIAL else c for c in text)
+
+
+def build_delete_filters(
+    call_ids: Optional[List[str]] = None,
+    opp_ids: Optional[List[str]] = None,
+    start_after: Optional[str] = None,
+    start_before: Optional[str] = None,
+    url_prefix: Optional[str] = None,
+) -> Optional[list]:
+    """
+    Builds a turbopuffer filter matching every given condition.
+
+    `start_after` (inclusive) and `start_before` (exclusive) are ISO dates
+    or datetimes, e.g. "2024-01-01", compared with the epoch seconds that
+    call start times are stored as (see shared.schemas).
+    `url_prefix` matches the start of the `link` attribute of docs
+    excerpts literally, so "?" or "[" in a URL match only themselves.
+    """
+    conditions = []
+    if call_ids:
+        conditions.append(["gong_call_id_c", "In", call_ids])
+    if opp_ids:
+        conditions.append(["gong_primary_opportunity_c", "In", opp_ids])
+    if start_after:
+        conditions.append(["gong_call_start_c", "Gte", _epoch_arg(start_after)])
+    if start_before:
+        conditions.append(["gong_call_start_c", "Lt", _epoch_arg(start_before)])
+    if url_prefix:
+        conditions.append(["link", "Glob", f"{glob_escape(url_prefix)}*"])
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return ["And", conditions]
+
+
+def find_ids(namespace: str, filters: list, page_size: int = ID_PAGE_SIZE) -> List[Any]:
+    """
+    Returns the ids of all rows matching `filters`, paging through them in
+    id order.
+    """
+    ns = get_namespace(namespace)
+    ids: List[Any] = []
+    while True:
+        page_filters = ["And", [filters, ["id", "Gt", ids[-1]]]] if ids else filters
+        results = ns.query(
+            top_k=page_size,
+            filters=page_filters,
+            rank_by=["id", "asc"],
+            include_attributes=False,
+        )
+        page = [row.id for row in results]
+        ids.extend(page)
+        if len(page) < page_size:
+            return ids
+
+
+def delete_ids(
+    namespace: str,
+    ids: List[Any],
+    batch_size: int = DELETE_BATCH_SIZE,
+    max_workers: int = 8,
+) -> int:
+    """Deletes `ids` from a namespace in concurrent batches."""
+    ns = get_namespace(namespace)
+    batches = [ids[i : i + batch_size] for i in range(0, len(ids), batch_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(ns.delete, batches))
+    return len(ids)
+
+
+def delete_matching(
+    namespaces: List[str],
+    filters: list,
+    dry_run: bool = False,
+    max_workers: int = 8,
+) -> Dict[str, int]:
+    """
+    Deletes the rows matching `filters` from each namespace, or with
+    `dry_run` only counts them. Returns {namespace: matching rows}.
+    """
+    counts = {}
+    for namespace in namespaces:
+        try:
+            ids = find_ids(namespace, filters)
+        except tpuf.APIError as e:
+            print(f"Error resolving ids in {namespace}: {e}")
+            continue
+
+        counts[namespace] = len(ids)
+        if dry_run:
+            print(f"[dry run] {len(ids)} rows in {namespace} match {filters}")
+            continue
+        if ids:
+            delete_ids(namespace, ids, max_workers=max_workers)
+        print(f"Deleted {len(ids)} rows from {namespace}")
+    return counts
+
+
 if __name__ == "__main__":
     # Delete the test-tay namespace
     delete_namespace("tay-test")
@@ -0,0 +1,174 @@
+# src/get_product_docs/streaming.py
+"""
+Streaming docs ingestion: crawl and upsert at the same time.
+
+Loaders push documents into a bounded asyncio.Queue as each small unit of
+work finishes (a batch of sitemap URLs, a repo clone), and upsert workers
+pull fixed-size batches off the queue, embed them and write them while the
+crawl continues. raggy's turbopuffer writes are synchronous, so they run in
+worker threads (see `write_documents`) and never block the loaders. Wall
+time approaches max(crawl, write) instead of crawl + write, and memory holds
+at most `queue_size` documents plus the batches in flight instead of the
+whole corpus.
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional
+
+from raggy.documents import Document
+from raggy.loaders.base import Loader
+from raggy.loaders.web import SitemapLoader
+from raggy.utilities.embeddings import create_openai_embeddings
+
+if TYPE_CHECKING:
+    from raggy.vectorstores.tpuf import TurboPuffer
+    from shared.aimd import AIMDController
+
+# Signals an upsert worker that no more documents are coming.
+_DONE = object()
+
+
+async def write_documents(
+    tpuf: "TurboPuffer",
+    documents: List[Document],
+    executor: Optional[Executor] = None,
+) -> None:
+    """
+    Embeds `documents` and upserts them into `tpuf`. The embedding request is
+    awaited on the event loop and the synchronous turbopuffer write runs on
+    `executor` (default: the loop's default thread pool), so other batches
+    and the crawl keep going while it is in flight.
+    """
+    texts = [document.text for document in documents]
+    vectors = await create_openai_embeddings(texts)
+    if len(texts) == 1:
+        # raggy returns a bare vector for a single input.
+        vectors = [vectors]
+    await asyncio.get_running_loop().run_in_executor(
+        executor,
+        functools.partial(
+            tpuf.upsert,
+            ids=[document.id for document in documents],
+            vectors=vectors,
+            attributes={"text": texts},
+        ),
+    )
+
+
+async def split_loader(loader: Loader) -> List[Loader]:
+    """
+    Splits a loader into smaller loaders whose results can be streamed
+    independently. Sitemaps become one URL loader per batch of URLs;
+    other loaders are returned as they are.
+    """
+    if isinstance(loader, SitemapLoader):
+        return list((await loader._get_loader()).loaders)
+    return [loader]
+
+
+async def stream_loaders_to_tpuf(
+    tpuf: "TurboPuffer",
+    loaders: List[Loader],
+    batch_size: int = 100,
+    max_concurrent: int = 8,
+    max_concurrent_loads: int = 4,
+    queue_size: Optional[int] = None,
+    controller: Optional["AIMDController"] = None,
+    load: Optional[Callable[[Loader], Awaitable[List[Document]]]] = None,
+) -> int:
+    """
+    Runs `loaders` and upserts their documents into `tpuf` concurrently.
+    Returns the number of documents written.
+
+    Each loader runs through `load` (default `loader.load()`), e.g. a
+    retrying Prefect task. A loader that still fails stops the stream and
+    its exception is raised, so callers never take a partial crawl for a
+    complete one.
+
+    Without a `controller` there are `max_concurrent` upsert workers; with
+    one there are up to `controller.max_limit` and the controller decides
+    how many write at a time.
+    """
+    n_workers = controller.max_limit if controller else max_concurrent
+    queue: asyncio.Queue = asyncio.Queue(
+        maxsize=queue_size or batch_size * max_concurrent * 2
+    )
+    load_semaphore = asyncio.Semaphore(max_concurrent_loads)
+    stats = {"written": 0, "peak_queue": 0}
+    started = time.monotonic()
+
+    async def produce(loader: Loader) -> None:
+        async with load_semaphore:
+            try:
+                documents = await (load(loader) if load else loader.load())
+            except Exception as e:
+                print(f"Error running {loader.__class__.__name__}: {e}")
+                raise
+        for document in documents:
+            await queue.put(document)
+            stats["peak_queue"] = max(stats["peak_queue"], queue.qsize())
+
+    # One thread per upsert worker, so a write is never queued behind the
+    # default pool's other work (the controller would time the wait).
+    executor = ThreadPoolExecutor(
+        max_workers=n_workers, thread_name_prefix="tpuf-write"
+    )
+
+    async def write(batch: List[Document]) -> None:
+        await write_documents(tpuf, batch, executor)
+
+    async def consume() -> None:
+        batch: List[Document] = []
+        while True:
+            item = await queue.get()
+            if item is not _DONE:
+                batch.append(item)
+            if batch and (item is _DONE or len(batch) >= batch_size):
+                if controller:
+                    await controller.run(lambda: write(batch), items=len(batch))
+                else:
+                    await write(batch)
+                stats["written"] += len(batch)
+                batch = []
+            if item is _DONE:
+                return
+
+    async def run_producers() -> None:
+        split_loaders = [
+            part
+            for parts in await asyncio.gather(
+                *[split_loader(loader) for loader in loaders]
+            )
+            for part in parts
+        ]
+        stats["loaders"] = len(split_loaders)
+        await asyncio.gather(*[produce(loader) for loader in split_loaders])
+        stats["crawl_seconds"] = time.monotonic() - started
+        for _ in range(n_workers):
+            await queue.put(_DONE)
+
+    tasks = [asyncio.create_task(run_producers())] + [
+        asyncio.create_task(consume()) for _ in range(n_workers)
+    ]
+    try:
+        # A failing upsert worker must not leave producers blocked on a full
+        # queue, so stop at the first exception.
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False)
+
+    print(
+        f"🌊 Streamed {stats['written']} documents from {stats['loaders']} "
+        f"loaders: crawl {stats['crawl_seconds']:.1f}s, total "
+        f"{time.monotonic() - started:.1f}s, peak queue {stats['peak_queue']}"
+    )
+    if controller:
+        print(f"⚙️ Adaptive writes: {controller.summary()}")
+    return stats["written"]
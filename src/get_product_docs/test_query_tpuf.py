@@ -1,9 +1,10 @@
 # test_query_turbopuffer.py
 
 from raggy.vectorstores.tpuf import TurboPuffer
+from shared.aliases import resolve_namespace
 
 
-with TurboPuffer(namespace="test-tay") as t:
+with TurboPuffer(namespace=resolve_namespace("test-tay")) as t:
     result = t.query(
         "What is the best doc to use when I want a Prefect quickstart?", top_k=2
     )
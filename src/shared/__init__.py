@@ -0,0 +1,13 @@
+from shared.aliases import resolve_namespace, set_alias
+from shared.clients import (
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_MODEL,
+    ClientSettings,
+    configure_clients,
+    configure_turbopuffer,
+    embed_text,
+    embed_texts,
+    get_namespace,
+    get_openai_client,
+    load_env,
+)
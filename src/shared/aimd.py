@@ -0,0 +1,184 @@
+# src/shared/aimd.py
+"""
+Adaptive (AIMD) concurrency control for vector-store writes.
+
+Instead of a fixed `max_concurrent`, writers take a slot from an
+`AIMDController` before each batch. The controller
+
+    - raises the number of in-flight batches by one every `limit` successful
+      batches while latency stays near the best latency seen (additive
+      increase), and
+    - halves it when a batch is throttled (HTTP 429) or its latency spikes
+      (multiplicative decrease), at most once per latency period so one
+      burst of slow responses does not collapse the limit.
+
+`metrics()` exposes the current limit, in-flight count, recent throughput
+and latency, so a refresh can report the write rate it settled on.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class ThrottledError(Exception):
+    """Raised by writers for throttled requests."""
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """
+    True for 429 responses from turbopuffer, OpenAI or httpx, whichever
+    client raised them.
+    """
+    if isinstance(error, ThrottledError):
+        return True
+    for candidate in (error, getattr(error, "response", None)):
+        status = getattr(candidate, "status_code", None) or getattr(
+            candidate, "status", None
+        )
+        if status == 429:
+            return True
+    return False
+
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease limit on in-flight batches."""
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        window_seconds: float = 10.0,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.window_seconds = window_seconds
+
+        self.in_flight = 0
+        self.completed = 0
+        self.throttled = 0
+        self.errors = 0
+        self.decreases = 0
+        self.best_latency: Optional[float] = None
+        self._last_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._started = time.monotonic()
+        # (finished_at, items, latency) of recent batches
+        self._recent: Deque[Tuple[float, int, float]] = deque()
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so the controller can be built outside an event loop.
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _decrease(self, now: float) -> None:
+        # One cut per latency period: batches that were already in flight
+        # when the limit was cut report the same congestion.
+        if now - self._last_decrease < (self._last_latency or 0):
+            return
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self._last_decrease = now
+        self.decreases += 1
+
+    def record(self, latency: float, items: int = 1, throttled: bool = False) -> None:
+        """Feeds the outcome of one batch into the controller."""
+        now = time.monotonic()
+        self._last_latency = latency
+        if throttled:
+            self.throttled += 1
+            self._decrease(now)
+            return
+
+        self.completed += items
+        self._recent.append((now, items, latency))
+        while self._recent and now - self._recent[0][0] > self.window_seconds:
+            self._recent.popleft()
+
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+        if latency > self.best_latency * self.latency_tolerance:
+            self._decrease(now)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    @asynccontextmanager
+    async def slot(self, items: int = 1):
+        """
+        Waits for a free slot, then times the block. Throttling errors cut the
+        limit and are re-raised so the caller can retry.
+        """
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.current_limit)
+            self.in_flight += 1
+
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_throttle_error(e):
+                self.record(time.monotonic() - started, items, throttled=True)
+            else:
+                self.errors += 1
+            raise
+        else:
+            self.record(time.monotonic() - started, items)
+        finally:
+            async with condition:
+                self.in_flight -= 1
+                condition.notify_all()
+
+    async def run(self, fn, items: int = 1, max_retries: int = 5) -> Any:
+        """
+        Runs `await fn()` in a slot, retrying throttled calls with backoff.
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                async with self.slot(items):
+                    return await fn()
+            except Exception as e:
+                if not is_throttle_error(e) or attempt == max_retries:
+                    raise
+                await asyncio.sleep(min(30.0, 0.5 * 2**attempt) * random.random())
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        recent = [r for r in self._recent if now - r[0] <= self.window_seconds]
+        latencies = sorted(r[2] for r in recent)
+        window = min(self.window_seconds, now - self._started) or 1e-9
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "throughput_per_sec": sum(r[1] for r in recent) / window,
+            "overall_throughput_per_sec": self.completed
+            / max(now - self._started, 1e-9),
+            "p50_latency_sec": latencies[len(latencies) // 2] if latencies else None,
+            "best_latency_sec": self.best_latency,
+            "completed": self.completed,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "decreases": self.decreases,
+        }
+
+    def summary(self) -> str:
+        m = self.metrics()
+        return (
+            f"limit {m['limit']}, {m['overall_throughput_per_sec']:.1f} items/s "
+            f"overall ({m['throughput_per_sec']:.1f}/s recent), "
+            f"{m['throttled']} throttled, {m['decreases']} cut(s)"
+        )
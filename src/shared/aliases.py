@@ -0,0 +1,289 @@
+# src/shared/aliases.py
+"""
+Namespace aliases.
+
+Query and ingestion code refers to namespaces by a stable logical name
+("tay-prefect-docs"). An alias maps the logical name to the physical
+turbopuffer namespace currently serving it, so a rebuild can load a fresh
+shadow namespace ("tay-prefect-docs__20250101T120000") at full speed and
+then switch the alias in one write; readers never see an empty or
+half-loaded namespace. Names without an alias resolve to themselves.
+
+Aliases are stored where every host, CI runner and Prefect worker reads
+them: one row per logical name in the turbopuffer namespace
+ALIAS_NAMESPACE. Readers cache them for ALIAS_CACHE_SECONDS. For local
+work without turbopuffer, NAMESPACE_ALIASES_BACKEND=file keeps them in
+NAMESPACE_ALIASES_PATH (default `namespace_aliases.json` at the repository
+root) instead; `import_alias_file` copies such a file into turbopuffer.
+
+Because other processes may still resolve a logical name to the namespace
+an alias pointed at before, `promote_shadow` deletes the replaced namespace
+only after readers' caches have expired, and only when asked to (docs
+resets do by default). `collect_shadows` deletes the shadow namespaces
+that were replaced or abandoned without that.
+"""
+
+import datetime
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_ALIASES_PATH = Path(__file__).resolve().parents[2] / "namespace_aliases.json"
+ALIAS_NAMESPACE = os.getenv("NAMESPACE_ALIASES_NAMESPACE", "namespace-aliases")
+ALIAS_CACHE_SECONDS = float(os.getenv("ALIAS_CACHE_SECONDS", "30"))
+# Unaliased shadows younger than this may still be being built.
+SHADOW_MIN_AGE_SECONDS = 24 * 3600
+
+_SHADOW_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+_SHADOW_NAME = re.compile(r"^(?P<namespace>.+)__(?P<timestamp>\d{8}T\d{6})$")
+
+_lock = threading.Lock()
+# (file mtime or cache expiry, aliases)
+_cache: Tuple[Optional[float], Dict[str, str]] = (None, {})
+
+
+def aliases_backend() -> str:
+    return os.getenv("NAMESPACE_ALIASES_BACKEND", "turbopuffer")
+
+
+def aliases_path() -> Path:
+    return Path(os.getenv("NAMESPACE_ALIASES_PATH", DEFAULT_ALIASES_PATH))
+
+
+def _alias_namespace():
+    from shared.clients import get_namespace
+
+    return get_namespace(ALIAS_NAMESPACE, resolve=False)
+
+
+def _read_tpuf_aliases() -> Dict[str, str]:
+    import turbopuffer as tpuf
+
+    try:
+        rows = _alias_namespace().query(top_k=10_000, include_attributes=["target"])
+    except tpuf.NotFoundError:
+        return {}
+    return {str(row.id): (row.attributes or {})["target"] for row in rows}
+
+
+def load_aliases(fresh: bool = False) -> Dict[str, str]:
+    """
+    Returns {logical name: physical namespace}. The alias file is re-read
+    only when it changes; turbopuffer aliases are cached for
+    ALIAS_CACHE_SECONDS unless `fresh`.
+    """
+    global _cache
+    if aliases_backend() == "file":
+        path = aliases_path()
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return {}
+        with _lock:
+            if fresh or _cache[0] != mtime:
+                _cache = (mtime, json.loads(path.read_text()))
+            return dict(_cache[1])
+
+    with _lock:
+        expires, aliases = _cache
+        if not fresh and expires is not None and time.monotonic() < expires:
+            return dict(aliases)
+    aliases = _read_tpuf_aliases()
+    with _lock:
+        _cache = (time.monotonic() + ALIAS_CACHE_SECONDS, aliases)
+    return dict(aliases)
+
+
+def clear_alias_cache() -> None:
+    """Makes the next lookup re-read the aliases."""
+    global _cache
+    with _lock:
+        _cache = (None, {})
+
+
+def resolve_namespace(namespace: str) -> str:
+    if namespace == ALIAS_NAMESPACE:
+        return namespace
+    return load_aliases().get(namespace, namespace)
+
+
+def set_alias(namespace: str, target: str) -> Optional[str]:
+    """
+    Points `namespace` at the physical namespace `target` and returns the
+    physical namespace it resolved to before.
+    """
+    global _cache
+    previous = load_aliases(fresh=True).get(namespace, namespace)
+    if aliases_backend() == "file":
+        path = aliases_path()
+        with _lock:
+            aliases = json.loads(path.read_text()) if path.exists() else {}
+            aliases[namespace] = target
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".json.tmp")
+            tmp_path.write_text(json.dumps(aliases, indent=2, sort_keys=True))
+            os.replace(tmp_path, path)
+            _cache = (None, {})
+    else:
+        # turbopuffer requires a vector per row; aliases are only ever
+        # listed, never ranked.
+        _alias_namespace().upsert(
+            ids=[namespace],
+            vectors=[[1.0]],
+            attributes={"target": [target], "updated_at": [int(time.time())]},
+            distance_metric="cosine_distance",
+        )
+        with _lock:
+            _cache = (None, {})
+    print(f"🔀 Alias {namespace}: {previous} -> {target}")
+    return previous
+
+
+def import_alias_file(path: Optional[str] = None) -> Dict[str, str]:
+    """Copies the aliases of a local alias file into turbopuffer."""
+    aliases = json.loads(Path(path or DEFAULT_ALIASES_PATH).read_text())
+    for namespace, target in sorted(aliases.items()):
+        set_alias(namespace, target)
+    return aliases
+
+
+def shadow_namespace_name(namespace: str) -> str:
+    timestamp = datetime.datetime.now(datetime.timezone.utc)
+    return f"{namespace}__{timestamp.strftime(_SHADOW_TIMESTAMP_FORMAT)}"
+
+
+def parse_shadow_name(name: str) -> Optional[Tuple[str, datetime.datetime]]:
+    """(logical name, build start) of a shadow namespace name, else None."""
+    match = _SHADOW_NAME.match(name)
+    if match is None:
+        return None
+    started = datetime.datetime.strptime(
+        match["timestamp"], _SHADOW_TIMESTAMP_FORMAT
+    ).replace(tzinfo=datetime.timezone.utc)
+    return match["namespace"], started
+
+
+def orphaned_shadows(
+    namespaces: Iterable[str],
+    aliases: Dict[str, str],
+    min_age_seconds: float = SHADOW_MIN_AGE_SECONDS,
+    now: Optional[datetime.datetime] = None,
+) -> List[str]:
+    """
+    The shadow namespaces among `namespaces` that no alias points at and
+    that were either replaced (their logical name points at a newer shadow)
+    or abandoned (older than `min_age_seconds`). Younger unaliased shadows
+    may still be being built and are kept.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    targets = set(aliases.values())
+    orphans = []
+    for name in namespaces:
+        parsed = parse_shadow_name(name)
+        if parsed is None or name in targets:
+            continue
+        namespace, started = parsed
+        current = parse_shadow_name(aliases.get(namespace, ""))
+        replaced = current is not None and current[0] == namespace
+        replaced = replaced and current[1] > started
+        if replaced or (now - started).total_seconds() >= min_age_seconds:
+            orphans.append(name)
+    return sorted(orphans)
+
+
+def collect_shadows(
+    dry_run: bool = False, min_age_seconds: float = SHADOW_MIN_AGE_SECONDS
+) -> List[str]:
+    """
+    Deletes the orphaned shadow namespaces (see `orphaned_shadows`) and
+    returns their names. Run it at least ALIAS_CACHE_SECONDS after the last
+    promotion, so no reader still resolves to a replaced shadow.
+    """
+    import turbopuffer as tpuf
+    from shared.clients import configure_turbopuffer, get_namespace
+
+    configure_turbopuffer()
+    names = [ns.name for ns in tpuf.namespaces()]
+    orphans = orphaned_shadows(names, load_aliases(fresh=True), min_age_seconds)
+    for name in orphans:
+        if dry_run:
+            print(f"[dry run] would delete shadow namespace {name}")
+            continue
+        get_namespace(name, resolve=False).delete_all()
+        print(f"🗑️ Deleted shadow namespace {name}")
+    return orphans
+
+
+def wait_for_count(
+    physical_namespace: str,
+    expected: int,
+    timeout_seconds: float = 120,
+    poll_seconds: float = 2,
+) -> int:
+    """
+    Waits until `physical_namespace` reports at least `expected` rows and
+    returns the count. Raises RuntimeError if it does not within the timeout.
+    """
+    from shared.clients import get_namespace
+
+    ns = get_namespace(physical_namespace, resolve=False)
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        count = ns.approx_count() if ns.exists() else 0
+        if count >= expected:
+            return count
+        if time.monotonic() >= deadline:
+            raise RuntimeError(
+                f"{physical_namespace} has {count} rows, expected {expected}"
+            )
+        time.sleep(poll_seconds)
+
+
+def discard_shadow(shadow: str) -> None:
+    """Deletes a shadow namespace that will not be promoted."""
+    from shared.clients import get_namespace
+
+    ns = get_namespace(shadow, resolve=False)
+    if ns.exists():
+        ns.delete_all()
+        print(f"🗑️ Discarded shadow namespace {shadow}")
+
+
+def promote_shadow(
+    namespace: str,
+    shadow: str,
+    expected_count: int,
+    delete_previous: bool = False,
+    timeout_seconds: float = 120,
+) -> Optional[str]:
+    """
+    Verifies that `shadow` holds `expected_count` rows and points the
+    `namespace` alias at it; a shadow that fails the check is deleted.
+    With `delete_previous`, the namespace it replaced is deleted once
+    readers' alias caches have expired. Returns the replaced physical
+    namespace.
+    """
+    from shared.clients import get_namespace
+
+    try:
+        count = wait_for_count(shadow, expected_count, timeout_seconds)
+    except RuntimeError:
+        discard_shadow(shadow)
+        raise
+    print(f"✅ {shadow} has {count} rows (expected {expected_count})")
+
+    previous = set_alias(namespace, shadow)
+    if delete_previous and previous != shadow:
+        if aliases_backend() != "file":
+            time.sleep(ALIAS_CACHE_SECONDS)
+        previous_ns = get_namespace(previous, resolve=False)
+        if previous_ns.exists():
+            previous_ns.delete_all()
+            print(f"🗑️ Deleted previous namespace {previous}")
+    elif previous != shadow:
+        print(f"Kept previous namespace {previous}; delete it once nothing reads it")
+    return previous
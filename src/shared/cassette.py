@@ -0,0 +1,158 @@
+# src/shared/cassette.py
+"""
+Record/replay cassettes for embedding and vector-store calls.
+
+A cassette is a JSON file of recorded interactions keyed by a hash of the
+request. While a cassette is active (see `use_cassette`) calls routed
+through `recorded()` are either executed and stored ("record") or answered
+from the file without touching the network ("replay"). The active cassette
+is held in a ContextVar, so concurrent asyncio tasks (and the threads they
+start with `asyncio.to_thread`) each see their own cassette.
+"""
+
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, Optional, Union
+
+CassetteMode = Literal["record", "replay"]
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+@dataclass
+class CassetteRow:
+    """Stand-in for `tpuf.VectorRow` when replaying query results."""
+
+    id: Union[int, str]
+    dist: Optional[float] = None
+    attributes: Optional[Dict[str, Any]] = None
+    vector: Optional[List[float]] = None
+
+
+def rows_to_dicts(rows) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": row.id,
+            "dist": row.dist,
+            "attributes": row.attributes,
+            "vector": row.vector,
+        }
+        for row in rows or []
+    ]
+
+
+def rows_from_dicts(data: List[Dict[str, Any]]) -> List[CassetteRow]:
+    return [CassetteRow(**row) for row in data]
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    payload = json.dumps({"kind": kind, "request": request}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class Cassette:
+    """
+    Recorded interactions for one evaluation case (or any other unit of work).
+
+    Besides keyed interactions, a cassette has a free-form `extras` dict used
+    to store things that are not request/response shaped, such as the LLM
+    message history of an agent run.
+    """
+
+    def __init__(self, path: Union[str, Path], mode: CassetteMode):
+        self.path = Path(path)
+        self.mode = mode
+        self.interactions: Dict[str, List[Any]] = {}
+        self.extras: Dict[str, Any] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if mode == "replay":
+            if not self.path.exists():
+                raise FileNotFoundError(f"No cassette recorded at {self.path}")
+            data = json.loads(self.path.read_text())
+            self.interactions = data.get("interactions", {})
+            self.extras = data.get("extras", {})
+
+    def record(self, key: str, response: Any) -> None:
+        with self._lock:
+            self.interactions.setdefault(key, []).append(response)
+
+    def replay(self, key: str) -> Any:
+        """
+        Returns recorded responses for `key` in the order they were recorded,
+        repeating the last one if the key is requested more often than it was
+        recorded.
+        """
+        with self._lock:
+            responses = self.interactions.get(key)
+            if not responses:
+                raise CassetteMiss(f"Request {key} is not in cassette {self.path}")
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return responses[min(cursor, len(responses) - 1)]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps(
+                {"interactions": self.interactions, "extras": self.extras}, indent=2
+            )
+        )
+
+
+_active_cassette: ContextVar[Optional[Cassette]] = ContextVar(
+    "active_cassette", default=None
+)
+
+
+def get_active_cassette() -> Optional[Cassette]:
+    return _active_cassette.get()
+
+
+@contextmanager
+def use_cassette(cassette: Optional[Cassette]):
+    """
+    Activates `cassette` for the current context. In record mode the cassette
+    is saved on exit.
+    """
+    token = _active_cassette.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _active_cassette.reset(token)
+        if cassette is not None and cassette.mode == "record":
+            cassette.save()
+
+
+def recorded(
+    kind: str,
+    request: Dict[str, Any],
+    fn: Callable[[], Any],
+    serialize: Callable[[Any], Any] = lambda value: value,
+    deserialize: Callable[[Any], Any] = lambda value: value,
+) -> Any:
+    """
+    Runs `fn()` through the active cassette, if any.
+
+    `request` identifies the call and must be JSON serializable. `serialize`
+    and `deserialize` convert the response to and from its JSON form.
+    """
+    cassette = get_active_cassette()
+    if cassette is None:
+        return fn()
+
+    key = request_key(kind, request)
+    if cassette.mode == "replay":
+        return deserialize(cassette.replay(key))
+
+    response = fn()
+    cassette.record(key, serialize(response))
+    return response
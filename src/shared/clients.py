@@ -0,0 +1,270 @@
+# src/shared/clients.py
+"""
+Process-wide OpenAI and turbopuffer clients.
+
+Clients are created lazily on first use and then reused, so HTTP connections
+(and their TLS sessions) are kept alive across embedding calls and queries
+instead of being rebuilt per request. Pool sizes and timeouts are read from
+the environment:
+
+    OPENAI_MAX_CONNECTIONS        (default 20)
+    OPENAI_MAX_KEEPALIVE          (default 10)
+    OPENAI_TIMEOUT_SEC            (default 60)
+    TURBOPUFFER_API_BASE_URL      (default https://gcp-us-central1.turbopuffer.com)
+    TURBOPUFFER_POOL_MAXSIZE      (default 20)
+    TURBOPUFFER_CONNECT_TIMEOUT   (default 10)
+    TURBOPUFFER_READ_TIMEOUT      (default 180)
+
+Namespace names passed to `get_namespace` are resolved through the alias
+file (see shared.aliases), so callers keep using logical names while
+rebuilds swap the physical namespace underneath.
+
+`override_clients` swaps in stand-in clients for a block, e.g. the
+latency-modelled fakes of the query load test.
+
+Heavy imports (openai, httpx, turbopuffer, dotenv) happen inside the
+functions that need them.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from shared.aliases import clear_alias_cache, resolve_namespace
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+DEFAULT_TURBOPUFFER_API_BASE_URL = "https://gcp-us-central1.turbopuffer.com"
+
+# OpenAI accepts up to 2048 inputs per embeddings request.
+MAX_EMBEDDING_BATCH = 2048
+
+
+@dataclass
+class ClientSettings:
+    """Connection pool and timeout settings for the shared clients."""
+
+    openai_max_connections: int = 20
+    openai_max_keepalive: int = 10
+    openai_timeout_sec: float = 60.0
+    tpuf_api_base_url: str = DEFAULT_TURBOPUFFER_API_BASE_URL
+    tpuf_pool_maxsize: int = 20
+    tpuf_connect_timeout: float = 10.0
+    tpuf_read_timeout: float = 180.0
+
+    @classmethod
+    def from_env(cls) -> "ClientSettings":
+        return cls(
+            openai_max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "20")),
+            openai_max_keepalive=int(os.getenv("OPENAI_MAX_KEEPALIVE", "10")),
+            openai_timeout_sec=float(os.getenv("OPENAI_TIMEOUT_SEC", "60")),
+            tpuf_api_base_url=os.getenv(
+                "TURBOPUFFER_API_BASE_URL", DEFAULT_TURBOPUFFER_API_BASE_URL
+            ),
+            tpuf_pool_maxsize=int(os.getenv("TURBOPUFFER_POOL_MAXSIZE", "20")),
+            tpuf_connect_timeout=float(os.getenv("TURBOPUFFER_CONNECT_TIMEOUT", "10")),
+            tpuf_read_timeout=float(os.getenv("TURBOPUFFER_READ_TIMEOUT", "180")),
+        )
+
+
+_lock = threading.Lock()
+_env_loaded = False
+_settings: Optional[ClientSettings] = None
+_openai_client = None
+_tpuf_configured = False
+_tpuf_session = None
+_namespaces: Dict[str, object] = {}
+_namespace_factory: Optional[Callable[[str], object]] = None
+
+
+def load_env() -> None:
+    """
+    Loads `.env` once per process.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    _env_loaded = True
+
+
+def get_settings() -> ClientSettings:
+    global _settings
+    if _settings is None:
+        load_env()
+        _settings = ClientSettings.from_env()
+    return _settings
+
+
+def configure_clients(settings: ClientSettings) -> None:
+    """
+    Overrides the client settings. Clients that were already created are
+    dropped and rebuilt with the new settings on next use.
+    """
+    global _settings, _openai_client, _tpuf_configured, _tpuf_session
+    with _lock:
+        _settings = settings
+        _openai_client = None
+        _tpuf_configured = False
+        _tpuf_session = None
+        _namespaces.clear()
+
+
+def get_openai_client():
+    """
+    Returns the shared OpenAI client, backed by a pooled keep-alive httpx client.
+    """
+    global _openai_client
+    if _openai_client is not None:
+        return _openai_client
+
+    with _lock:
+        if _openai_client is None:
+            import httpx
+            from openai import OpenAI
+
+            settings = get_settings()
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError(
+                    "OPENAI_API_KEY is not set in the environment variables."
+                )
+
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=settings.openai_max_keepalive,
+                ),
+                timeout=settings.openai_timeout_sec,
+            )
+            _openai_client = OpenAI(api_key=api_key, http_client=http_client)
+    return _openai_client
+
+
+def configure_turbopuffer() -> None:
+    """
+    Sets the turbopuffer API key, base URL and timeouts once per process.
+    """
+    global _tpuf_configured
+    if _tpuf_configured:
+        return
+
+    import turbopuffer as tpuf
+
+    settings = get_settings()
+    tpuf.api_key = os.getenv("TURBOPUFFER_API_KEY")
+    tpuf.api_base_url = settings.tpuf_api_base_url
+    tpuf.connect_timeout = settings.tpuf_connect_timeout
+    tpuf.read_timeout = settings.tpuf_read_timeout
+    _tpuf_configured = True
+
+
+def get_namespace(namespace: str, resolve: bool = True):
+    """
+    Returns a cached `tpuf.Namespace` for the physical namespace `namespace`
+    currently resolves to. All namespaces share one pooled `requests.Session`,
+    so queries reuse open connections.
+
+    Pass `resolve=False` to address a physical namespace directly, e.g. the
+    namespace an alias pointed at before a rebuild.
+    """
+    global _tpuf_session
+    if resolve:
+        namespace = resolve_namespace(namespace)
+    ns = _namespaces.get(namespace)
+    if ns is not None:
+        return ns
+
+    with _lock:
+        ns = _namespaces.get(namespace)
+        if ns is None and _namespace_factory is not None:
+            ns = _namespaces[namespace] = _namespace_factory(namespace)
+        elif ns is None:
+            import turbopuffer as tpuf
+            from requests.adapters import HTTPAdapter
+
+            configure_turbopuffer()
+            ns = tpuf.Namespace(namespace)
+            if _tpuf_session is None:
+                # Reuse the first backend's session (it carries the auth headers)
+                # with a larger connection pool.
+                pool_size = get_settings().tpuf_pool_maxsize
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                ns.backend.session.mount("https://", adapter)
+                ns.backend.session.mount("http://", adapter)
+                _tpuf_session = ns.backend.session
+            else:
+                ns.backend.session = _tpuf_session
+            _namespaces[namespace] = ns
+    return ns
+
+
+@contextmanager
+def override_clients(
+    openai_client=None,
+    namespace_factory: Optional[Callable[[str], object]] = None,
+):
+    """
+    Serves stand-in clients inside the block, e.g. the latency-modelled fakes
+    of a load test: `get_openai_client` returns `openai_client`, and
+    `get_namespace` builds namespaces with `namespace_factory(physical_name)`.
+    Either left as None keeps the real client. The previous clients are
+    restored on exit. The turbopuffer alias table is read through these
+    namespaces too, so cached aliases are dropped on entry and exit.
+    """
+    global _openai_client, _namespace_factory
+    with _lock:
+        saved = (_openai_client, _namespace_factory, dict(_namespaces))
+        if openai_client is not None:
+            _openai_client = openai_client
+        if namespace_factory is not None:
+            _namespace_factory = namespace_factory
+            _namespaces.clear()
+    clear_alias_cache()
+    try:
+        yield
+    finally:
+        with _lock:
+            _openai_client, _namespace_factory = saved[0], saved[1]
+            _namespaces.clear()
+            _namespaces.update(saved[2])
+        clear_alias_cache()
+
+
+def embed_text(text: str) -> List[float]:
+    """
+    Generates an embedding vector for the provided text using OpenAI's API.
+    """
+    client = get_openai_client()
+
+    try:
+        response = client.embeddings.create(input=text, model=EMBEDDING_MODEL)
+        return response.data[0].embedding
+    except Exception as e:
+        print(f"Error embedding text: {e}")
+        return []
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Embeds several texts with as few requests as possible. The returned list
+    is aligned with `texts`; failed batches yield empty vectors.
+    """
+    client = get_openai_client()
+    vectors: List[List[float]] = []
+
+    for i in range(0, len(texts), MAX_EMBEDDING_BATCH):
+        batch = texts[i : i + MAX_EMBEDDING_BATCH]
+        try:
+            response = client.embeddings.create(input=batch, model=EMBEDDING_MODEL)
+            ordered = sorted(response.data, key=lambda item: item.index)
+            vectors.extend(item.embedding for item in ordered)
+        except Exception as e:
+            print(f"Error embedding batch of {len(batch)} texts: {e}")
+            vectors.extend([] for _ in batch)
+
+    return vectors
@@ -0,0 +1,168 @@
+# src/shared/digests.py
+"""
+Per-call digests: a compact, structured summary of each sales call.
+
+Digests are written by get_gong_data/call_digests.py into a side namespace
+next to the transcript chunks (`<namespace>-call-digests`), one row per
+call, and read by the extraction agent before it touches raw chunks. A
+digest of a call is a few hundred tokens; its chunks are several thousand
+each.
+
+Each row has the call's id, opportunity, title and start time, the digest
+as JSON (`digest_json`), and the call's tech tags (see shared.tech_tagging)
+so digests can be filtered like chunks.
+
+The model's evidence quotes are only located in the transcript (ignoring
+case and punctuation, which models do not copy reliably); the digest stores
+the exact transcript text each one matched as `evidence_spans`. Agents are
+shown, and snippets are grounded against, those spans only.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
+
+from shared.cassette import recorded, rows_from_dicts, rows_to_dicts
+from shared.clients import get_namespace
+from shared.schemas import format_timestamp, to_epoch
+from shared.tech_tagging import CLOUDS_ATTRIBUTE, TOOLS_ATTRIBUTE
+
+DIGEST_ATTRIBUTES = [
+    "gong_call_id_c",
+    "gong_primary_opportunity_c",
+    "gong_title_c",
+    "gong_call_start_c",
+    "digest_json",
+    TOOLS_ATTRIBUTE,
+    CLOUDS_ATTRIBUTE,
+]
+
+# Most digests returned for one opportunity, most recent calls first.
+MAX_OPPORTUNITY_DIGESTS = 25
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+class CallDigest(BaseModel):
+    """What one call says about the account's stack and situation."""
+
+    summary: str = Field(
+        "", description="Two or three sentences on what the call covered"
+    )
+    tools_mentioned: List[str] = Field(
+        default_factory=list,
+        description="Orchestration, ETL, scheduling and data tools the customer uses or evaluated",
+    )
+    infrastructure: List[str] = Field(
+        default_factory=list,
+        description="Cloud providers, compute, warehouses and deployment details",
+    )
+    stakeholders: List[str] = Field(
+        default_factory=list,
+        description="Customer-side people as 'name (role)'",
+    )
+    pain_points: List[str] = Field(
+        default_factory=list,
+        description="Problems the customer wants to solve",
+    )
+    evidence_quotes: List[str] = Field(
+        default_factory=list,
+        description="Up to three short verbatim transcript quotes naming the tools or cloud",
+    )
+    # The exact transcript text the quotes matched; filled in when the digest
+    # is written, not part of the schema the model sees.
+    evidence_spans: SkipJsonSchema[List[str]] = []
+
+
+def digest_namespace(namespace: str) -> str:
+    return f"{namespace}-call-digests"
+
+
+def _normalize_with_offsets(text: str):
+    """
+    `text` normalized like the quotes (lowercase, runs of punctuation and
+    whitespace collapsed to one space, stripped), and the offset in `text`
+    of every normalized character.
+    """
+    chars: List[str] = []
+    offsets: List[int] = []
+    pending_space = False
+    for i, original in enumerate(text):
+        for char in original.lower():
+            if _NON_WORD.match(char):
+                pending_space = True
+                continue
+            if pending_space and chars:
+                chars.append(" ")
+                offsets.append(i)
+            pending_space = False
+            chars.append(char)
+            offsets.append(i)
+    return "".join(chars), offsets
+
+
+def find_verbatim_span(quote: str, text: str) -> Optional[str]:
+    """
+    The span of `text` that `quote` matches, ignoring case and punctuation,
+    as it appears in `text`; None if `quote` does not occur in it.
+    """
+    normalized_quote = _NON_WORD.sub(" ", quote.lower()).strip()
+    if not normalized_quote:
+        return None
+    normalized, offsets = _normalize_with_offsets(text)
+    start = normalized.find(normalized_quote)
+    if start == -1:
+        return None
+    end = start + len(normalized_quote) - 1
+    return text[offsets[start] : offsets[end] + 1]
+
+
+def fetch_opportunity_digests(
+    namespace: str, opp_id: str, limit: int = MAX_OPPORTUNITY_DIGESTS
+) -> list:
+    """
+    Up to `limit` digests of an opportunity's calls, most recent first;
+    empty if there are no digests yet. Recorded when a cassette is active.
+    """
+
+    def run_query():
+        import turbopuffer as tpuf
+
+        try:
+            rows = get_namespace(digest_namespace(namespace)).query(
+                top_k=limit,
+                filters=["gong_primary_opportunity_c", "Eq", opp_id],
+                include_attributes=DIGEST_ATTRIBUTES,
+            )
+        except tpuf.NotFoundError:
+            return []
+        return sorted(
+            rows,
+            key=lambda row: to_epoch((row.attributes or {}).get("gong_call_start_c"))
+            or 0,
+            reverse=True,
+        )
+
+    return recorded(
+        "call_digests",
+        {"namespace": namespace, "opp_id": opp_id, "limit": limit},
+        run_query,
+        serialize=rows_to_dicts,
+        deserialize=rows_from_dicts,
+    )
+
+
+def digest_for_agent(row) -> Dict:
+    """A digest row as the agent sees it."""
+    attributes = row.attributes or {}
+    digest = CallDigest.model_validate_json(attributes.get("digest_json") or "{}")
+    return {
+        "call_id": attributes.get("gong_call_id_c"),
+        "title": attributes.get("gong_title_c"),
+        "start": format_timestamp(attributes.get("gong_call_start_c")),
+        **digest.model_dump(exclude={"evidence_quotes", "evidence_spans"}),
+        # Digests written before spans were stored show no quotes.
+        "evidence_quotes": digest.evidence_spans,
+    }
@@ -0,0 +1,107 @@
+# src/shared/fanout.py
+"""
+Fan-out vector search across several namespaces.
+
+The query text is embedded once and every namespace is queried at the same
+time, each with its own filters and attribute projection, so a question
+that spans sales calls and product docs costs about one round trip instead
+of one per namespace. Results are put on a common score scale and merged
+into one ranked list tagged with the namespace they came from.
+
+Score normalization:
+    similarity  1 - cosine distance; comparable across namespaces embedded
+                with the same model (the default)
+    minmax      similarity rescaled to [0, 1] within each namespace, for
+                namespaces whose distance ranges differ a lot
+Each namespace's scores are then multiplied by its `weight`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Optional, Union
+
+from shared.clients import embed_text, get_namespace
+
+Normalization = Literal["similarity", "minmax"]
+
+
+@dataclass
+class NamespaceQuery:
+    """What to ask one namespace."""
+
+    namespace: str
+    top_k: int = 5
+    filters: Optional[list] = None
+    include_attributes: Union[List[str], bool] = True
+    weight: float = 1.0
+
+
+@dataclass
+class FanoutResult:
+    source: str
+    id: Union[int, str]
+    dist: Optional[float]
+    score: float
+    attributes: Dict[str, Any]
+
+
+def _normalize(rows: list, normalization: Normalization, weight: float) -> List[float]:
+    similarities = [1.0 - (row.dist or 0.0) for row in rows]
+    if normalization == "minmax" and similarities:
+        low, high = min(similarities), max(similarities)
+        span = high - low
+        similarities = [(s - low) / span if span else 1.0 for s in similarities]
+    return [s * weight for s in similarities]
+
+
+def fanout_search(
+    query_text: str,
+    queries: List[NamespaceQuery],
+    top_k: Optional[int] = None,
+    normalization: Normalization = "similarity",
+    vector: Optional[List[float]] = None,
+) -> List[FanoutResult]:
+    """
+    Queries every namespace in `queries` concurrently with one embedding of
+    `query_text` (or `vector`, if given) and returns the merged results,
+    best first. A namespace that fails is reported and skipped.
+    """
+    if vector is None:
+        vector = embed_text(query_text)
+    if not vector:
+        print(f"Could not embed query: {query_text}")
+        return []
+
+    def run(query: NamespaceQuery) -> List[FanoutResult]:
+        rows = list(
+            get_namespace(query.namespace).query(
+                vector=vector,
+                distance_metric="cosine_distance",
+                top_k=query.top_k,
+                filters=query.filters,
+                include_attributes=query.include_attributes,
+            )
+        )
+        scores = _normalize(rows, normalization, query.weight)
+        return [
+            FanoutResult(
+                source=query.namespace,
+                id=row.id,
+                dist=row.dist,
+                score=score,
+                attributes=row.attributes or {},
+            )
+            for row, score in zip(rows, scores)
+        ]
+
+    merged: List[FanoutResult] = []
+    with ThreadPoolExecutor(max_workers=max(1, len(queries))) as executor:
+        futures = {executor.submit(run, query): query for query in queries}
+        for future, query in futures.items():
+            try:
+                merged.extend(future.result())
+            except Exception as e:
+                print(f"Error querying {query.namespace}: {e}")
+
+    merged.sort(key=lambda result: result.score, reverse=True)
+    return merged[:top_k] if top_k else merged
@@ -0,0 +1,158 @@
+# src/shared/metrics.py
+"""
+Per-run usage accounting and latency percentiles.
+
+A `RunUsage` collects what one extraction cost: LLM requests and tokens,
+the latency of every LLM turn, tool calls, and named timing spans (query
+embedding, turbopuffer queries, tag lookups, ...). `collect_usage()` makes
+a RunUsage the active one for the current context (a ContextVar, so
+concurrent asyncio tasks and the threads they start with
+`asyncio.to_thread` each record into their own), and code anywhere below it
+records with
+
+    with timed("tpuf_query"):
+        ...
+
+which costs one ContextVar lookup when nothing is collecting.
+
+`usage_tables()` aggregates many runs into p50/p95/p99 tables.
+"""
+
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+QUANTILES = (50, 95, 99)
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """The q-th percentile of `values` (linear interpolation), or None."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """Count, mean, p50/p95/p99 and max of `values`."""
+    if not values:
+        return {"count": 0}
+    summary = {"count": len(values), "mean": sum(values) / len(values)}
+    for q in QUANTILES:
+        summary[f"p{q}"] = percentile(values, q)
+    summary["max"] = max(values)
+    return summary
+
+
+def format_table(title: str, rows: Dict[str, Sequence[float]], fmt: str = ".3f") -> str:
+    """One line per named series: count, mean, p50, p95, p99 and max."""
+    columns = ["mean"] + [f"p{q}" for q in QUANTILES] + ["max"]
+    width = max([len(title)] + [len(name) for name in rows])
+    lines = [f"{title:<{width}} {'count':>6} " + " ".join(f"{c:>10}" for c in columns)]
+    for name, values in rows.items():
+        summary = summarize(values)
+        if not summary["count"]:
+            continue
+        lines.append(
+            f"{name:<{width}} {summary['count']:>6} "
+            + " ".join(f"{summary[c]:>10{fmt}}" for c in columns)
+        )
+    return "\n".join(lines)
+
+
+class RunUsage(BaseModel):
+    """What one agent run cost."""
+
+    llm_requests: int = 0
+    request_tokens: int = 0
+    response_tokens: int = 0
+    total_tokens: int = 0
+    tool_calls: int = 0
+    total_sec: float = 0.0
+    llm_turn_sec: List[float] = []
+    # Named timing spans, e.g. {"embed": [0.21, 0.19], "tpuf_query": [...]}
+    spans: Dict[str, List[float]] = {}
+
+    def add_turn(
+        self, seconds: float, request_tokens: int = 0, response_tokens: int = 0
+    ) -> None:
+        self.llm_requests += 1
+        self.llm_turn_sec.append(seconds)
+        self.request_tokens += request_tokens
+        self.response_tokens += response_tokens
+        self.total_tokens += request_tokens + response_tokens
+
+    def add_span(self, name: str, seconds: float) -> None:
+        self.spans.setdefault(name, []).append(seconds)
+
+
+_active_usage: ContextVar[Optional[RunUsage]] = ContextVar("active_usage", default=None)
+
+
+def current_usage() -> Optional[RunUsage]:
+    return _active_usage.get()
+
+
+@contextmanager
+def collect_usage(usage: Optional[RunUsage] = None):
+    """Records usage into `usage` (a new RunUsage by default) inside the block."""
+    usage = usage if usage is not None else RunUsage()
+    token = _active_usage.set(usage)
+    start = time.perf_counter()
+    try:
+        yield usage
+    finally:
+        usage.total_sec += time.perf_counter() - start
+        _active_usage.reset(token)
+
+
+@contextmanager
+def timed(name: str):
+    """Adds the block's wall time to the active RunUsage as span `name`."""
+    usage = _active_usage.get()
+    if usage is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        usage.add_span(name, time.perf_counter() - start)
+
+
+@contextmanager
+def tool_call(name: str = "tool"):
+    """Counts an agent tool call in the active RunUsage and times it as `name`."""
+    usage = _active_usage.get()
+    if usage is not None:
+        usage.tool_calls += 1
+    with timed(name):
+        yield
+
+
+def usage_tables(usages: Iterable[RunUsage]) -> str:
+    """p50/p95/p99 tables of latency and token use across runs."""
+    usages = list(usages)
+    latency: Dict[str, List[float]] = {
+        "run": [u.total_sec for u in usages],
+        "llm turn": [s for u in usages for s in u.llm_turn_sec],
+    }
+    for name in sorted({name for u in usages for name in u.spans}):
+        latency[name] = [s for u in usages for s in u.spans.get(name, [])]
+    counts = {
+        "llm requests": [u.llm_requests for u in usages],
+        "tool calls": [u.tool_calls for u in usages],
+        "prompt tokens": [u.request_tokens for u in usages],
+        "completion tokens": [u.response_tokens for u in usages],
+    }
+    return (
+        format_table("latency (s)", latency)
+        + "\n\n"
+        + format_table("per run", counts, fmt=".1f")
+    )
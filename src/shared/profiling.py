@@ -0,0 +1,372 @@
+# src/shared/profiling.py
+"""
+Opt-in profiling for Prefect tasks and agent tool calls.
+
+Functions decorated with `@profiled` run under cProfile and tracemalloc
+when profiling is on, and otherwise cost one flag check per call. Turn it
+on with PROFILING=1 in the environment, or for one flow run with the flow's
+`profile` parameter (which uses `profiling_enabled`).
+
+For every profiled call this writes, under PROFILE_DIR (default .profiles):
+
+    <name>-<timestamp>.prof    pstats dump, e.g. for `python -m pstats` or snakeviz
+    <name>-<timestamp>.html    self-contained icicle flamegraph of the call tree
+    <name>-<timestamp>.svg     the same flamegraph as an image
+
+and, inside a flow run, a Prefect markdown artifact with the flamegraph SVG
+embedded, the wall time, peak traced memory, the top functions by
+cumulative time and the top allocation sites.
+
+cProfile only sees the thread it is enabled in, and for coroutines it also
+sees whatever else the event loop runs while the call is suspended. A
+profiled call made while another one is already being profiled in the same
+thread runs unprofiled.
+"""
+
+import asyncio
+import base64
+import cProfile
+import functools
+import html
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_enabled = os.getenv("PROFILING", "").lower() in ("1", "true", "yes")
+_active = threading.local()
+_counter = iter(range(1, 1_000_000_000))
+
+# Call tree nodes below this share of the root are not drawn.
+FLAMEGRAPH_MIN_FRACTION = 0.002
+FLAMEGRAPH_MAX_DEPTH = 60
+TOP_FUNCTIONS = 15
+TOP_ALLOCATIONS = 10
+
+
+def profile_dir() -> Path:
+    return Path(os.getenv("PROFILE_DIR", ".profiles"))
+
+
+def is_profiling() -> bool:
+    return _enabled
+
+
+def set_profiling(enabled: bool) -> bool:
+    """Turns profiling on or off for the process; returns the previous setting."""
+    global _enabled
+    previous, _enabled = _enabled, enabled
+    return previous
+
+
+@contextmanager
+def profiling_enabled(enabled: bool = True):
+    """Profiles `@profiled` calls inside the block (if `enabled`)."""
+    previous = set_profiling(enabled or _enabled)
+    try:
+        yield
+    finally:
+        set_profiling(previous)
+
+
+@dataclass
+class ProfileReport:
+    name: str
+    wall_seconds: float
+    peak_memory_bytes: int
+    stats_path: Path
+    flamegraph_path: Path
+    flamegraph_svg_path: Path
+    top_functions: List[Tuple[str, int, float, float]] = field(default_factory=list)
+    top_allocations: List[Tuple[str, int]] = field(default_factory=list)
+
+
+def _func_label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{name} ({Path(filename).name}:{line})"
+
+
+def _build_call_tree(stats: pstats.Stats) -> dict:
+    """
+    Reconstructs an approximate call tree from cProfile's caller graph:
+    each edge gets the cumulative time spent in the callee when called from
+    that caller (the same approach snakeviz uses).
+    """
+    entries = stats.stats  # {func: (cc, nc, tt, ct, {caller: (cc, nc, tt, ct)})}
+    callees: Dict[tuple, Dict[tuple, float]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    roots = [func for func, entry in entries.items() if not entry[4]]
+    total = sum(entries[func][3] for func in roots) or 1e-9
+
+    def build(func: tuple, value: float, path: frozenset, depth: int) -> dict:
+        node = {"name": _func_label(func), "value": value, "children": []}
+        if depth >= FLAMEGRAPH_MAX_DEPTH:
+            return node
+        for callee, edge_time in sorted(
+            callees.get(func, {}).items(), key=lambda item: -item[1]
+        ):
+            # Recursion is folded into the first occurrence of the function.
+            if callee in path or edge_time / total < FLAMEGRAPH_MIN_FRACTION:
+                continue
+            node["children"].append(
+                build(callee, min(edge_time, value), path | {callee}, depth + 1)
+            )
+        return node
+
+    return {
+        "name": "all",
+        "value": total,
+        "children": [
+            build(func, entries[func][3], frozenset([func]), 1)
+            for func in sorted(roots, key=lambda f: -entries[f][3])
+            if entries[func][3] / total >= FLAMEGRAPH_MIN_FRACTION
+        ],
+    }
+
+
+def _layout(tree: dict) -> List[Tuple[dict, float, float, int]]:
+    """Places every node of the call tree as (node, left %, width %, depth)."""
+    total = tree["value"]
+    boxes: List[Tuple[dict, float, float, int]] = []
+
+    def place(node: dict, left: float, depth: int) -> None:
+        boxes.append((node, left, node["value"] / total * 100, depth))
+        child_left = left
+        for child in node["children"]:
+            place(child, child_left, depth + 1)
+            child_left += child["value"] / total * 100
+
+    place(tree, 0.0, 0)
+    return boxes
+
+
+def render_flamegraph(stats: pstats.Stats, title: str) -> str:
+    """Renders the call tree as a self-contained icicle graph (HTML + CSS)."""
+    tree = _build_call_tree(stats)
+    total = tree["value"]
+    boxes: List[str] = []
+    layout = _layout(tree)
+    for node, left, width, depth in layout:
+        label = html.escape(node["name"])
+        boxes.append(
+            f'<div class="f" style="left:{left:.4f}%;width:{width:.4f}%;'
+            f'top:{depth * 20}px" title="{label} — {node["value"]:.4f}s '
+            f'({width:.1f}%)">{label}</div>'
+        )
+    depth_reached = max(depth for *_, depth in layout)
+
+    return f"""<!doctype html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font: 12px monospace; margin: 16px; }}
+#g {{ position: relative; height: {(depth_reached + 1) * 20}px; }}
+.f {{ position: absolute; height: 18px; line-height: 18px; overflow: hidden;
+     white-space: nowrap; box-sizing: border-box; padding: 0 3px;
+     border: 1px solid #fff; background: #f4a261; }}
+.f:hover {{ background: #e76f51; }}
+</style></head>
+<body><h3>{html.escape(title)} — {total:.3f}s (hover for timings)</h3>
+<div id="g">{"".join(boxes)}</div></body></html>
+"""
+
+
+def render_flamegraph_svg(stats: pstats.Stats, title: str, width: int = 1200) -> str:
+    """
+    Renders the same icicle graph as a standalone SVG, which (unlike the
+    HTML page) can be embedded as an image in a Prefect markdown artifact.
+    """
+    tree = _build_call_tree(stats)
+    layout = _layout(tree)
+    top = 24
+    height = top + (max(depth for *_, depth in layout) + 1) * 20
+    shapes: List[str] = []
+    for node, left, box_width, depth in layout:
+        x = left / 100 * width
+        w = box_width / 100 * width
+        label = node["name"]
+        # About 7px per monospace character at 12px.
+        max_chars = int((w - 6) / 7)
+        if len(label) > max_chars:
+            label = label[: max_chars - 1] + "…" if max_chars > 2 else ""
+        shapes.append(
+            f'<g><title>{html.escape(node["name"])} — {node["value"]:.4f}s '
+            f"({box_width:.1f}%)</title>"
+            f'<rect x="{x:.2f}" y="{top + depth * 20}" width="{w:.2f}" '
+            f'height="18" fill="#f4a261" stroke="#fff"/>'
+            f'<text x="{x + 3:.2f}" y="{top + depth * 20 + 13}">'
+            f"{html.escape(label)}</text></g>"
+        )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}" font-family="monospace" font-size="12">'
+        f'<text x="0" y="16">{html.escape(title)} — {tree["value"]:.3f}s</text>'
+        f'{"".join(shapes)}</svg>'
+    )
+
+
+def _write_report(
+    name: str,
+    profiler: cProfile.Profile,
+    wall_seconds: float,
+    peak_memory: int,
+    snapshot: Optional[tracemalloc.Snapshot],
+) -> ProfileReport:
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"{name}-{datetime.now():%Y%m%dT%H%M%S}-{next(_counter)}"
+    stats_path = directory / f"{stem}.prof"
+    flamegraph_path = directory / f"{stem}.html"
+    flamegraph_svg_path = directory / f"{stem}.svg"
+
+    profiler.dump_stats(stats_path)
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    flamegraph_path.write_text(render_flamegraph(stats, name))
+    flamegraph_svg_path.write_text(render_flamegraph_svg(stats, name))
+
+    top_functions = [
+        (_func_label(func), entry[1], entry[2], entry[3])
+        for func, entry in sorted(stats.stats.items(), key=lambda item: -item[1][3])
+    ][:TOP_FUNCTIONS]
+    top_allocations = []
+    if snapshot is not None:
+        top_allocations = [
+            (str(stat.traceback), stat.size)
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        ]
+
+    return ProfileReport(
+        name=name,
+        wall_seconds=wall_seconds,
+        peak_memory_bytes=peak_memory,
+        stats_path=stats_path,
+        flamegraph_path=flamegraph_path,
+        flamegraph_svg_path=flamegraph_svg_path,
+        top_functions=top_functions,
+        top_allocations=top_allocations,
+    )
+
+
+def _report_markdown(report: ProfileReport) -> str:
+    # The artifact is viewed from the Prefect UI, usually on another machine
+    # than the one that wrote the files, so the flamegraph is inlined.
+    svg = base64.b64encode(report.flamegraph_svg_path.read_bytes()).decode()
+    lines = [
+        f"# Profile: {report.name}",
+        "",
+        f"- Wall time: {report.wall_seconds:.3f}s",
+        f"- Peak traced memory: {report.peak_memory_bytes / 1e6:.1f} MB",
+        f"- Stats: `{report.stats_path}`",
+        f"- Flamegraph: `{report.flamegraph_path}`",
+        "",
+        f"![Flamegraph of {report.name}](data:image/svg+xml;base64,{svg})",
+        "",
+        "| function | calls | own (s) | cumulative (s) |",
+        "|---|---:|---:|---:|",
+    ]
+    lines += [
+        f"| `{label}` | {calls} | {own:.4f} | {cumulative:.4f} |"
+        for label, calls, own, cumulative in report.top_functions
+    ]
+    if report.top_allocations:
+        lines += ["", "| allocation site | size (KB) |", "|---|---:|"]
+        lines += [
+            f"| `{site}` | {size / 1e3:.1f} |" for site, size in report.top_allocations
+        ]
+    return "\n".join(lines)
+
+
+def _publish(report: ProfileReport) -> None:
+    print(
+        f"🔬 Profiled {report.name}: {report.wall_seconds:.2f}s, peak "
+        f"{report.peak_memory_bytes / 1e6:.1f} MB -> {report.flamegraph_path}"
+    )
+    try:
+        from prefect.artifacts import create_markdown_artifact
+        from prefect.context import get_run_context
+
+        get_run_context()
+    except Exception:
+        # Not inside a flow or task run: the files are the report.
+        return
+    try:
+        create_markdown_artifact(
+            key=f"profile-{report.name.lower().replace('_', '-')}",
+            markdown=_report_markdown(report),
+            description=f"Profile of {report.name}",
+        )
+    except Exception as e:
+        print(f"Could not create profile artifact for {report.name}: {e}")
+
+
+@contextmanager
+def _profile(name: str):
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    _active.profiling = True
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        wall_seconds = time.perf_counter() - started
+        _active.profiling = False
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+        _publish(_write_report(name, profiler, wall_seconds, peak_memory, snapshot))
+
+
+def _should_profile() -> bool:
+    return _enabled and not getattr(_active, "profiling", False)
+
+
+def profiled(fn=None, *, name: Optional[str] = None):
+    """
+    Profiles each call of `fn` when profiling is on. Works on sync and async
+    functions; put it under `@task` / `@agent.tool` so the profile covers
+    the function body:
+
+        @task
+        @profiled
+        def batch_upsert(...): ...
+    """
+    if fn is None:
+        return functools.partial(profiled, name=name)
+    profile_name = name or fn.__name__
+
+    if asyncio.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            if not _should_profile():
+                return await fn(*args, **kwargs)
+            with _profile(profile_name):
+                return await fn(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _should_profile():
+            return fn(*args, **kwargs)
+        with _profile(profile_name):
+            return fn(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,179 @@
+# src/shared/retrieval.py
+"""
+Two-phase retrieval for namespaces with large text attributes.
+
+Phase one ranks with ids, distances and a few small attributes only. Phase
+two fetches the heavy attributes (transcript text, call briefs, participant
+lists) by id for the results that are actually used, going through a
+process-wide LRU cache so chunks that were already fetched are not
+downloaded again.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from shared.clients import get_namespace
+
+DEFAULT_CHUNK_CACHE_SIZE = int(os.getenv("CHUNK_CACHE_SIZE", "2048"))
+
+
+@dataclass
+class RetrievedRow:
+    """A query result with phase-one distance and merged attributes."""
+
+    id: Union[int, str]
+    dist: Optional[float] = None
+    attributes: Optional[Dict[str, Any]] = None
+    vector: Optional[List[float]] = None
+
+
+class ChunkCache:
+    """
+    Thread-safe LRU cache of fetched attributes, keyed by (namespace, id).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CHUNK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, Any], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self, namespace: str, row_id: Any, attributes: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        key = (namespace, row_id)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or any(attr not in cached for attr in attributes):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {attr: cached[attr] for attr in attributes}
+
+    def put(self, namespace: str, row_id: Any, values: Dict[str, Any]) -> None:
+        key = (namespace, row_id)
+        with self._lock:
+            merged = {**self._entries.get(key, {}), **values}
+            self._entries[key] = merged
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+chunk_cache = ChunkCache()
+
+
+def fetch_attributes_by_id(
+    namespace: str,
+    ids: List[Any],
+    attributes: List[str],
+    cache: Optional[ChunkCache] = chunk_cache,
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Returns {id: {attribute: value}} for `ids`, querying turbopuffer only for
+    ids that are not cached with all of `attributes`.
+    """
+    fetched: Dict[Any, Dict[str, Any]] = {}
+    missing = []
+    for row_id in ids:
+        cached = cache.get(namespace, row_id, attributes) if cache else None
+        if cached is None:
+            missing.append(row_id)
+        else:
+            fetched[row_id] = cached
+
+    if missing:
+        results = get_namespace(namespace).query(
+            top_k=len(missing),
+            filters=["id", "In", missing],
+            include_attributes=attributes,
+        )
+        for result in results:
+            # Attributes that are null are omitted from results; cache them as None.
+            values = {attr: (result.attributes or {}).get(attr) for attr in attributes}
+            fetched[result.id] = values
+            if cache:
+                cache.put(namespace, result.id, values)
+
+    return fetched
+
+
+def two_phase_query(
+    namespace: str,
+    vector: List[float],
+    top_k: int,
+    rank_attributes: List[str],
+    heavy_attributes: List[str],
+    filters: Optional[list] = None,
+    fetch_top_n: Optional[int] = None,
+    cache: Optional[ChunkCache] = chunk_cache,
+) -> List[RetrievedRow]:
+    """
+    Ranks `top_k` rows with only `rank_attributes`, then fetches
+    `heavy_attributes` for the best `fetch_top_n` of them (all by default).
+
+    When every ranked row would be fetched anyway (`fetch_top_n` unset or at
+    least `top_k`), a second round trip saves nothing, so the rows are
+    queried once with all attributes and their heavy attributes cached.
+
+    Returns the fetched rows in rank order, each carrying both the small and
+    heavy attributes.
+    """
+    if fetch_top_n is None or fetch_top_n >= top_k:
+        ranked = get_namespace(namespace).query(
+            vector=vector,
+            distance_metric="cosine_distance",
+            top_k=top_k,
+            filters=filters,
+            include_attributes=rank_attributes + heavy_attributes,
+        )
+        rows = []
+        for row in ranked:
+            attributes = row.attributes or {}
+            if cache:
+                cache.put(
+                    namespace,
+                    row.id,
+                    {attr: attributes.get(attr) for attr in heavy_attributes},
+                )
+            rows.append(
+                RetrievedRow(id=row.id, dist=row.dist, attributes=dict(attributes))
+            )
+        return rows
+
+    ranked = get_namespace(namespace).query(
+        vector=vector,
+        distance_metric="cosine_distance",
+        top_k=top_k,
+        filters=filters,
+        include_attributes=rank_attributes,
+    )
+    winners = list(ranked)[:fetch_top_n]
+    if not winners:
+        return []
+
+    heavy = fetch_attributes_by_id(
+        namespace, [row.id for row in winners], heavy_attributes, cache=cache
+    )
+    rows = []
+    for row in winners:
+        attributes = dict(row.attributes or {})
+        # Like turbopuffer itself, leave null attributes out of the result.
+        attributes.update(
+            (attr, value)
+            for attr, value in heavy.get(row.id, {}).items()
+            if value is not None
+        )
+        rows.append(RetrievedRow(id=row.id, dist=row.dist, attributes=attributes))
+    return rows
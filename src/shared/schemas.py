@@ -0,0 +1,226 @@
+# src/shared/schemas.py
+"""
+Declared turbopuffer schemas for the namespaces this repo writes.
+
+Without a declared schema turbopuffer infers one on the first upsert and
+makes every attribute filterable, so the filter index also covers full
+transcripts, call briefs and JSON blobs that are only ever read back, never
+filtered on. The schemas below
+
+    - turn filtering off for large text attributes,
+    - enable full-text search on `transcript_text` only, and
+    - store call timestamps as uint epoch seconds, so date ranges are
+      numeric range filters (["gong_call_start_c", "Gte", 1704067200]).
+
+Writers pass `namespace_schema(kind, attribute_names)` with each upsert.
+Docs are written through raggy, which takes no schema, so docs rebuilds
+call `apply_schema` on the shadow namespace before promoting it; later
+upserts into the namespace keep the schema.
+The type of an existing attribute cannot be changed in place, so
+`migrate_namespace` re-writes a namespace from a snapshot into a shadow
+namespace with the declared schema and promotes it through the namespace alias
+(see shared.aliases).
+"""
+
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from shared.tech_tagging import CLOUDS_ATTRIBUTE, TOOLS_ATTRIBUTE
+
+LARGE_TEXT = {"type": "string", "filterable": False}
+TIMESTAMP = {"type": "uint"}
+
+SALES_CALLS_SCHEMA: Dict[str, Dict[str, Any]] = {
+    "transcript_text": {**LARGE_TEXT, "full_text_search": True},
+    "gong_call_brief_c": LARGE_TEXT,
+    "gong_participants_emails_c": LARGE_TEXT,
+    "gong_call_start_c": TIMESTAMP,
+    "gong_scheduled_c": TIMESTAMP,
+    "gong_opp_close_date_time_of_call_c": TIMESTAMP,
+    TOOLS_ATTRIBUTE: {"type": "[]string"},
+    CLOUDS_ATTRIBUTE: {"type": "[]string"},
+}
+
+OPP_CENTROIDS_SCHEMA: Dict[str, Dict[str, Any]] = {
+    "gong_call_ids": {"type": "[]string", "filterable": False},
+}
+
+CALL_DIGESTS_SCHEMA: Dict[str, Dict[str, Any]] = {
+    "digest_json": LARGE_TEXT,
+    "gong_call_start_c": TIMESTAMP,
+    TOOLS_ATTRIBUTE: {"type": "[]string"},
+    CLOUDS_ATTRIBUTE: {"type": "[]string"},
+}
+
+CALL_CLUSTERS_SCHEMA: Dict[str, Dict[str, Any]] = {
+    "call_cluster_id": {"type": "uint"},
+    "clustered_at": TIMESTAMP,
+}
+
+DOCS_SCHEMA: Dict[str, Dict[str, Any]] = {
+    "text": LARGE_TEXT,
+}
+
+NAMESPACE_SCHEMAS = {
+    "sales-calls": SALES_CALLS_SCHEMA,
+    "opp-centroids": OPP_CENTROIDS_SCHEMA,
+    "call-digests": CALL_DIGESTS_SCHEMA,
+    "call-clusters": CALL_CLUSTERS_SCHEMA,
+    "docs": DOCS_SCHEMA,
+}
+
+TIMESTAMP_ATTRIBUTES = [
+    name for name, spec in SALES_CALLS_SCHEMA.items() if spec is TIMESTAMP
+]
+
+
+def namespace_schema(kind: str, attribute_names: Iterable[str]) -> Dict[str, Any]:
+    """
+    The declared schema of a `kind` namespace, for the attributes being
+    written. Sales-call attributes holding JSON (named "*json*", like the
+    ones helper.clean_attribute_value normalizes) are large text as well.
+    Attributes not declared here keep turbopuffer's inferred schema.
+    """
+    declared = NAMESPACE_SCHEMAS[kind]
+    schema = {}
+    for name in attribute_names:
+        if name in declared:
+            schema[name] = declared[name]
+        elif kind == "sales-calls" and "json" in name:
+            schema[name] = LARGE_TEXT
+    return schema
+
+
+def apply_schema(physical_namespace: str, kind: str) -> Dict[str, Any]:
+    """
+    Updates the schema of an existing namespace, written without one, to the
+    declared `kind` schema for the attributes it holds, and returns the
+    updates. Only the filterable setting can change here (attribute types
+    and full-text indexes are set by the first upsert), so kinds that
+    declare full-text search must be written with `namespace_schema`.
+    """
+    from turbopuffer import AttributeSchema
+
+    from shared.clients import get_namespace
+
+    ns = get_namespace(physical_namespace, resolve=False)
+    current = ns.schema()
+    updates = {}
+    for name, spec in namespace_schema(kind, current).items():
+        if spec.get("full_text_search"):
+            raise ValueError(f"{name}: full-text search cannot be added by update")
+        filterable = spec.get("filterable", True)
+        if current[name].filterable != filterable:
+            updates[name] = AttributeSchema(type=spec["type"], filterable=filterable)
+    if updates:
+        ns.update_schema(updates)
+        print(f"📐 Applied {kind} schema to {physical_namespace}: {sorted(updates)}")
+    return updates
+
+
+def to_epoch(value: Any) -> Optional[int]:
+    """
+    Epoch seconds for a datetime, date or ISO string; naive values are
+    taken as UTC. Returns None for values that cannot be parsed.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime.datetime):
+        if not isinstance(value, datetime.date):
+            return None
+        value = datetime.datetime.combine(value, datetime.time())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp())
+
+
+def format_timestamp(value: Any) -> Any:
+    """
+    ISO 8601 (UTC) for an epoch timestamp; other values, such as ISO
+    strings from namespaces written before the migration, pass through.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.datetime.fromtimestamp(
+            value, tz=datetime.timezone.utc
+        ).isoformat()
+    return value
+
+
+def conform_columns(kind: str, attributes: Dict[str, List[Any]]) -> Dict[str, List]:
+    """Converts the timestamp columns of `attributes` to epoch seconds."""
+    if kind not in ("sales-calls", "call-digests"):
+        return attributes
+    return {
+        name: (
+            [to_epoch(v) for v in values] if name in TIMESTAMP_ATTRIBUTES else values
+        )
+        for name, values in attributes.items()
+    }
+
+
+def migrate_namespace(
+    namespace: str,
+    kind: str = "sales-calls",
+    snapshot_dir: Optional[str] = None,
+    export: bool = True,
+    batch_size: int = 256,
+    max_workers: int = 8,
+    delete_previous: bool = False,
+) -> str:
+    """
+    Re-writes `namespace` with its declared schema.
+
+    Exports a snapshot (unless `export` is False, then `snapshot_dir` must
+    already hold a current one), upserts every row into a fresh shadow
+    namespace with the schema and converted timestamps, and promotes the
+    shadow once it holds every row. Writes made to `namespace` after the
+    snapshot are not carried over, so pause ingestion while migrating.
+    Sales call chunks are re-tagged on the way (shared.tech_tagging), which
+    backfills tags on chunks ingested before tagging. Returns the shadow
+    namespace.
+    """
+    import numpy as np
+    from shared.aliases import promote_shadow, shadow_namespace_name
+    from shared.clients import get_namespace
+    from shared.snapshot import export_namespace_snapshot, load_snapshot
+    from shared.tech_tagging import tag_columns
+
+    snapshot_dir = snapshot_dir or f"snapshots/{namespace}"
+    if export:
+        export_namespace_snapshot(namespace, snapshot_dir)
+    vectors, attributes, _ = load_snapshot(snapshot_dir)
+    retag = kind == "sales-calls" and "transcript_text" in attributes.column_names
+    attribute_names = set(attributes.column_names)
+    if retag:
+        attribute_names |= {TOOLS_ATTRIBUTE, CLOUDS_ATTRIBUTE}
+    schema = namespace_schema(kind, attribute_names)
+    shadow = shadow_namespace_name(namespace)
+    ns = get_namespace(shadow, resolve=False)
+    print(f"📐 Migrating {namespace} into {shadow} with schema for {sorted(schema)}")
+
+    def upsert(start: int) -> None:
+        rows = attributes.slice(start, batch_size).to_pydict()
+        ids = rows.pop("id")
+        if retag:
+            rows.update(tag_columns(rows["transcript_text"]))
+        ns.upsert(
+            ids=ids,
+            vectors=np.asarray(vectors[start : start + batch_size]).tolist(),
+            attributes=conform_columns(kind, rows),
+            schema=schema,
+            distance_metric="cosine_distance",
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(upsert, range(0, len(vectors), batch_size)))
+
+    promote_shadow(namespace, shadow, len(vectors), delete_previous=delete_previous)
+    return shadow
@@ -0,0 +1,204 @@
+# src/shared/snapshot.py
+"""
+Export a turbopuffer namespace to a local, memory-mappable snapshot.
+
+A snapshot directory contains:
+
+    vectors.npy          float32 array of shape (n_rows, dimensions)
+    attributes.parquet   one row per vector (same order), `id` + attributes
+    manifest.json        namespace, row count, version fingerprint and the
+                         embedding configuration the vectors were made with
+
+Vectors are loaded with `np.load(..., mmap_mode="r")` and attributes with a
+memory-mapped Parquet read, so notebooks and batch jobs can work on the
+whole corpus without the network and without copying it into memory.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from shared.aliases import resolve_namespace
+from shared.clients import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, get_namespace
+
+VECTORS_FILE = "vectors.npy"
+ATTRIBUTES_FILE = "attributes.parquet"
+MANIFEST_FILE = "manifest.json"
+
+DEFAULT_EMBEDDING_CONFIG = {
+    "model": EMBEDDING_MODEL,
+    "dimensions": EMBEDDING_DIMENSIONS,
+    "distance_metric": "cosine_distance",
+}
+
+# Rows copied at a time when converting the raw vector stream into .npy.
+COPY_BLOCK_ROWS = 65_536
+
+
+def _arrow_type(tpuf_type: str):
+    import pyarrow as pa
+
+    scalar_types = {
+        "string": pa.string(),
+        "uuid": pa.string(),
+        "uint": pa.uint64(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+    }
+    if tpuf_type.startswith("[]"):
+        return pa.list_(scalar_types.get(tpuf_type[2:], pa.string()))
+    return scalar_types.get(tpuf_type, pa.string())
+
+
+def _page_columns(data) -> Tuple[List[Any], List[List[float]], Dict[str, List[Any]]]:
+    """
+    Normalizes a page of `ns.vectors()` output (columns or rows) to
+    (ids, vectors, attributes-by-column).
+    """
+    if data is None:
+        return [], [], {}
+    if hasattr(data, "ids"):
+        return list(data.ids), list(data.vectors or []), dict(data.attributes or {})
+
+    ids = [row.id for row in data]
+    vectors = [row.vector for row in data]
+    keys = {key for row in data for key in (row.attributes or {})}
+    attributes = {
+        key: [(row.attributes or {}).get(key) for row in data] for key in keys
+    }
+    return ids, vectors, attributes
+
+
+def export_namespace_snapshot(
+    namespace: str,
+    output_dir: str,
+    embedding_config: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Pages through every row of `namespace` with the export API and writes a
+    snapshot to `output_dir`. Memory use is bounded by one export page.
+    Returns the manifest.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    ns = get_namespace(namespace)
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    schema = ns.schema()
+    attribute_names = sorted(schema.keys())
+    arrow_schema = pa.schema(
+        [("id", pa.string())]
+        + [(name, _arrow_type(schema[name].type)) for name in attribute_names]
+    )
+
+    raw_vectors_path = out / (VECTORS_FILE + ".tmp")
+    writer = pq.ParquetWriter(out / ATTRIBUTES_FILE, arrow_schema)
+    id_hash = hashlib.sha256()
+    n_rows = 0
+    dimensions = 0
+    cursor = None
+    page_number = 0
+
+    try:
+        with open(raw_vectors_path, "wb") as raw_vectors:
+            while True:
+                page = ns.vectors(cursor)
+                ids, vectors, attributes = _page_columns(page.data)
+                page_number += 1
+                if ids:
+                    block = np.asarray(vectors, dtype=np.float32)
+                    dimensions = block.shape[1]
+                    raw_vectors.write(block.tobytes())
+
+                    columns = {"id": [str(i) for i in ids]}
+                    for name in attribute_names:
+                        columns[name] = attributes.get(name, [None] * len(ids))
+                    writer.write_table(
+                        pa.Table.from_pydict(columns, schema=arrow_schema)
+                    )
+
+                    for i in ids:
+                        id_hash.update(str(i).encode())
+                        id_hash.update(b"\0")
+                    n_rows += len(ids)
+                    print(f"📦 Exported page {page_number}: {n_rows} rows so far")
+
+                cursor = page.next_cursor
+                if not cursor:
+                    break
+    finally:
+        writer.close()
+
+    # Convert the raw float32 stream into a .npy file now that the shape is known.
+    if n_rows == 0:
+        np.save(out / VECTORS_FILE, np.zeros((0, dimensions), dtype=np.float32))
+    else:
+        source = np.memmap(
+            raw_vectors_path, dtype=np.float32, mode="r", shape=(n_rows, dimensions)
+        )
+        target = np.lib.format.open_memmap(
+            out / VECTORS_FILE, mode="w+", dtype=np.float32, shape=(n_rows, dimensions)
+        )
+        for start in range(0, n_rows, COPY_BLOCK_ROWS):
+            target[start : start + COPY_BLOCK_ROWS] = source[
+                start : start + COPY_BLOCK_ROWS
+            ]
+        target.flush()
+        del source, target
+    os.remove(raw_vectors_path)
+
+    created_at = ns.created_at()
+    manifest = {
+        "namespace": namespace,
+        "physical_namespace": resolve_namespace(namespace),
+        "version": {
+            "created_at": created_at.isoformat() if created_at else None,
+            "approx_count": ns.approx_count(),
+            "ids_sha256": id_hash.hexdigest(),
+        },
+        "exported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "rows": n_rows,
+        "dimensions": dimensions,
+        "dtype": "float32",
+        "embedding_config": embedding_config or DEFAULT_EMBEDDING_CONFIG,
+        "attributes": {
+            name: getattr(schema[name], "type", None) for name in attribute_names
+        },
+        "files": {
+            "vectors": VECTORS_FILE,
+            "attributes": ATTRIBUTES_FILE,
+        },
+    }
+    (out / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+
+    print(f"✅ Exported {n_rows} rows of {namespace} to {out}")
+    return manifest
+
+
+def load_snapshot(snapshot_dir: str, columns: Optional[List[str]] = None):
+    """
+    Returns (vectors, attributes, manifest) for a snapshot directory.
+
+    `vectors` is a read-only memory-mapped float32 array and `attributes` a
+    pyarrow Table read through a memory map; row i of one matches row i of
+    the other. Pass `columns` to read only some attribute columns.
+    """
+    import numpy as np
+    import pyarrow.parquet as pq
+
+    path = Path(snapshot_dir)
+    manifest = json.loads((path / MANIFEST_FILE).read_text())
+    vectors = np.load(path / manifest["files"]["vectors"], mmap_mode="r")
+    if columns is not None and "id" not in columns:
+        columns = ["id"] + list(columns)
+    attributes = pq.read_table(
+        path / manifest["files"]["attributes"], columns=columns, memory_map=True
+    )
+    return vectors, attributes, manifest
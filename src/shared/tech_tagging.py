@@ -0,0 +1,242 @@
+# src/shared/tech_tagging.py
+"""
+Tags transcript text with the orchestration tools and cloud providers it
+mentions.
+
+Every `OrchestrationTool` and `CloudProvider` member has a list of synonym
+patterns; all of them are compiled into one alternation with a named group
+per member, so a chunk is scanned once for every tool and provider. Tags
+are stored on each chunk at ingestion as the array attributes
+
+    orchestration_tools_mentioned   e.g. ["Airflow (MWAA) AWS Managed"]
+    cloud_providers_mentioned       e.g. ["AWS"]
+
+which the extraction agent filters on, e.g.
+
+    ["cloud_providers_mentioned", "ContainsAny", ["AWS"]]
+
+Patterns are vendor phrases: a word that is also ordinary speech or another
+product's acronym ("lambda", "data factory", "tivoli", "oci", "ecs") only
+counts with the vendor or product name around it. Tags are keyword matches,
+so extraction uses them as hints and filters, never as answers. Members that
+cannot be recognized from a name alone (Prefect itself, which every sales
+call mentions, home-grown tools, "Other") have no patterns.
+
+Chunks ingested before tagging, or before a synonym change, are (re)tagged
+by re-writing the namespace: `migrate-schema <namespace> --kind sales-calls`
+applies `tag_columns` to every chunk it copies (see shared.schemas).
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple, Union
+
+from shared.tech_stack_enums import CloudProvider, OrchestrationTool
+
+TOOLS_ATTRIBUTE = "orchestration_tools_mentioned"
+CLOUDS_ATTRIBUTE = "cloud_providers_mentioned"
+
+Member = Union[OrchestrationTool, CloudProvider]
+
+TOOL_SYNONYMS: Dict[OrchestrationTool, List[str]] = {
+    OrchestrationTool.DAGSTER: [r"dagster"],
+    OrchestrationTool.AIRFLOW_MWAA_AWS_MANAGED: [
+        r"mwaa",
+        r"managed workflows (?:for|with) apache airflow",
+        r"amazon managed airflow",
+        r"aws managed airflow",
+    ],
+    OrchestrationTool.AIRFLOW_ASTRONOMER: [
+        r"astronomer(?:\.io| astro| cloud| runtime| hosted airflow)",
+        r"astro (?:cli|runtime|hosted)",
+    ],
+    OrchestrationTool.AIRFLOW_AZURE: [
+        r"azure managed airflow",
+        r"managed airflow (?:in|on) azure",
+        r"workflow orchestration manager",
+    ],
+    OrchestrationTool.AIRFLOW_GCP_CLOUD_COMPOSER: [r"cloud composer"],
+    OrchestrationTool.AIRFLOW_NOT_SPECIFIED: [r"airflow"],
+    OrchestrationTool.ACTIVEBATCH: [r"active ?batch"],
+    OrchestrationTool.TEMPORAL: [r"temporal\.io", r"temporal (?:cloud|workflows?)"],
+    OrchestrationTool.CONTROL_M: [
+        r"bmc control[- ]?m",
+        r"control-m (?:jobs?|scheduler|workload automation)",
+    ],
+    OrchestrationTool.INFORMATICA: [r"informatica"],
+    OrchestrationTool.ALTERYX: [r"alteryx"],
+    OrchestrationTool.SQL_SERVER_JOBS: [
+        r"sql server agent",
+        r"sql agent jobs?",
+        r"sql server jobs?",
+    ],
+    OrchestrationTool.AWS_STEP_FUNCTIONS: [r"step functions?"],
+    OrchestrationTool.AWS_LAMBDA_FUNCTIONS: [
+        r"(?:aws|amazon) lambdas?",
+        r"lambda functions?",
+    ],
+    OrchestrationTool.AZURE_FUNCTIONS: [r"azure functions?"],
+    OrchestrationTool.AZURE_DATA_FACTORY: [
+        r"azure data factory",
+        r"adf pipelines?",
+    ],
+    OrchestrationTool.GCP_CLOUD_RUN: [r"cloud run"],
+    OrchestrationTool.GCP_CLOUD_SCHEDULER: [r"cloud scheduler"],
+    OrchestrationTool.GCP_CLOUD_FUNCTIONS: [r"(?:google |gcp )?cloud functions?"],
+    OrchestrationTool.IBM_WORKLOAD_SCHEDULER: [
+        r"ibm workload scheduler",
+        r"tivoli workload (?:scheduler|automation)",
+    ],
+    OrchestrationTool.MATILLION: [r"matillion"],
+    OrchestrationTool.AUTOSYS: [r"autosys"],
+    OrchestrationTool.TALEND: [r"talend"],
+    OrchestrationTool.DATASTAGE: [r"datastage"],
+    OrchestrationTool.SSIS: [r"ssis", r"sql server integration services"],
+    OrchestrationTool.BOOMI: [r"boomi"],
+    OrchestrationTool.SNAPLOGIC: [r"snap ?logic"],
+    OrchestrationTool.MULESOFT: [r"mule ?soft"],
+    OrchestrationTool.CAMUNDA: [r"camunda"],
+}
+
+CLOUD_SYNONYMS: Dict[CloudProvider, List[str]] = {
+    CloudProvider.AWS: [
+        r"aws",
+        r"amazon web services",
+        r"ec2",
+        r"(?:amazon|aws) (?:eks|ecs)",
+        r"elastic (?:kubernetes|container) service",
+        r"fargate",
+        r"redshift",
+    ],
+    CloudProvider.AZURE: [r"azure", r"microsoft cloud"],
+    CloudProvider.GCP: [
+        r"gcp",
+        r"google cloud(?: platform)?",
+        r"big ?query",
+        r"gke",
+    ],
+    CloudProvider.OCI: [r"oracle cloud(?: infrastructure)?"],
+    CloudProvider.ON_PREM: [
+        r"on[- ]?prem(?:ise|ises)?",
+        r"our own (?:data ?center|servers|hardware)",
+        r"self[- ]hosted",
+    ],
+}
+
+# The cloud a tool implies when the transcript names no provider.
+IMPLIED_CLOUD: Dict[OrchestrationTool, CloudProvider] = {
+    OrchestrationTool.AIRFLOW_MWAA_AWS_MANAGED: CloudProvider.AWS,
+    OrchestrationTool.AWS_STEP_FUNCTIONS: CloudProvider.AWS,
+    OrchestrationTool.AWS_LAMBDA_FUNCTIONS: CloudProvider.AWS,
+    OrchestrationTool.AIRFLOW_AZURE: CloudProvider.AZURE,
+    OrchestrationTool.AZURE_FUNCTIONS: CloudProvider.AZURE,
+    OrchestrationTool.AZURE_DATA_FACTORY: CloudProvider.AZURE,
+    OrchestrationTool.AIRFLOW_GCP_CLOUD_COMPOSER: CloudProvider.GCP,
+    OrchestrationTool.GCP_CLOUD_RUN: CloudProvider.GCP,
+    OrchestrationTool.GCP_CLOUD_SCHEDULER: CloudProvider.GCP,
+    OrchestrationTool.GCP_CLOUD_FUNCTIONS: CloudProvider.GCP,
+    OrchestrationTool.AIRFLOW_OSS_ON_PREM: CloudProvider.ON_PREM,
+}
+
+AIRFLOW_FLAVORS = {
+    OrchestrationTool.AIRFLOW_MWAA_AWS_MANAGED,
+    OrchestrationTool.AIRFLOW_ASTRONOMER,
+    OrchestrationTool.AIRFLOW_AZURE,
+    OrchestrationTool.AIRFLOW_GCP_CLOUD_COMPOSER,
+    OrchestrationTool.AIRFLOW_OSS_ON_PREM,
+}
+
+
+@dataclass
+class Mention:
+    member: Member
+    start: int
+    end: int
+
+
+class TechMatcher:
+    """One compiled pattern matching every synonym of every member."""
+
+    def __init__(
+        self,
+        tool_synonyms: Dict[OrchestrationTool, List[str]] = TOOL_SYNONYMS,
+        cloud_synonyms: Dict[CloudProvider, List[str]] = CLOUD_SYNONYMS,
+    ):
+        self.members: Dict[str, Member] = {}
+        groups = []
+        for member, patterns in [*tool_synonyms.items(), *cloud_synonyms.items()]:
+            if not patterns:
+                continue
+            group = f"m{len(self.members)}"
+            self.members[group] = member
+            groups.append(f"(?P<{group}>{'|'.join(patterns)})")
+        # Alternatives are tried in order (tools before clouds, longer
+        # synonyms first), so "azure data factory" is one tool mention rather
+        # than a cloud. Word boundaries keep "ecs" out of "decisions".
+        self.pattern: Pattern = re.compile(
+            r"\b(?:" + "|".join(groups) + r")\b", re.IGNORECASE
+        )
+
+    def mentions(self, text: str) -> List[Mention]:
+        return [
+            Mention(self.members[match.lastgroup], match.start(), match.end())
+            for match in self.pattern.finditer(text or "")
+        ]
+
+    def tag(self, text: str) -> Tuple[List[str], List[str]]:
+        """Returns the (tools, clouds) mentioned in `text`, as enum values."""
+        tools: Dict[str, None] = {}
+        clouds: Dict[str, None] = {}
+        for mention in self.mentions(text):
+            target = tools if isinstance(mention.member, OrchestrationTool) else clouds
+            target[mention.member.value] = None
+        return list(tools), list(clouds)
+
+    def snippet(
+        self, text: str, member: Member, context_chars: int = 150
+    ) -> Optional[str]:
+        """
+        The first mention of `member` in `text` with up to `context_chars`
+        of surrounding text, cut at word boundaries.
+        """
+        for mention in self.mentions(text):
+            if mention.member != member:
+                continue
+            start = max(0, mention.start - context_chars)
+            end = min(len(text), mention.end + context_chars)
+            if start > 0:
+                cut = text.find(" ", start, mention.start)
+                start = cut + 1 if cut != -1 else start
+            if end < len(text):
+                cut = text.rfind(" ", mention.end, end)
+                end = cut if cut != -1 else end
+            return text[start:end].strip()
+        return None
+
+
+_default_matcher: Optional[TechMatcher] = None
+
+
+def get_matcher() -> TechMatcher:
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = TechMatcher()
+    return _default_matcher
+
+
+def tag_chunk(text: str) -> Dict[str, Optional[List[str]]]:
+    """
+    Tag attributes for one chunk; None instead of an empty list so chunks
+    without mentions keep the attributes null.
+    """
+    tools, clouds = get_matcher().tag(text)
+    return {TOOLS_ATTRIBUTE: tools or None, CLOUDS_ATTRIBUTE: clouds or None}
+
+
+def tag_columns(texts: List[Optional[str]]) -> Dict[str, List[Optional[List[str]]]]:
+    """Tag attribute columns for a batch of chunk texts."""
+    tags = [tag_chunk(text) for text in texts]
+    return {
+        TOOLS_ATTRIBUTE: [chunk_tags[TOOLS_ATTRIBUTE] for chunk_tags in tags],
+        CLOUDS_ATTRIBUTE: [chunk_tags[CLOUDS_ATTRIBUTE] for chunk_tags in tags],
+    }
@@ -0,0 +1,112 @@
+# src/shared/transcripts.py
+"""
+Helpers for Gong transcript chunks.
+
+Ingestion splits each call transcript into overlapping word chunks (the
+overlap repeats the last words of one chunk at the start of the next) and
+labels them "-{idx}- of {n_chunks}". Readers that put a call back together
+merge consecutive chunks and drop the repeated words, so the overlap is
+neither sent to a model twice nor quoted across a chunk boundary.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+# Chunks are written by get_gong_data as "-{idx}- of {n_chunks}".
+CHUNK_INDEX_PATTERN = re.compile(r"-(\d+)- of (\d+)")
+
+
+def parse_chunk_index(value: Any) -> Optional[int]:
+    """
+    Returns the integer chunk index from a "-3- of 7" style attribute.
+    """
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, str):
+        return None
+    match = CHUNK_INDEX_PATTERN.search(value)
+    return int(match.group(1)) if match else None
+
+
+def find_word_overlap(
+    previous_words: List[str], next_words: List[str], min_overlap: int = 5
+) -> int:
+    """
+    Returns the number of words at the end of `previous_words` that are repeated
+    at the start of `next_words`, or 0 if the overlap is shorter than `min_overlap`.
+    """
+    if not previous_words or not next_words:
+        return 0
+
+    first_word = next_words[0]
+    max_overlap = min(len(previous_words), len(next_words))
+    # Try candidate start positions from the longest possible overlap down.
+    for start in range(len(previous_words) - max_overlap, len(previous_words)):
+        if previous_words[start] != first_word:
+            continue
+        overlap = len(previous_words) - start
+        if overlap < min_overlap:
+            return 0
+        if previous_words[start:] == next_words[:overlap]:
+            return overlap
+    return 0
+
+
+def merge_adjacent_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Groups the chunks of a single call into contiguous segments.
+
+    `chunks` are dicts with `chunk_index`, `text` and `dist`. Chunks whose
+    indices are consecutive are merged into one segment with the repeated
+    overlap words removed. Each segment keeps the best (lowest) distance of
+    the chunks it contains.
+    """
+    segments: List[Dict[str, Any]] = []
+    seen_indices = set()
+
+    for chunk in sorted(
+        chunks, key=lambda c: (c["chunk_index"] is None, c["chunk_index"] or 0)
+    ):
+        index = chunk["chunk_index"]
+        if index is not None and index in seen_indices:
+            continue
+        seen_indices.add(index)
+
+        words = chunk["text"].split()
+        previous = segments[-1] if segments else None
+        if (
+            previous is not None
+            and index is not None
+            and previous["last_index"] is not None
+            and index == previous["last_index"] + 1
+        ):
+            overlap = find_word_overlap(previous["words"], words)
+            previous["words"].extend(words[overlap:])
+            previous["last_index"] = index
+            previous["dist"] = min(previous["dist"], chunk["dist"])
+            continue
+
+        segments.append(
+            {
+                "first_index": index,
+                "last_index": index,
+                "words": words,
+                "dist": chunk["dist"],
+            }
+        )
+
+    return [
+        {
+            "chunk_range": _format_chunk_range(s["first_index"], s["last_index"]),
+            "first_index": s["first_index"],
+            "text": " ".join(s["words"]),
+            "dist": s["dist"],
+        }
+        for s in segments
+    ]
+
+
+def _format_chunk_range(first: Optional[int], last: Optional[int]) -> str:
+    if first is None:
+        return "unknown"
+    return str(first) if first == last else f"{first}-{last}"
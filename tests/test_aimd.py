@@ -0,0 +1,152 @@
+import asyncio
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# raggy's turbopuffer settings require a key at import; no request is made.
+os.environ.setdefault("TURBOPUFFER_API_KEY", "test")
+
+import get_docs_from_web  # noqa: E402
+import streaming  # noqa: E402
+from shared.aimd import (  # noqa: E402
+    AIMDController,
+    ThrottledError,
+    is_throttle_error,
+)
+
+
+class FakeWriteEndpoint:
+    """
+    Local stand-in for a write endpoint with `capacity` parallel workers.
+
+    Requests beyond capacity queue (latency grows with the overload) and
+    requests beyond `capacity * throttle_ratio` are rejected with
+    ThrottledError, like a 429.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 16,
+        base_latency: float = 0.01,
+        throttle_ratio: float = 1.5,
+    ):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.throttle_ratio = throttle_ratio
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.writes = 0
+
+    async def write(self, items: int = 1) -> None:
+        if self.in_flight >= self.capacity * self.throttle_ratio:
+            raise ThrottledError("429 Too Many Requests")
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            overload = max(1.0, self.in_flight / self.capacity)
+            await asyncio.sleep(self.base_latency * overload)
+            self.writes += 1
+        finally:
+            self.in_flight -= 1
+
+
+async def simulate(endpoint, controller, n_batches):
+    await asyncio.gather(
+        *[
+            controller.run(lambda: endpoint.write(100), items=100)
+            for _ in range(n_batches)
+        ]
+    )
+
+
+def test_limit_grows_towards_capacity():
+    endpoint = FakeWriteEndpoint(capacity=8)
+    controller = AIMDController(initial_limit=1, max_limit=64)
+
+    asyncio.run(simulate(endpoint, controller, n_batches=400))
+
+    assert endpoint.writes == 400
+    assert controller.completed == 400 * 100
+    assert 4 <= controller.current_limit <= 8 * 1.5 * 2
+
+
+def test_throttling_cuts_the_limit():
+    endpoint = FakeWriteEndpoint(capacity=2, throttle_ratio=1.0)
+    controller = AIMDController(initial_limit=32, max_limit=64)
+
+    asyncio.run(simulate(endpoint, controller, n_batches=200))
+
+    assert endpoint.writes == 200
+    assert controller.throttled > 0
+    assert controller.current_limit < 32
+
+
+def test_latency_spike_cuts_the_limit():
+    controller = AIMDController(initial_limit=8)
+    controller.record(0.01)
+    limit = controller.limit
+
+    controller.record(0.5)
+
+    assert controller.limit == pytest.approx(limit * 0.5)
+    assert controller.decreases == 1
+
+
+def test_throttle_errors_are_recognized():
+    class Response:
+        status_code = 429
+
+    class ClientError(Exception):
+        response = Response()
+
+    assert is_throttle_error(ThrottledError())
+    assert is_throttle_error(ClientError())
+    assert not is_throttle_error(ValueError())
+
+
+class BlockingStore:
+    """raggy's TurboPuffer: `upsert` blocks its thread for the whole write."""
+
+    def __init__(self, write_seconds):
+        self.write_seconds = write_seconds
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, ids, vectors, attributes):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(self.write_seconds)
+        with self._lock:
+            self.in_flight -= 1
+            self.written += len(ids)
+
+
+def test_controller_times_concurrent_writes(monkeypatch):
+    async def create_openai_embeddings(texts):
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(streaming, "create_openai_embeddings", create_openai_embeddings)
+    store = BlockingStore(write_seconds=0.05)
+    controller = AIMDController(initial_limit=8, max_limit=8)
+    documents = [SimpleNamespace(id=str(i), text=f"doc {i}") for i in range(160)]
+
+    started = time.monotonic()
+    asyncio.run(
+        get_docs_from_web.upsert_documents(
+            store, documents, batch_size=10, max_concurrent=8, controller=controller
+        )
+    )
+    elapsed = time.monotonic() - started
+
+    assert store.written == 160
+    # The in-flight batches write at the same time, and the latency the
+    # controller sees is one write, not the writes queued on the loop.
+    assert store.peak_in_flight == 8
+    assert elapsed < 16 * 0.05
+    assert controller.decreases == 0
@@ -0,0 +1,138 @@
+import datetime
+import json
+from types import SimpleNamespace
+
+import pytest
+from shared import aliases
+from shared.aliases import (
+    load_aliases,
+    orphaned_shadows,
+    promote_shadow,
+    resolve_namespace,
+    set_alias,
+)
+from shared.clients import override_clients
+
+
+class FakeNamespace:
+    def __init__(self, name):
+        self.name = name
+        self.rows = {}
+        self.queries = 0
+        self.deleted = False
+
+    def upsert(self, ids, vectors, attributes, distance_metric=None):
+        for i, row_id in enumerate(ids):
+            self.rows[row_id] = {key: values[i] for key, values in attributes.items()}
+
+    def query(self, top_k=10, include_attributes=None, **kwargs):
+        self.queries += 1
+        return [
+            SimpleNamespace(id=row_id, attributes=attributes)
+            for row_id, attributes in list(self.rows.items())[:top_k]
+        ]
+
+    def exists(self):
+        return bool(self.rows)
+
+    def approx_count(self):
+        return len(self.rows)
+
+    def delete_all(self):
+        self.rows.clear()
+        self.deleted = True
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    aliases.clear_alias_cache()
+    yield
+    aliases.clear_alias_cache()
+
+
+@pytest.fixture
+def namespaces(monkeypatch):
+    monkeypatch.setenv("NAMESPACE_ALIASES_BACKEND", "turbopuffer")
+    monkeypatch.setattr(aliases, "ALIAS_CACHE_SECONDS", 30)
+    created = {}
+
+    def factory(name):
+        return created.setdefault(name, FakeNamespace(name))
+
+    with override_clients(namespace_factory=factory):
+        yield factory
+
+
+def test_unaliased_names_resolve_to_themselves(namespaces):
+    assert resolve_namespace("docs") == "docs"
+
+
+def test_aliases_are_cached_until_they_change(namespaces):
+    alias_table = namespaces(aliases.ALIAS_NAMESPACE)
+    set_alias("docs", "docs__20250101T000000")
+
+    assert resolve_namespace("docs") == "docs__20250101T000000"
+    assert resolve_namespace("docs") == "docs__20250101T000000"
+    reads = alias_table.queries
+
+    # Another host moves the alias; this reader keeps its cached table.
+    alias_table.upsert(["docs"], [[1.0]], {"target": ["docs__20250201T000000"]})
+    assert resolve_namespace("docs") == "docs__20250101T000000"
+    assert alias_table.queries == reads
+    assert load_aliases(fresh=True)["docs"] == "docs__20250201T000000"
+
+
+def test_file_backend_rereads_a_changed_file(tmp_path, monkeypatch):
+    path = tmp_path / "aliases.json"
+    monkeypatch.setenv("NAMESPACE_ALIASES_BACKEND", "file")
+    monkeypatch.setenv("NAMESPACE_ALIASES_PATH", str(path))
+    assert resolve_namespace("docs") == "docs"
+
+    assert set_alias("docs", "docs__1") == "docs"
+    assert json.loads(path.read_text()) == {"docs": "docs__1"}
+    assert resolve_namespace("docs") == "docs__1"
+
+
+def test_promotion_switches_the_alias_and_deletes_the_previous(namespaces, monkeypatch):
+    monkeypatch.setattr(aliases, "ALIAS_CACHE_SECONDS", 0)
+    old = namespaces("docs__20250101T000000")
+    old.upsert(["a"], [[1.0]], {"text": ["old"]})
+    set_alias("docs", old.name)
+    new = namespaces("docs__20250201T000000")
+    new.upsert(["a", "b"], [[1.0], [1.0]], {"text": ["new", "new"]})
+
+    previous = promote_shadow("docs", new.name, 2, delete_previous=True)
+
+    assert previous == old.name
+    assert resolve_namespace("docs") == new.name
+    assert old.deleted and not new.deleted
+
+
+def test_incomplete_shadow_is_discarded(namespaces):
+    set_alias("docs", "docs__20250101T000000")
+    shadow = namespaces("docs__20250201T000000")
+    shadow.upsert(["a"], [[1.0]], {"text": ["partial"]})
+
+    with pytest.raises(RuntimeError):
+        promote_shadow("docs", shadow.name, 2, timeout_seconds=0)
+
+    assert shadow.deleted
+    assert resolve_namespace("docs") == "docs__20250101T000000"
+
+
+def test_orphaned_shadows():
+    now = datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc)
+    names = [
+        "docs",
+        "docs__20250101T000000",  # replaced by the current target
+        "docs__20250201T000000",  # current target
+        "docs__20250301T000000",  # newer, still being built
+        "calls__20250101T000000",  # abandoned build of an unaliased name
+        "calls__20250228T230000",  # recent build of an unaliased name
+    ]
+
+    orphans = orphaned_shadows(
+        names, {"docs": "docs__20250201T000000"}, min_age_seconds=86400, now=now
+    )
+
+    assert orphans == ["calls__20250101T000000", "docs__20250101T000000"]
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+from cascade import tag_conflicts
+from shared.tech_stack_enums import CloudProvider, OrchestrationTool
+from shared.tech_tagging import CLOUDS_ATTRIBUTE, TOOLS_ATTRIBUTE
+
+
+def result(tool, cloud):
+    return SimpleNamespace(
+        tech_stack=SimpleNamespace(primary_previous_solution=tool, cloud_provider=cloud)
+    )
+
+
+def tag_row(tools, clouds=None):
+    return SimpleNamespace(
+        attributes={TOOLS_ATTRIBUTE: tools, CLOUDS_ATTRIBUTE: clouds}
+    )
+
+
+def test_unknown_tag_values_are_ignored():
+    rows = [tag_row(["h", "Dagster"], ["Legacy Cloud", "GCP"])]
+
+    conflicts = tag_conflicts(
+        result(OrchestrationTool.DAGSTER, CloudProvider.GCP), rows
+    )
+
+    assert conflicts == []
+
+
+def test_answer_missing_from_tags_conflicts():
+    rows = [tag_row([OrchestrationTool.AIRFLOW_MWAA_AWS_MANAGED.value])]
+
+    conflicts = tag_conflicts(
+        result(OrchestrationTool.DAGSTER, CloudProvider.GCP), rows
+    )
+
+    assert conflicts == ["primary_previous_solution", "cloud_provider"]
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+HEAVY_MODULES = ["prefect", "pydantic_ai", "turbopuffer", "openai"]
+
+
+def test_importing_cli_skips_heavy_dependencies():
+    # A fresh interpreter, so modules imported by other tests do not count.
+    check = (
+        "import sys, cli; " f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_help_runs_without_heavy_dependencies():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(SRC_DIR / "cli.py"), "--help"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imported = {line.split("|")[-1].strip() for line in result.stderr.splitlines()}
+    assert not imported & set(HEAVY_MODULES)
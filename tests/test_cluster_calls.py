@@ -0,0 +1,87 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+GONG_DIR = Path(__file__).resolve().parents[1] / "src" / "get_gong_data"
+
+
+@pytest.fixture(scope="module")
+def cluster_calls():
+    # get_gong_data is not on the test path: its `helper` would shadow the
+    # extract_data_stack module of the same name. Import it the way the CLI
+    # does and put the other `helper` back afterwards.
+    saved = sys.modules.pop("helper", None)
+    sys.path.insert(0, str(GONG_DIR))
+    try:
+        yield importlib.import_module("cluster_calls")
+    finally:
+        sys.path.remove(str(GONG_DIR))
+        sys.modules.pop("cluster_calls", None)
+        sys.modules.pop("helper", None)
+        if saved is not None:
+            sys.modules["helper"] = saved
+
+
+def blobs(n_per_blob=40, dims=8, seed=1):
+    rng = np.random.default_rng(seed)
+    centers = np.eye(dims)[:3] * 10
+    x = np.concatenate([c + rng.normal(size=(n_per_blob, dims)) for c in centers])
+    truth = np.repeat(np.arange(3), n_per_blob)
+    return x.astype(np.float32), truth
+
+
+def test_well_separated_blobs_are_recovered(cluster_calls):
+    x, truth = blobs()
+
+    centers, labels, inertia = cluster_calls.minibatch_kmeans(
+        x, k=3, batch_size=32, seed=0
+    )
+
+    assert centers.shape == (3, 8)
+    # Every blob is one cluster, and no two blobs share a cluster.
+    mapping = {blob: set(labels[truth == blob]) for blob in range(3)}
+    assert all(len(found) == 1 for found in mapping.values())
+    assert len(set.union(*mapping.values())) == 3
+    assert inertia < len(x) * 8 * 2
+
+
+def test_distinctive_terms_label_their_cluster(cluster_calls):
+    warehouse = "snowflake warehouse dbt models pipeline"
+    platform = "kubernetes cluster helm charts pipeline"
+    texts = [warehouse] * 4 + [platform] * 4
+    labels = np.array([0] * 4 + [1] * 4)
+
+    terms = cluster_calls.cluster_terms(texts, labels, k=2, top_n=4)
+
+    assert set(terms[0]) == {"snowflake", "warehouse", "dbt", "models"}
+    assert set(terms[1]) == {"kubernetes", "cluster", "helm", "charts"}
+    # In every call, so it tells the clusters apart no better than chance.
+    assert "pipeline" not in terms[0] + terms[1]
+
+
+def test_empty_snapshot_has_no_clusters(cluster_calls, tmp_path, monkeypatch):
+    attributes = pa.table(
+        {
+            "gong_call_id_c": pa.array([], pa.string()),
+            "transcript_text": pa.array([], pa.string()),
+        }
+    )
+    manifest = {"namespace": "calls", "version": 1}
+    monkeypatch.setattr(
+        cluster_calls,
+        "load_snapshot",
+        lambda *args, **kwargs: (np.empty((0, 8), np.float32), attributes, manifest),
+    )
+
+    topic_map = cluster_calls.cluster_snapshot.fn(str(tmp_path), n_clusters=4)
+
+    assert topic_map["n_clusters"] == 0
+    assert topic_map["clusters"] == []
+    assert topic_map["call_clusters"] == {}
+    saved = json.loads((tmp_path / cluster_calls.CLUSTERS_FILE).read_text())
+    assert saved["n_clusters"] == 0
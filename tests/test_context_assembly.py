@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+from context_assembly import assemble_context
+from helper import consolidate_and_print_metadata
+
+CALL_ID = "7782342274025937895"
+
+
+def chunk_row(index, call_id=CALL_ID, text=None, dist=0.1):
+    return SimpleNamespace(
+        id=f"{call_id}-{index}",
+        dist=dist,
+        attributes={
+            "gong_call_id_c": int(call_id),
+            "chunk_index": f"-{index}- of 10",
+            "name": "Discovery call",
+            "gong_call_start_c": 1704067200,
+            "transcript_text": text or f"chunk {index} text",
+        },
+    )
+
+
+def words(start, stop):
+    return " ".join(f"w{i}" for i in range(start, stop))
+
+
+def test_only_timestamp_attributes_are_formatted(capsys):
+    consolidate_and_print_metadata([chunk_row(0)])
+
+    printed = capsys.readouterr().out
+    assert f"- {CALL_ID}" in printed
+    assert "- 2024-01-01T00:00:00+00:00" in printed
+
+
+def test_call_metadata_formats_only_timestamps():
+    context = assemble_context([chunk_row(0), chunk_row(1)], token_budget=1000)
+
+    call = context["calls"][0]
+    assert call["name"] == "Discovery call"
+    assert call["gong_call_start_c"] == "2024-01-01T00:00:00+00:00"
+
+
+def test_adjacent_chunks_merge_without_the_overlap():
+    # Chunks of 20 words overlapping by 5, as chunk_text writes them.
+    rows = [
+        chunk_row(3, text=words(15, 35), dist=0.3),
+        chunk_row(2, text=words(0, 20), dist=0.2),
+    ]
+
+    context = assemble_context(rows, token_budget=1000)
+
+    [call] = context["calls"]
+    [segment] = call["segments"]
+    assert segment["chunks"] == "2-3"
+    assert segment["transcript_text"] == words(0, 35)
+    assert call["relevance"] == 0.8
+
+
+def test_non_adjacent_chunks_stay_separate():
+    rows = [chunk_row(5, text=words(0, 20)), chunk_row(2, text=words(20, 40))]
+
+    context = assemble_context(rows, token_budget=1000)
+
+    segments = context["calls"][0]["segments"]
+    assert [s["chunks"] for s in segments] == ["2", "5"]
+    assert [s["transcript_text"] for s in segments] == [words(20, 40), words(0, 20)]
+
+
+def test_segments_are_cut_to_the_budget_by_relevance():
+    long_text = words(0, 400)
+    rows = [
+        chunk_row(0, call_id="1", text=long_text, dist=0.5),
+        chunk_row(0, call_id="2", text=long_text, dist=0.1),
+        chunk_row(0, call_id="3", text=long_text, dist=0.9),
+    ]
+
+    context = assemble_context(rows, token_budget=800, min_segment_tokens=100)
+
+    calls = context["calls"]
+    # The most relevant call fits whole, the next is truncated on a word
+    # boundary and the least relevant does not fit at all.
+    assert [call["gong_call_id_c"] for call in calls] == [2, 1]
+    assert calls[0]["segments"][0]["transcript_text"] == long_text
+    truncated = calls[1]["segments"][0]["transcript_text"]
+    assert truncated.endswith(" [...]")
+    assert long_text.startswith(truncated[: -len(" [...]")] + " ")
+    assert context["estimated_tokens"] <= 800
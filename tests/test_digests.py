@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from shared.digests import CallDigest, digest_for_agent, find_verbatim_span
+from shared.transcripts import merge_adjacent_chunks
+
+TRANSCRIPT = "Yeah, so today we're running   MWAA -- Amazon's managed Airflow; on AWS."
+
+
+def test_span_is_the_exact_transcript_text():
+    span = find_verbatim_span("managed airflow on aws", TRANSCRIPT)
+
+    assert span == "managed Airflow; on AWS"
+    assert span in TRANSCRIPT
+
+
+def test_quote_not_in_transcript_has_no_span():
+    assert find_verbatim_span("we use dagster", TRANSCRIPT) is None
+    assert find_verbatim_span("...", TRANSCRIPT) is None
+
+
+def test_agent_sees_spans_not_model_quotes():
+    digest = CallDigest(
+        evidence_quotes=["managed airflow on aws"],
+        evidence_spans=["managed Airflow; on AWS"],
+    )
+    row = SimpleNamespace(attributes={"digest_json": digest.model_dump_json()})
+
+    assert digest_for_agent(row)["evidence_quotes"] == ["managed Airflow; on AWS"]
+
+
+def test_digests_without_spans_show_no_quotes():
+    legacy = CallDigest(evidence_quotes=["managed airflow on aws"])
+    row = SimpleNamespace(
+        attributes={"digest_json": legacy.model_dump_json(exclude={"evidence_spans"})}
+    )
+
+    assert digest_for_agent(row)["evidence_quotes"] == []
+
+
+def test_chunk_overlap_is_not_repeated():
+    first = " ".join(f"w{i}" for i in range(20))
+    second = " ".join(f"w{i}" for i in range(10, 30))
+    segments = merge_adjacent_chunks(
+        [
+            {"chunk_index": 1, "text": second, "dist": 0.0},
+            {"chunk_index": 0, "text": first, "dist": 0.0},
+        ]
+    )
+
+    assert [s["text"] for s in segments] == [" ".join(f"w{i}" for i in range(30))]
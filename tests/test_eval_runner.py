@@ -0,0 +1,130 @@
+import os
+
+# The agent's default model needs a key to be constructed; no request is made.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import asyncio  # noqa: E402
+from types import SimpleNamespace  # noqa: E402
+
+from cascade import CascadeTier  # noqa: E402
+from eval_runner import EvalCase, run_evals  # noqa: E402
+from pydantic_ai.messages import ModelResponse, ToolCallPart  # noqa: E402
+from pydantic_ai.models.function import FunctionModel  # noqa: E402
+from shared.aliases import ALIAS_NAMESPACE  # noqa: E402
+from shared.clients import override_clients  # noqa: E402
+
+
+def test_bad_cassettes_fail_only_their_case(tmp_path):
+    (tmp_path / "corrupt.json").write_text("{not json")
+    (tmp_path / "no-llm.json").write_text('{"interactions": {}, "extras": {}}')
+    cases = [EvalCase(opp_id=name) for name in ("missing", "corrupt", "no-llm")]
+
+    reports = asyncio.run(run_evals(cases, mode="replay", cassette_dir=str(tmp_path)))
+
+    assert [r.case_id for r in reports] == ["missing", "corrupt", "no-llm"]
+    assert reports[0].error.startswith("FileNotFoundError")
+    assert reports[1].error.startswith("JSONDecodeError")
+    assert reports[2].error.startswith("KeyError")
+    assert all(r.result is None for r in reports)
+
+
+SNIPPET = "we schedule everything with Dagster on GCP"
+
+
+def recording_model(calls):
+    """Searches the transcripts once, then answers from what it found."""
+
+    def respond(messages, info):
+        calls.append(len(messages))
+        if len(messages) == 1:
+            return ModelResponse(
+                parts=[
+                    ToolCallPart(
+                        tool_name="query_transcript_vector_db_for_transcripts",
+                        args={"query_text": "orchestration tool", "top_k": 2},
+                    )
+                ]
+            )
+        return ModelResponse(
+            parts=[
+                ToolCallPart(
+                    tool_name=info.result_tools[0].name,
+                    args={
+                        "tech_stack": {
+                            "primary_previous_solution": "Dagster",
+                            "cloud_provider": "GCP",
+                        },
+                        "confidence_score": 0.9,
+                        "primary_previous_solution_snippet": SNIPPET,
+                    },
+                )
+            ]
+        )
+
+    return FunctionModel(respond, model_name="recording")
+
+
+def transcript_rows(**kwargs):
+    return [
+        SimpleNamespace(
+            id=f"call-1-{i}",
+            dist=0.1 * (i + 1),
+            attributes={
+                "gong_call_id_c": "call-1",
+                "chunk_index": f"-{i}- of 2",
+                "gong_primary_opportunity_c": "opp-1",
+                "transcript_text": text,
+                "gong_title_c": "Discovery",
+            },
+        )
+        for i, text in enumerate([f"So, {SNIPPET}.", "Then we talked pricing."])
+    ]
+
+
+class Untouchable:
+    def __getattr__(self, name):
+        raise AssertionError(f"replay touched the network client ({name})")
+
+
+def test_recorded_case_replays_offline(tmp_path, monkeypatch):
+    monkeypatch.delenv("NAMESPACE_ALIASES_BACKEND", raising=False)
+    embeddings = SimpleNamespace(
+        create=lambda input, model: SimpleNamespace(
+            data=[SimpleNamespace(index=0, embedding=[1.0, 0.0])]
+        )
+    )
+    alias_table = SimpleNamespace(query=lambda **kwargs: [])
+    transcripts = SimpleNamespace(query=transcript_rows)
+    calls = []
+    case = EvalCase(opp_id="opp-1", expected_primary_previous_solution="Dagster")
+    options = dict(cassette_dir=str(tmp_path), use_tags=False, use_digests=False)
+
+    with override_clients(
+        SimpleNamespace(embeddings=embeddings),
+        lambda name: alias_table if name == ALIAS_NAMESPACE else transcripts,
+    ):
+        [recorded] = asyncio.run(
+            run_evals(
+                [case],
+                mode="record",
+                tiers=[CascadeTier("recording", recording_model(calls))],
+                **options,
+            )
+        )
+
+    def offline(name):
+        raise AssertionError(f"replay opened namespace {name}")
+
+    with override_clients(Untouchable(), offline):
+        [replayed] = asyncio.run(run_evals([case], mode="replay", **options))
+
+    assert recorded.error is None and replayed.error is None
+    assert (tmp_path / "opp-1.json").exists()
+    assert len(calls) == 2
+    assert replayed.accuracy == recorded.accuracy == 1.0
+    assert replayed.grounded is recorded.grounded is True
+    assert replayed.total_tokens == recorded.total_tokens
+    assert replayed.tool_calls == recorded.tool_calls == 1
+    assert replayed.result.model_dump(
+        exclude={"usage", "answered_by"}
+    ) == recorded.result.model_dump(exclude={"usage", "answered_by"})
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# The agent's default model needs a key to be constructed; no request is made.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import extraction_service  # noqa: E402
+from extraction_service import ExtractionRequest, ExtractionService  # noqa: E402
+
+
+@pytest.fixture
+def service(monkeypatch):
+    calls = {"cancelled": []}
+
+    async def fake_run_extraction(opp_id, **kwargs):
+        try:
+            await asyncio.sleep(0.5 if opp_id == "slow" else 0)
+        except asyncio.CancelledError:
+            calls["cancelled"].append(opp_id)
+            raise
+        return SimpleNamespace(data=f"stack of {opp_id}")
+
+    monkeypatch.setattr(extraction_service, "run_extraction", fake_run_extraction)
+    service = ExtractionService(concurrency=1, queue_size=4)
+    service.start(warmup=False)
+    yield service, calls
+    service.stop()
+
+
+def test_answers_requests(service):
+    service, _ = service
+
+    assert service.extract(ExtractionRequest(opp_id="fast")) == "stack of fast"
+    assert service.stats()["completed"] == 1
+
+
+def test_timed_out_request_is_cancelled(service):
+    service, calls = service
+
+    with pytest.raises(TimeoutError):
+        service.extract(ExtractionRequest(opp_id="slow"), timeout=0.05)
+
+    # The worker is free again well before the slow job would have finished.
+    started = time.perf_counter()
+    assert service.extract(ExtractionRequest(opp_id="fast")) == "stack of fast"
+    assert time.perf_counter() - started < 0.4
+    assert calls["cancelled"] == ["slow"]
+    assert service.stats()["cancelled"] == 1
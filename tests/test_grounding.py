@@ -0,0 +1,47 @@
+import random
+
+from grounding import GroundingIndex, SuffixAutomaton
+
+
+def greedy_coverage(automaton, text, min_match_chars):
+    """The restart-at-every-position scan that coverage() must agree with."""
+    covered = 0
+    i = 0
+    while i < len(text):
+        length = automaton.longest_prefix_match(text, i)
+        if length >= min_match_chars:
+            covered += length
+            i += length
+        else:
+            i += 1
+    return covered / len(text)
+
+
+def test_match_starts():
+    automaton = SuffixAutomaton(["abcab", "xyz"])
+
+    # "cabx": c, ca, cab all occur; "bx" does not, "x" does.
+    assert automaton.match_starts("cabx") == [0, 0, 0, 0, 3]
+
+
+def test_coverage_matches_the_greedy_scan():
+    rng = random.Random(7)
+    for _ in range(200):
+        chunks = ["".join(rng.choices("ab ", k=rng.randint(1, 40))) for _ in range(3)]
+        snippet = "".join(rng.choices("ab ", k=rng.randint(1, 60)))
+        min_match_chars = rng.randint(1, 6)
+        index = GroundingIndex(chunks, min_match_chars=min_match_chars)
+
+        assert index.coverage(snippet) == greedy_coverage(
+            index.automaton, snippet, min_match_chars
+        )
+
+
+def test_paraphrased_join_is_fuzzy():
+    index = GroundingIndex(
+        ["we moved off control-m last year", "everything runs on airflow in gcp now"]
+    )
+
+    grounding = index.score("We moved off Control-M and everything runs on Airflow")
+
+    assert grounding.status == "fuzzy"
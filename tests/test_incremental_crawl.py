@@ -0,0 +1,122 @@
+import asyncio
+import functools
+import os
+import re
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import incremental_crawl
+import pytest
+from incremental_crawl import refresh_sitemaps_incrementally
+from ingest_state import stable_id
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTpuf:
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, documents, attributes):
+        for document, link in zip(documents, attributes["link"]):
+            self.rows[document.id] = (link, document.text)
+
+    def delete(self, ids):
+        for row_id in ids:
+            self.rows.pop(row_id, None)
+
+
+async def fake_page_to_documents(url, text):
+    # raggy's excerpt splitter needs tiktoken's encoding files; one excerpt
+    # per paragraph keeps the ids stable per URL and position the same way.
+    paragraphs = [p for p in text.split("\n") if p.strip()]
+    return [
+        SimpleNamespace(
+            id=stable_id(url, i), text=p, metadata=SimpleNamespace(link=url)
+        )
+        for i, p in enumerate(paragraphs)
+    ]
+
+
+def strip_tags(html):
+    return re.sub(r"<[^>]+>", "", html)
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    root = tmp_path / "site"
+    root.mkdir()
+    monkeypatch.setenv("INGEST_STATE_BACKEND", "file")
+    monkeypatch.setenv("INGEST_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(incremental_crawl, "page_to_documents", fake_page_to_documents)
+    # raggy's default parser (trafilatura) is an optional extra.
+    monkeypatch.setattr(incremental_crawl.raggy.settings, "html_parser", strip_tags)
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(root))
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def publish(pages, lastmod):
+        for name, body in pages.items():
+            page = root / name
+            page.write_text(f"<html><body><p>{body}</p></body></html>")
+            # Last-Modified has one-second resolution; keep it distinct.
+            mtime = 1_700_000_000 + 100 * int(lastmod[name])
+            os.utime(page, (mtime, mtime))
+        urls = "".join(
+            f"<url><loc>{base}/{name}</loc><lastmod>{lastmod[name]}</lastmod></url>"
+            for name in pages
+        )
+        (root / "sitemap.xml").write_text(
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f"{urls}</urlset>"
+        )
+
+    yield SimpleNamespace(root=root, base=base, publish=publish)
+    server.shutdown()
+    server.server_close()
+
+
+def crawl(site, tpuf):
+    return asyncio.run(
+        refresh_sitemaps_incrementally(
+            tpuf, namespace="docs-test", sitemap_urls=[f"{site.base}/sitemap.xml"]
+        )
+    )
+
+
+def test_only_changed_pages_are_rewritten(site):
+    tpuf = FakeTpuf()
+    site.publish({"a.html": "Alpha", "b.html": "Beta"}, {"a.html": "1", "b.html": "1"})
+
+    first = crawl(site, tpuf)
+    assert (first["changed_pages"], first["upserted"]) == (2, 2)
+
+    second = crawl(site, tpuf)
+    assert (second["changed_pages"], second["upserted"]) == (0, 0)
+
+    site.publish(
+        {"a.html": "Alpha", "b.html": "Beta v2"}, {"a.html": "1", "b.html": "2"}
+    )
+    third = crawl(site, tpuf)
+    assert (third["changed_pages"], third["upserted"]) == (1, 1)
+    assert sorted(text for _, text in tpuf.rows.values()) == ["Alpha", "Beta v2"]
+
+
+def test_removed_pages_are_deleted(site):
+    tpuf = FakeTpuf()
+    site.publish({"a.html": "Alpha", "b.html": "Beta"}, {"a.html": "1", "b.html": "1"})
+    crawl(site, tpuf)
+
+    os.remove(site.root / "b.html")
+    site.publish({"a.html": "Alpha"}, {"a.html": "1"})
+    stats = crawl(site, tpuf)
+
+    assert (stats["removed_pages"], stats["deleted"]) == (1, 1)
+    assert [link for link, _ in tpuf.rows.values()] == [f"{site.base}/a.html"]
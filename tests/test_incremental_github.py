@@ -0,0 +1,91 @@
+import asyncio
+import subprocess
+from types import SimpleNamespace
+
+import incremental_github
+import pytest
+from incremental_github import refresh_github_incrementally, repo_link
+from ingest_state import stable_id
+
+
+class FakeTpuf:
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, documents, attributes):
+        for document, link in zip(documents, attributes["link"]):
+            self.rows[document.id] = (link, document.text)
+
+    def delete(self, ids):
+        for row_id in ids:
+            self.rows.pop(row_id, None)
+
+
+async def fake_file_to_documents(repo, commit_sha, path, text):
+    # raggy's excerpt splitter needs tiktoken's encoding files; one excerpt
+    # per line keeps the ids stable per repo, path and position the same way.
+    link = repo_link(repo, commit_sha, path)
+    return [
+        SimpleNamespace(
+            id=stable_id(repo, path, i), text=line, metadata=SimpleNamespace(link=link)
+        )
+        for i, line in enumerate(text.splitlines())
+    ]
+
+
+def git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("INGEST_STATE_BACKEND", "file")
+    monkeypatch.setenv("INGEST_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("GITHUB_MIRROR_DIR", str(tmp_path / "mirrors"))
+    for name in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{name}_NAME", "Docs Bot")
+        monkeypatch.setenv(f"GIT_{name}_EMAIL", "docs@example.com")
+    monkeypatch.setattr(incremental_github, "file_to_documents", fake_file_to_documents)
+
+    bare = tmp_path / "docs.git"
+    work = tmp_path / "work"
+    git("init", "--bare", "--initial-branch=main", str(bare), cwd=tmp_path)
+    git("clone", str(bare), str(work), cwd=tmp_path)
+
+    def commit(files, removed=()):
+        for path, text in files.items():
+            (work / path).parent.mkdir(parents=True, exist_ok=True)
+            (work / path).write_text(text)
+        for path in removed:
+            git("rm", "-q", path, cwd=work)
+        git("add", "-A", cwd=work)
+        git("commit", "-q", "-m", "update docs", cwd=work)
+        git("push", "-q", "origin", "HEAD:main", cwd=work)
+
+    yield SimpleNamespace(path=str(bare), commit=commit)
+
+
+def sync(repo, tpuf):
+    return asyncio.run(
+        refresh_github_incrementally(
+            tpuf, namespace="docs-test", repo=repo.path, include_globs=["docs/**/*.md"]
+        )
+    )
+
+
+def test_only_changed_files_are_synced(repo):
+    tpuf = FakeTpuf()
+    repo.commit({"docs/a.md": "alpha\nmore alpha", "docs/b.md": "beta", "x.py": "x"})
+
+    first = sync(repo, tpuf)
+    assert (first["upserted_files"], first["upserted"]) == (2, 3)
+
+    assert sync(repo, tpuf)["upserted_files"] == 0
+
+    repo.commit({"docs/a.md": "alpha v2", "y.py": "y"}, removed=["docs/b.md"])
+    third = sync(repo, tpuf)
+
+    assert (third["upserted_files"], third["deleted_files"]) == (1, 1)
+    # a.md shrank to one excerpt, b.md is gone.
+    assert third["deleted"] == 2
+    assert sorted(text for _, text in tpuf.rows.values()) == ["alpha v2"]
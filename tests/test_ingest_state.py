@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+from ingest_state import INGEST_STATE_NAMESPACE, load_state, save_state
+from shared.aliases import ALIAS_NAMESPACE
+from shared.clients import override_clients
+
+
+class FakeNamespace:
+    def __init__(self):
+        self.rows = {}
+
+    def upsert(self, ids, vectors, attributes, schema=None, distance_metric=None):
+        for i, row_id in enumerate(ids):
+            self.rows[row_id] = {key: values[i] for key, values in attributes.items()}
+
+    def query(self, top_k=10, include_attributes=None, filters=None, **kwargs):
+        attribute, _, value = filters
+        return [
+            SimpleNamespace(id=row_id, attributes=attributes)
+            for row_id, attributes in self.rows.items()
+            if attributes[attribute] == value
+        ][:top_k]
+
+    def delete(self, ids):
+        for row_id in ids:
+            del self.rows[row_id]
+
+
+@pytest.fixture
+def state_namespace(monkeypatch):
+    monkeypatch.setenv("INGEST_STATE_BACKEND", "turbopuffer")
+    monkeypatch.delenv("NAMESPACE_ALIASES_BACKEND", raising=False)
+    namespace = FakeNamespace()
+    alias_table = SimpleNamespace(query=lambda **kwargs: [])
+
+    def factory(name):
+        assert name in (INGEST_STATE_NAMESPACE, ALIAS_NAMESPACE)
+        return namespace if name == INGEST_STATE_NAMESPACE else alias_table
+
+    with override_clients(namespace_factory=factory):
+        yield namespace
+
+
+def test_state_round_trips_through_turbopuffer(state_namespace):
+    docs = {
+        "sitemap": {"https://docs/a": {"lastmod": "2025-01-01", "ids": ["x"]}},
+        "github": {"org/repo": {"commit_sha": "abc", "files": {}}},
+    }
+    save_state("docs", docs)
+    save_state("other-docs", {"sitemap": {}})
+
+    assert load_state("docs") == docs
+    assert load_state("other-docs") == {"sitemap": {}}
+    assert load_state("unknown") == {}
+
+
+def test_saving_drops_removed_sections(state_namespace):
+    save_state("docs", {"sitemap": {"a": {}}, "github": {"b": {}}})
+    save_state("docs", {"github": {"b": {}}})
+    assert load_state("docs") == {"github": {"b": {}}}
+
+    # A reset saves an empty state.
+    save_state("docs", {})
+    assert load_state("docs") == {}
+    assert not state_namespace.rows
+
+
+def test_file_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("INGEST_STATE_BACKEND", "file")
+    monkeypatch.setenv("INGEST_STATE_DIR", str(tmp_path))
+
+    save_state("docs", {"sitemap": {"a": {}}})
+
+    assert load_state("docs") == {"sitemap": {"a": {}}}
+    assert (tmp_path / "docs.json").exists()
@@ -0,0 +1,85 @@
+from fnmatch import fnmatchcase
+from types import SimpleNamespace
+
+import pytest
+from manual_delete_script import build_delete_filters, find_ids
+from shared.aliases import ALIAS_NAMESPACE
+from shared.clients import override_clients
+
+# 2024-01-01T00:00:00Z
+NEW_YEAR = 1704067200
+
+
+def test_no_conditions_match_nothing():
+    assert build_delete_filters() is None
+
+
+def test_conditions_are_combined():
+    filters = build_delete_filters(
+        call_ids=["c1"], opp_ids=["o1", "o2"], start_after="2024-01-01"
+    )
+
+    assert filters == [
+        "And",
+        [
+            ["gong_call_id_c", "In", ["c1"]],
+            ["gong_primary_opportunity_c", "In", ["o1", "o2"]],
+            ["gong_call_start_c", "Gte", NEW_YEAR],
+        ],
+    ]
+    assert build_delete_filters(start_before="2024-01-01T00:00:00Z") == [
+        "gong_call_start_c",
+        "Lt",
+        NEW_YEAR,
+    ]
+
+
+def test_bad_dates_are_rejected():
+    with pytest.raises(ValueError, match="Not an ISO date"):
+        build_delete_filters(start_after="last week")
+
+
+def test_url_prefix_is_matched_literally():
+    _, op, pattern = build_delete_filters(url_prefix="https://docs/v[2]/a?b=*")
+
+    assert op == "Glob"
+    assert fnmatchcase("https://docs/v[2]/a?b=*/page", pattern)
+    assert not fnmatchcase("https://docs/v2/a?b=*/page", pattern)
+    assert not fnmatchcase("https://docs/v[2]/aXb=1/page", pattern)
+    assert not fnmatchcase("https://other/v[2]/a?b=*", pattern)
+
+
+class FakeNamespace:
+    def __init__(self, ids):
+        self.ids = ids
+        self.queries = []
+
+    def query(self, top_k, filters, rank_by, include_attributes):
+        self.queries.append(filters)
+        after = None
+        if filters[0] == "And":
+            _, [_, (_, _, after)] = filters
+        rows = sorted(i for i in self.ids if after is None or i > after)
+        return [SimpleNamespace(id=i) for i in rows[:top_k]]
+
+
+@pytest.mark.parametrize("n_rows", [0, 4, 5])
+def test_find_ids_pages_through_every_row(monkeypatch, n_rows):
+    monkeypatch.delenv("NAMESPACE_ALIASES_BACKEND", raising=False)
+    namespace = FakeNamespace([f"id-{i}" for i in reversed(range(n_rows))])
+    alias_table = SimpleNamespace(query=lambda **kwargs: [])
+    filters = ["link", "Glob", "https://docs/*"]
+
+    with override_clients(
+        namespace_factory=lambda name: (
+            alias_table if name == ALIAS_NAMESPACE else namespace
+        )
+    ):
+        ids = find_ids("docs", filters, page_size=2)
+
+    assert ids == [f"id-{i}" for i in range(n_rows)]
+    # Full pages are followed by one more request; a short page ends it.
+    assert len(namespace.queries) == n_rows // 2 + 1
+    assert namespace.queries[0] == filters
+    if n_rows > 2:
+        assert namespace.queries[1] == ["And", [filters, ["id", "Gt", "id-1"]]]
@@ -0,0 +1,89 @@
+import pytest
+from shared.metrics import (
+    RunUsage,
+    collect_usage,
+    percentile,
+    summarize,
+    timed,
+    tool_call,
+    usage_tables,
+)
+
+
+def test_percentiles_interpolate_between_ranks():
+    # Recorded slowest first; percentiles do not depend on the order.
+    latencies = [float(s) for s in range(100, 0, -1)]
+
+    summary = summarize(latencies)
+
+    assert summary["count"] == 100
+    assert summary["mean"] == pytest.approx(50.5)
+    assert summary["p50"] == pytest.approx(50.5)
+    assert summary["p95"] == pytest.approx(95.05)
+    assert summary["p99"] == pytest.approx(99.01)
+    assert summary["max"] == 100.0
+
+
+def test_small_and_empty_series():
+    assert summarize([]) == {"count": 0}
+    assert percentile([], 50) is None
+    assert summarize([0.2]) == {
+        "count": 1,
+        "mean": 0.2,
+        "p50": 0.2,
+        "p95": 0.2,
+        "p99": 0.2,
+        "max": 0.2,
+    }
+    assert percentile([1.0, 2.0], 50) == 1.5
+
+
+def table_row(table, name):
+    [line] = [line for line in table.splitlines() if line.startswith(name + " ")]
+    return line[len(name) :].split()
+
+
+def test_usage_tables_aggregate_across_runs():
+    usages = [
+        RunUsage(
+            total_sec=float(run),
+            llm_requests=2,
+            request_tokens=100 * run,
+            llm_turn_sec=[0.5, 1.5],
+            spans={"embed": [0.1 * run]},
+        )
+        for run in range(1, 11)
+    ]
+    # A run that never embedded leaves the span series, not the run series.
+    usages.append(RunUsage(total_sec=11.0))
+
+    table = usage_tables(usages)
+
+    count, mean, p50, p95, p99, maximum = table_row(table, "run")
+    assert (count, mean, p50, p95, p99, maximum) == (
+        "11",
+        "6.000",
+        "6.000",
+        "10.500",
+        "10.900",
+        "11.000",
+    )
+    assert table_row(table, "llm turn")[:3] == ["20", "1.000", "1.000"]
+    assert table_row(table, "embed")[0] == "10"
+    assert table_row(table, "embed")[5] == "1.000"
+    assert table_row(table, "prompt tokens")[1:3] == ["500.0", "500.0"]
+
+
+def test_spans_are_recorded_only_while_collecting():
+    with timed("embed"), tool_call():
+        pass
+
+    with collect_usage() as usage:
+        with timed("embed"):
+            pass
+        with tool_call("tpuf_query"):
+            pass
+
+    assert usage.tool_calls == 1
+    assert set(usage.spans) == {"embed", "tpuf_query"}
+    assert usage.total_sec >= sum(usage.spans["embed"])
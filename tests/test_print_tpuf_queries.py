@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+
+import print_tpuf_queries
+from shared.aliases import ALIAS_NAMESPACE
+from shared.clients import override_clients
+
+
+class FakeEmbeddings:
+    """Embeds each text as [position in VOCABULARY]; unknown texts fail."""
+
+    VOCABULARY = ["sports data", "cloud provider", "orchestration"]
+
+    def __init__(self):
+        self.inputs = []
+
+    def create(self, input, model):
+        if isinstance(input, str):
+            input = [input]
+        self.inputs.append(list(input))
+        if any(text not in self.VOCABULARY for text in input):
+            raise RuntimeError("embedding service unavailable")
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[float(self.VOCABULARY.index(t))])
+                for i, t in enumerate(input)
+            ]
+        )
+
+
+class FakeNamespace:
+    def __init__(self):
+        self.queries = []
+        self.rows = None
+
+    def query(self, vector, **kwargs):
+        self.queries.append(vector)
+        if self.rows is not None:
+            return self.rows
+        return [SimpleNamespace(id=f"hit-{vector[0]:.0f}", dist=0.1, attributes={})]
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    monkeypatch.delenv("NAMESPACE_ALIASES_BACKEND", raising=False)
+    embeddings = FakeEmbeddings()
+    namespace = FakeNamespace()
+    alias_table = SimpleNamespace(query=lambda **kwargs: [])
+    with override_clients(
+        SimpleNamespace(embeddings=embeddings),
+        lambda name: alias_table if name == ALIAS_NAMESPACE else namespace,
+    ):
+        yield embeddings, namespace
+
+
+def test_results_follow_the_input_order(fakes):
+    embeddings, namespace = fakes
+    query_texts = ["orchestration", "sports data", "orchestration"]
+
+    grouped = print_tpuf_queries.query_namespace_multi(
+        "calls", query_texts, print_results=False
+    )
+
+    assert [[hit["id"] for hit in hits] for hits in grouped] == [
+        ["hit-2"],
+        ["hit-0"],
+        ["hit-2"],
+    ]
+    # Repeated queries are embedded and searched once.
+    assert embeddings.inputs == [["orchestration", "sports data"]]
+    assert len(namespace.queries) == 2
+
+
+def test_embedding_failures_are_raised(fakes):
+    _, namespace = fakes
+
+    with pytest.raises(RuntimeError, match="Could not embed 2 queries"):
+        print_tpuf_queries.query_namespace_multi(
+            "calls", ["sports data", "unknown"], print_results=False
+        )
+
+    assert not namespace.queries
+
+
+def test_single_query_without_hits(fakes, capsys):
+    _, namespace = fakes
+    namespace.rows = []
+
+    results = print_tpuf_queries.query_namespace("calls", "sports data")
+
+    assert results == []
+    assert "No results." in capsys.readouterr().out
+
+
+def test_single_query_without_transcript_text(fakes, capsys):
+    _, namespace = fakes
+    namespace.rows = [
+        SimpleNamespace(id="a", dist=0.1, attributes={"name": "Kickoff"}),
+        SimpleNamespace(id="b", dist=0.2, attributes={"transcript_text": "short"}),
+    ]
+
+    results = print_tpuf_queries.query_namespace(
+        "calls", "sports data", include_attributes=["name"], n_characters=500
+    )
+
+    out = capsys.readouterr().out
+    assert len(results) == 2
+    assert "name: Kickoff" in out
+    assert "Transcript Text (5 characters):" in out
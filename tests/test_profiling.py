@@ -0,0 +1,40 @@
+import base64
+import re
+import xml.etree.ElementTree as ET
+
+import prefect.artifacts
+import prefect.context
+from shared import profiling
+from shared.profiling import profiled, profiling_enabled
+
+
+@profiled
+def busy():
+    return sum(i * i for i in range(20_000))
+
+
+def test_artifact_embeds_the_flamegraph(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    artifacts = []
+    monkeypatch.setattr(prefect.context, "get_run_context", lambda: object())
+    monkeypatch.setattr(
+        prefect.artifacts,
+        "create_markdown_artifact",
+        lambda **kwargs: artifacts.append(kwargs),
+    )
+
+    with profiling_enabled():
+        busy()
+
+    [artifact] = artifacts
+    assert artifact["key"] == "profile-busy"
+    encoded = re.search(r"data:image/svg\+xml;base64,([\w+/=]+)", artifact["markdown"])
+    svg = ET.fromstring(base64.b64decode(encoded.group(1)))
+    assert svg.tag == "{http://www.w3.org/2000/svg}svg"
+    assert any("busy" in (text.text or "") for text in svg.iter())
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [
+        ".html",
+        ".prof",
+        ".svg",
+    ]
+    assert not profiling.is_profiling()
@@ -0,0 +1,45 @@
+import json
+
+from query_load import FakeBackend, LatencyModel, default_mix, load_test
+
+
+def test_fake_load_test_runs_every_path(tmp_path, monkeypatch):
+    # The default alias backend is turbopuffer; the fakes must serve it.
+    monkeypatch.delenv("NAMESPACE_ALIASES_BACKEND", raising=False)
+    fast = LatencyModel(median_ms=1, p99_ms=3)
+    report_path = tmp_path / "load.json"
+
+    result = load_test(
+        requests=len(default_mix()),
+        qps=0,
+        concurrency=8,
+        fake=FakeBackend(embed_latency=fast, query_latency=fast),
+        cold_cache=True,
+        report_path=str(report_path),
+    )
+
+    assert set(result.paths) == {"tool", "query_namespace", "raggy"}
+    for stats in result.paths.values():
+        assert not stats.errors
+        assert len(stats.latency_sec) == stats.requests
+    assert set(result.paths["tool"].spans) >= {"embed", "tpuf_query"}
+    report = json.loads(report_path.read_text())
+    assert report["paths"]["tool"]["latency_sec"]["p99"] > 0
+
+
+def test_injected_failures_are_counted(monkeypatch):
+    monkeypatch.delenv("NAMESPACE_ALIASES_BACKEND", raising=False)
+    failing = LatencyModel(median_ms=1, p99_ms=3, error_rate=1.0)
+
+    result = load_test(
+        paths=["query_namespace"],
+        requests=10,
+        qps=0,
+        fake=FakeBackend(
+            embed_latency=LatencyModel(median_ms=1, p99_ms=3), query_latency=failing
+        ),
+    )
+
+    stats = result.paths["query_namespace"]
+    assert stats.requests == 10
+    assert not stats.latency_sec
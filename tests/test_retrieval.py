@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+from shared.clients import override_clients
+from shared.retrieval import ChunkCache, two_phase_query
+
+RANK = ["gong_call_id_c", "chunk_index"]
+HEAVY = ["transcript_text"]
+
+
+class FakeNamespace:
+    """Ten rows ranked by id; records the attributes of every query."""
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, top_k, include_attributes, filters=None, **kwargs):
+        self.queries.append(include_attributes)
+        ids = filters[2] if filters and filters[0] == "id" else list(range(10))
+        return [
+            SimpleNamespace(
+                id=row_id,
+                dist=row_id / 10,
+                attributes={
+                    attr: f"{attr} {row_id}"
+                    for attr in include_attributes
+                    # Null attributes are left out of turbopuffer results.
+                    if not (attr == "transcript_text" and row_id == 1)
+                },
+            )
+            for row_id in ids[:top_k]
+        ]
+
+
+@pytest.fixture
+def ns():
+    namespace = FakeNamespace()
+    alias_table = SimpleNamespace(query=lambda **kwargs: [])
+    with override_clients(
+        namespace_factory=lambda name: namespace if name == "calls" else alias_table
+    ):
+        yield namespace
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ChunkCache(max_entries=2)
+    cache.put("ns", 1, {"text": "one"})
+    cache.put("ns", 2, {"text": "two"})
+    assert cache.get("ns", 1, ["text"]) == {"text": "one"}
+
+    cache.put("ns", 3, {"text": "three"})
+
+    assert cache.get("ns", 2, ["text"]) is None
+    assert cache.get("ns", 1, ["text"]) == {"text": "one"}
+    assert cache.get("ns", 3, ["text"]) == {"text": "three"}
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_cache_misses_on_attributes_it_does_not_hold():
+    cache = ChunkCache()
+    cache.put("ns", 1, {"text": "one"})
+    cache.put("ns", 1, {"brief": "b"})
+
+    assert cache.get("ns", 1, ["text", "brief"]) == {"text": "one", "brief": "b"}
+    assert cache.get("ns", 1, ["text", "participants"]) is None
+    assert cache.get("other", 1, ["text"]) is None
+
+
+def test_fetching_every_ranked_row_is_one_query(ns):
+    cache = ChunkCache()
+
+    rows = two_phase_query("calls", [0.1], 3, RANK, HEAVY, fetch_top_n=4, cache=cache)
+
+    assert ns.queries == [RANK + HEAVY]
+    assert [row.id for row in rows] == [0, 1, 2]
+    assert rows[0].attributes["transcript_text"] == "transcript_text 0"
+    assert "transcript_text" not in rows[1].attributes
+    assert cache.get("calls", 2, HEAVY) == {"transcript_text": "transcript_text 2"}
+
+
+def test_second_phase_fetches_only_uncached_winners(ns):
+    cache = ChunkCache()
+    cache.put("calls", 0, {"transcript_text": "cached 0"})
+
+    rows = two_phase_query("calls", [0.1], 5, RANK, HEAVY, fetch_top_n=2, cache=cache)
+
+    assert ns.queries == [RANK, HEAVY]
+    assert rows[0].attributes["transcript_text"] == "cached 0"
+    # Row 1 has no transcript text; the null is cached too.
+    assert "transcript_text" not in rows[1].attributes
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    ns.queries.clear()
+    two_phase_query("calls", [0.1], 5, RANK, HEAVY, fetch_top_n=2, cache=cache)
+
+    assert ns.queries == [RANK]
+    assert (cache.hits, cache.misses) == (3, 1)
@@ -0,0 +1,99 @@
+import datetime
+
+import pytest
+from shared.schemas import (
+    LARGE_TEXT,
+    TIMESTAMP,
+    conform_columns,
+    format_timestamp,
+    namespace_schema,
+    to_epoch,
+)
+
+# 2024-01-01T00:00:00Z
+NEW_YEAR = 1704067200
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2024-01-01T00:00:00", NEW_YEAR),
+        ("2024-01-01T00:00:00Z", NEW_YEAR),
+        ("2024-01-01T02:00:00+02:00", NEW_YEAR),
+        ("2024-01-01", NEW_YEAR),
+        (datetime.date(2024, 1, 1), NEW_YEAR),
+        (datetime.datetime(2024, 1, 1), NEW_YEAR),
+        (
+            datetime.datetime(
+                2023, 12, 31, 19, tzinfo=datetime.timezone(-datetime.timedelta(hours=5))
+            ),
+            NEW_YEAR,
+        ),
+        (NEW_YEAR, NEW_YEAR),
+        (NEW_YEAR + 0.9, NEW_YEAR),
+    ],
+)
+def test_to_epoch(value, expected):
+    assert to_epoch(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, True, "", "next tuesday", [2024], {}])
+def test_to_epoch_rejects_unparseable_values(value):
+    assert to_epoch(value) is None
+
+
+def test_format_timestamp_round_trips():
+    assert format_timestamp(NEW_YEAR) == "2024-01-01T00:00:00+00:00"
+    assert to_epoch(format_timestamp(NEW_YEAR)) == NEW_YEAR
+    # ISO strings written before the migration pass through.
+    assert format_timestamp("2024-01-01") == "2024-01-01"
+
+
+def test_conform_columns_converts_only_timestamps():
+    attributes = {
+        "gong_call_start_c": ["2024-01-01T00:00:00Z", None, "garbage"],
+        "gong_title_c": ["2024-01-01", "b", "c"],
+    }
+
+    conformed = conform_columns("sales-calls", attributes)
+
+    assert conformed["gong_call_start_c"] == [NEW_YEAR, None, None]
+    assert conformed["gong_title_c"] == attributes["gong_title_c"]
+    # Kinds without timestamp attributes are left alone.
+    assert conform_columns("docs", attributes) is attributes
+
+
+def test_namespace_schema_covers_only_written_attributes():
+    schema = namespace_schema(
+        "sales-calls",
+        [
+            "transcript_text",
+            "gong_call_brief_c",
+            "gong_call_start_c",
+            "gong_participants_json",
+            "gong_title_c",
+        ],
+    )
+
+    assert schema == {
+        "transcript_text": {**LARGE_TEXT, "full_text_search": True},
+        "gong_call_brief_c": LARGE_TEXT,
+        "gong_call_start_c": TIMESTAMP,
+        "gong_participants_json": LARGE_TEXT,
+    }
+    # Only transcripts are full-text indexed; large text is never filterable.
+    assert [n for n, s in schema.items() if s.get("full_text_search")] == [
+        "transcript_text"
+    ]
+    assert {n for n, s in schema.items() if s.get("filterable") is False} == {
+        "transcript_text",
+        "gong_call_brief_c",
+        "gong_participants_json",
+    }
+
+
+def test_json_attributes_are_large_text_only_for_sales_calls():
+    assert namespace_schema("call-digests", ["digest_json", "notes_json"]) == {
+        "digest_json": LARGE_TEXT
+    }
+    assert namespace_schema("docs", ["text", "link"]) == {"text": LARGE_TEXT}
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+import streaming
+from streaming import stream_loaders_to_tpuf
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    async def create_openai_embeddings(texts):
+        vectors = [[float(len(text))] for text in texts]
+        return vectors[0] if len(vectors) == 1 else vectors
+
+    monkeypatch.setattr(streaming, "create_openai_embeddings", create_openai_embeddings)
+
+
+class FakeLoader:
+    def __init__(self, texts, failures=0, delay=0.0):
+        self.texts = texts
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.finished_at = None
+
+    async def load(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise ConnectionError("crawl failed")
+        self.finished_at = time.monotonic()
+        return [SimpleNamespace(id=text, text=text) for text in self.texts]
+
+
+class FakeStore:
+    """raggy's TurboPuffer: `upsert` is a blocking HTTP call."""
+
+    def __init__(self, write_seconds=0.0):
+        self.write_seconds = write_seconds
+        self.written = []
+        self.writes = []
+
+    def upsert(self, ids, vectors, attributes):
+        started = time.monotonic()
+        time.sleep(self.write_seconds)
+        self.written.extend(SimpleNamespace(text=text) for text in attributes["text"])
+        self.writes.append((started, time.monotonic()))
+
+
+def test_streams_every_document():
+    store = FakeStore()
+    loaders = [FakeLoader(["a", "b", "c"]), FakeLoader(["d"])]
+    count = asyncio.run(stream_loaders_to_tpuf(store, loaders, batch_size=2))
+    assert count == 4
+    assert sorted(doc.text for doc in store.written) == ["a", "b", "c", "d"]
+
+
+def test_loader_failure_is_raised():
+    store = FakeStore()
+    loaders = [FakeLoader(["a"]), FakeLoader(["b"], failures=1)]
+    with pytest.raises(ConnectionError):
+        asyncio.run(stream_loaders_to_tpuf(store, loaders, batch_size=1))
+
+
+def test_loads_go_through_the_retrying_callable():
+    async def load_with_retry(loader):
+        try:
+            return await loader.load()
+        except ConnectionError:
+            return await loader.load()
+
+    store = FakeStore()
+    loader = FakeLoader(["a", "b"], failures=1)
+    count = asyncio.run(
+        stream_loaders_to_tpuf(store, [loader], batch_size=1, load=load_with_retry)
+    )
+    assert count == 2
+    assert loader.calls == 2
+
+
+def test_crawl_continues_during_a_blocking_write():
+    store = FakeStore(write_seconds=0.3)
+    loaders = [FakeLoader(["first"])] + [
+        FakeLoader([f"page-{i}"], delay=0.05 + 0.02 * i) for i in range(5)
+    ]
+
+    count = asyncio.run(
+        stream_loaders_to_tpuf(store, loaders, batch_size=1, max_concurrent_loads=6)
+    )
+
+    assert count == 6
+    first_write_started, first_write_ended = store.writes[0]
+    # The slower loaders finish while the first batch is being written.
+    assert any(
+        first_write_started < loader.finished_at < first_write_ended
+        for loader in loaders[1:]
+    )
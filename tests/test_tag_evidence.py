@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+import extract_stack
+from cascade import CascadeTier
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+from shared.tech_stack_enums import CloudProvider, OrchestrationTool
+from shared.tech_tagging import CLOUDS_ATTRIBUTE, TOOLS_ATTRIBUTE, tag_chunk
+from tag_evidence import decide_from_tags, tag_hint
+
+
+def row(row_id, tools=None, clouds=None):
+    return SimpleNamespace(
+        id=row_id, attributes={TOOLS_ATTRIBUTE: tools, CLOUDS_ATTRIBUTE: clouds}
+    )
+
+
+def test_common_words_are_not_tagged():
+    text = (
+        "We made decisions with our ECS team, the lambda in that formula, "
+        "the data factory floor, our OCI compliance and astronomer friends."
+    )
+    assert tag_chunk(text) == {TOOLS_ATTRIBUTE: None, CLOUDS_ATTRIBUTE: None}
+
+
+def test_vendor_phrases_are_tagged():
+    tags = tag_chunk("We run AWS Lambda functions and Azure Data Factory on Amazon ECS")
+    assert tags[TOOLS_ATTRIBUTE] == [
+        OrchestrationTool.AWS_LAMBDA_FUNCTIONS.value,
+        OrchestrationTool.AZURE_DATA_FACTORY.value,
+    ]
+    assert tags[CLOUDS_ATTRIBUTE] == [CloudProvider.AWS.value]
+
+
+def test_unknown_tag_values_are_ignored():
+    mwaa = OrchestrationTool.AIRFLOW_MWAA_AWS_MANAGED.value
+    rows = [row(1, [mwaa, "h"]), row(2, [mwaa], ["AWS", "Legacy Cloud"])]
+
+    verdict = decide_from_tags(rows)
+
+    assert verdict.tool == OrchestrationTool.AIRFLOW_MWAA_AWS_MANAGED
+    assert verdict.cloud == CloudProvider.AWS
+    assert verdict.tool_mentions == 2
+
+
+def test_hint_asks_the_agent_to_confirm():
+    verdict = decide_from_tags(
+        [row(1, [OrchestrationTool.DAGSTER.value], ["GCP"]), row(2, ["Dagster"])]
+    )
+    hint = tag_hint(verdict)
+
+    assert "Dagster (2 chunks)" in hint
+    assert "GCP (1 chunks)" in hint
+    assert "confirm" in hint
+
+
+def answering_model(name, calls, tool=OrchestrationTool.DAGSTER, confidence=0.9):
+    def respond(messages, info):
+        calls.append((name, str(messages[0])))
+        return ModelResponse(
+            parts=[
+                ToolCallPart(
+                    tool_name=info.result_tools[0].name,
+                    args={
+                        "tech_stack": {
+                            "primary_previous_solution": tool.value,
+                            "cloud_provider": CloudProvider.GCP.value,
+                        },
+                        "confidence_score": confidence,
+                    },
+                )
+            ]
+        )
+
+    return FunctionModel(respond, model_name=name)
+
+
+def test_unambiguous_tags_go_to_the_cheapest_tier(monkeypatch):
+    rows = [row(1, [OrchestrationTool.DAGSTER.value], ["GCP"]), row(2, ["Dagster"])]
+    verdict = decide_from_tags(rows)
+    monkeypatch.setattr(extract_stack, "fetch_tag_evidence", lambda ns, opp: rows)
+    monkeypatch.setattr(
+        extract_stack, "find_unambiguous_stack", lambda ns, opp, rows: verdict
+    )
+    calls = []
+    monkeypatch.setattr(
+        extract_stack,
+        "DEFAULT_TIERS",
+        [
+            CascadeTier("cheap", answering_model("cheap", calls)),
+            CascadeTier("expensive", answering_model("expensive", calls)),
+        ],
+    )
+
+    run = asyncio.run(extract_stack.run_extraction("opp-1", use_digests=False))
+
+    assert run.data.answered_by == "cheap"
+    assert run.data.tech_stack.primary_previous_solution == OrchestrationTool.DAGSTER
+    [(name, prompt)] = calls
+    assert "Dagster (2 chunks)" in prompt
+
+
+def test_contradicting_cheap_answer_escalates(monkeypatch):
+    rows = [row(1, [OrchestrationTool.DAGSTER.value], ["GCP"]), row(2, ["Dagster"])]
+    verdict = decide_from_tags(rows)
+    monkeypatch.setattr(extract_stack, "fetch_tag_evidence", lambda ns, opp: rows)
+    monkeypatch.setattr(
+        extract_stack, "find_unambiguous_stack", lambda ns, opp, rows: verdict
+    )
+    calls = []
+    cheap = answering_model(
+        "cheap", calls, tool=OrchestrationTool.AIRFLOW_NOT_SPECIFIED
+    )
+    monkeypatch.setattr(
+        extract_stack,
+        "DEFAULT_TIERS",
+        [
+            CascadeTier("cheap", cheap),
+            CascadeTier("expensive", answering_model("expensive", calls)),
+        ],
+    )
+
+    run = asyncio.run(extract_stack.run_extraction("opp-1", use_digests=False))
+
+    assert [name for name, _ in calls] == ["cheap", "expensive"]
+    assert run.data.answered_by == "expensive"